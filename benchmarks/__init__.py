@@ -0,0 +1,7 @@
+"""
+Micro-benchmarks for the per-request hot paths of pwned-passwords-django.
+
+Run them with ``python runbenchmarks.py`` (or ``python -m nox -s benchmarks``). See
+``runbenchmarks.py`` for options.
+
+"""
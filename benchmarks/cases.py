@@ -0,0 +1,140 @@
+"""
+The benchmark cases.
+
+Each case is a function which performs any necessary setup, and returns a
+zero-argument callable performing the operation to be measured.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import random
+import typing
+
+import httpx
+from django.test import RequestFactory
+
+from pwned_passwords_django import api, exceptions, middleware
+
+# Realistic sizes for a range response: at the time of writing, each hash prefix has
+# around 1,000 suffixes listed in Pwned Passwords, and padding adds between 800 and
+# 1,000 more, each with a count of 0.
+RANGE_SIZE = 1000
+PADDING_SIZE = 900
+
+Case = typing.Callable[[], typing.Callable[[], typing.Any]]
+
+CASES: typing.Dict[str, Case] = {}
+
+
+def case(func: Case) -> Case:
+    """
+    Register a benchmark case under the name of its function.
+
+    """
+    CASES[func.__name__] = func
+    return func
+
+
+def range_body(padded: bool) -> typing.Tuple[str, str]:
+    """
+    Return a deterministic, realistic range response body, optionally padded, and a
+    suffix which appears near its end.
+
+    """
+    rng = random.Random(0)
+    lines = [
+        f"{rng.getrandbits(140):035X}:{rng.randint(1, 100000)}"
+        for _ in range(RANGE_SIZE)
+    ]
+    if padded:
+        lines += [f"{rng.getrandbits(140):035X}:0" for _ in range(PADDING_SIZE)]
+    lines.sort()
+    return "\r\n".join(lines), lines[-1].partition(":")[0]
+
+
+@case
+def prepare_password() -> typing.Callable[[], typing.Any]:
+    """
+    Hash a password and split it into prefix and suffix.
+
+    """
+    client = api.PwnedPasswords()
+    # pylint: disable=protected-access
+    return lambda: client._prepare_password("correct horse battery staple")
+
+
+@case
+def get_hits_unpadded() -> typing.Callable[[], typing.Any]:
+    """
+    Find a suffix's count in an unpadded range response.
+
+    """
+    client = api.PwnedPasswords()
+    body, suffix = range_body(padded=False)
+    # pylint: disable=protected-access
+    return lambda: client._parse_hits(body).get(suffix, 0)
+
+
+@case
+def get_hits_padded() -> typing.Callable[[], typing.Any]:
+    """
+    Find a suffix's count in a padded range response.
+
+    """
+    client = api.PwnedPasswords()
+    body, suffix = range_body(padded=True)
+    # pylint: disable=protected-access
+    return lambda: client._parse_hits(body).get(suffix, 0)
+
+
+@case
+def error_path() -> typing.Callable[[], typing.Any]:
+    """
+    Translate a timeout into a PwnedPasswordsError, including logging it.
+
+    """
+
+    class TimeoutClient:
+        """
+        An HTTP client which times out every request, without doing any other work,
+        so that only the cost of handling the error is measured.
+
+        """
+
+        def get(self, **kwargs) -> httpx.Response:
+            """
+            Time out.
+
+            """
+            raise httpx.ConnectTimeout("Timed out")
+
+    client = api.PwnedPasswords(client=TimeoutClient())
+
+    def check() -> None:
+        """
+        Check a password, and swallow the resulting error.
+
+        """
+        try:
+            client.check_password("correct horse battery staple")
+        except exceptions.PwnedPasswordsError:
+            pass
+
+    return check
+
+
+@case
+def middleware_scan() -> typing.Callable[[], typing.Any]:
+    """
+    Find the likely password fields in a parsed form with twenty fields.
+
+    """
+    data = {f"field_{number}": "value" for number in range(17)}
+    data.update(
+        {"password": "secret", "password_confirm": "secret", "old_passphrase": "x"}
+    )
+    request = RequestFactory().post("/", data=data)
+    request.POST  # pylint: disable=pointless-statement
+    # pylint: disable=protected-access
+    return lambda: middleware._keys_to_search(request)
@@ -0,0 +1,24 @@
+"""
+Django settings file for load-test runs, which serves the test URLs through the
+middleware.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.utils.crypto import get_random_string
+
+INSTALLED_APPS = ["pwned_passwords_django"]
+ROOT_URLCONF = "tests.urls"
+ALLOWED_HOSTS = ["testserver"]
+DATABASES = {}
+MIDDLEWARE = [
+    "pwned_passwords_django.middleware.pwned_passwords_middleware",
+]
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": True,
+    "handlers": {"null": {"class": "logging.NullHandler"}},
+    "loggers": {"pwned_passwords_django": {"handlers": ["null"], "propagate": False}},
+}
+SECRET_KEY = get_random_string(12)
@@ -0,0 +1,21 @@
+"""
+Minimal Django settings file for benchmark runs.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.utils.crypto import get_random_string
+
+INSTALLED_APPS = ["pwned_passwords_django"]
+DATABASES = {}
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": True,
+    "handlers": {"null": {"class": "logging.NullHandler"}},
+    "loggers": {"pwned_passwords_django": {"handlers": ["null"], "propagate": False}},
+}
+# Log every error, so that the error-path benchmark measures the full cost of
+# logging rather than the cost of suppressing it.
+PWNED_PASSWORDS = {"ERROR_LOG_RATE": None}
+SECRET_KEY = get_random_string(12)
@@ -3,4 +3,9 @@ Minimal Django settings file for documentation builds.
 
 """
 
-INSTALLED_APPS = ["pwned_passwords_django"]
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "pwned_passwords_django",
+    "pwned_passwords_django.db_mirror",
+]
@@ -111,6 +111,40 @@ def tests_with_coverage(session: nox.Session, django: str) -> None:
     clean()
 
 
+@nox.session(python=["3.11"], tags=["benchmarks"])
+def benchmarks(session: nox.Session) -> None:
+    """
+    Run the package's micro-benchmarks, and compare them to the stored baselines.
+
+    Pass ``-- --save`` to store the results as the new baselines instead.
+
+    """
+    session.install(".")
+    session.run(
+        f"{session.bin}/python{session.python}",
+        "runbenchmarks.py",
+        *session.posargs,
+    )
+    clean()
+
+
+@nox.session(python=["3.11"], tags=["benchmarks"])
+def loadtest(session: nox.Session) -> None:
+    """
+    Run the package's load test of the middleware under increasing concurrency.
+
+    Pass options after ``--``; for example, ``-- --concurrency 1,8,32``.
+
+    """
+    session.install(".")
+    session.run(
+        f"{session.bin}/python{session.python}",
+        "runloadtest.py",
+        *session.posargs,
+    )
+    clean()
+
+
 # Tasks which test the package's documentation.
 # -----------------------------------------------------------------------------------
 
@@ -155,6 +189,7 @@ def docs_docstrings(session: nox.Session) -> None:
         "-v",
         "src/",
         "tests/",
+        "benchmarks/",
         "noxfile.py",
     )
     clean()
@@ -212,6 +247,7 @@ def format_black(session: nox.Session) -> None:
         "src/",
         "tests/",
         "docs/",
+        "benchmarks/",
         "noxfile.py",
     )
     clean()
@@ -234,6 +270,7 @@ def format_isort(session: nox.Session) -> None:
         "src/",
         "tests/",
         "docs/",
+        "benchmarks/",
         "noxfile.py",
     )
     clean()
@@ -279,6 +316,7 @@ def lint_flake8(session: nox.Session) -> None:
         "src/",
         "tests/",
         "docs/",
+        "benchmarks/",
         "noxfile.py",
     )
     clean()
@@ -0,0 +1,152 @@
+"""
+A standalone benchmark runner for the per-request hot paths of pwned-passwords-django.
+
+Measures the time per call, and the peak memory allocated during a call (with
+:mod:`tracemalloc`), of each case in ``benchmarks/cases.py``, and compares them to the
+baselines stored in ``benchmarks/baselines.json`` for the running version of Python.
+
+Usage::
+
+    python runbenchmarks.py [--save] [--time-tolerance 0.5] [--memory-tolerance 0.1]
+
+With ``--save``, the results are stored as the new baselines instead of being
+compared. Otherwise, the exit status is nonzero if any case is slower, or allocates
+more, than its baseline by more than the given tolerance (a fraction of the
+baseline). Timings vary between machines much more than allocations, so the default
+time tolerance is loose.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import timeit
+import tracemalloc
+import typing
+
+import django
+
+BASELINES_PATH = pathlib.Path(__file__).parent / "benchmarks" / "baselines.json"
+
+# The number of times each case is timed; the median is reported.
+REPEAT = 7
+
+# The number of calls over which memory use is measured; the median is reported.
+MEMORY_CALLS = 100
+
+
+def measure(func: typing.Callable[[], typing.Any]) -> typing.Dict[str, float]:
+    """
+    Return the median time per call, in nanoseconds, and the median peak memory
+    allocated during a call, in bytes, of ``func``.
+
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = timer.repeat(repeat=REPEAT, number=number)
+    time_ns = statistics.median(times) / number * 1e9
+
+    func()  # Warm up any caches before measuring memory.
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(MEMORY_CALLS):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {"time_ns": round(time_ns, 1), "memory_bytes": int(statistics.median(peaks))}
+
+
+def compare(
+    results: typing.Dict[str, typing.Dict[str, float]],
+    baselines: typing.Dict[str, typing.Dict[str, float]],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> bool:
+    """
+    Print a comparison of ``results`` with ``baselines``, and return whether every
+    result is within tolerance of its baseline.
+
+    """
+    ok = True
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name}: no baseline")
+            continue
+        for key, tolerance in (
+            ("time_ns", time_tolerance),
+            ("memory_bytes", memory_tolerance),
+        ):
+            limit = baseline[key] * (1 + tolerance)
+            # Allow small absolute differences in allocations, which can come from
+            # the interpreter rather than the code being measured.
+            if key == "memory_bytes":
+                limit += 64
+            if result[key] > limit:
+                ok = False
+                print(
+                    f"{name}: {key} regressed: {result[key]} > {baseline[key]} "
+                    f"(+{tolerance:.0%})"
+                )
+    return ok
+
+
+def run_benchmarks() -> int:
+    """
+    Run the benchmarks, and return the exit status.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--save", action="store_true", help="Store the results as the new baselines."
+    )
+    parser.add_argument("--time-tolerance", type=float, default=0.5)
+    parser.add_argument("--memory-tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+    from benchmarks.cases import CASES  # pylint: disable=import-outside-toplevel
+
+    results = {}
+    for name, setup in CASES.items():
+        results[name] = measure(setup())
+        print(
+            f"{name:<24} {results[name]['time_ns']:>12,.1f} ns/call "
+            f"{results[name]['memory_bytes']:>10,} bytes peak"
+        )
+
+    python = f"{sys.version_info.major}.{sys.version_info.minor}"
+    all_baselines = (
+        json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    )
+    if args.save:
+        all_baselines[python] = results
+        BASELINES_PATH.write_text(
+            json.dumps(all_baselines, indent=2, sort_keys=True) + "\n"
+        )
+        print(f"Saved baselines for Python {python}.")
+        return 0
+    if python not in all_baselines:
+        print(f"No baselines for Python {python}; run with --save to create them.")
+        return 0
+    return (
+        0
+        if compare(
+            results, all_baselines[python], args.time_tolerance, args.memory_tolerance
+        )
+        else 1
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmarks())
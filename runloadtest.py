@@ -0,0 +1,238 @@
+"""
+A load test of pwned-passwords-django's middleware under increasing concurrency.
+
+Sends POST requests, a fixed number of them at a time for each of a series of
+concurrency levels, through Django's WSGI and ASGI handlers, with the middleware
+checking each submitted password against a fake Pwned Passwords server
+(:class:`pwned_passwords_django.testing.FakeRangeServer`) with realistic latency.
+Half of the requests submit a compromised password, to the ``pwned-breach`` test URL
+(or ``pwned-breach-async`` under ASGI), and half submit an uncompromised one, to
+``pwned-clean`` (or ``pwned-clean-async``). Throughput, and the 50th, 95th and 99th
+percentile latencies, are reported for each handler and concurrency level.
+
+Usage::
+
+    python runloadtest.py [--concurrency 1,4,16,64] [--requests 400]
+        [--latency 0.05] [--error-rate 0.0] [--timeout-rate 0.0]
+
+If requests are handled concurrently, throughput grows with concurrency while latency
+stays close to the server's latency; if they are serialized somewhere, such as on the
+shared HTTP client, throughput stays flat and latency grows instead.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import statistics
+import sys
+import time
+import typing
+
+import django
+import httpx
+
+# The password submitted in requests expected to find a compromised password.
+COMPROMISED_PASSWORD = "swordfish"  # nosec: B105
+
+# The number of distinct uncompromised passwords submitted. The fake server caches
+# the response for each prefix, so a small pool keeps its own work out of the
+# measurements.
+CLEAN_PASSWORDS = 64
+
+Request = typing.Tuple[str, typing.Dict[str, str]]
+
+
+def build_requests(count: int, use_async: bool) -> typing.List[Request]:
+    """
+    Return ``count`` URLs and POST payloads, alternating between compromised and
+    uncompromised passwords, for the sync or async test views.
+
+    """
+    from django.urls import reverse  # pylint: disable=import-outside-toplevel
+
+    suffix = "-async" if use_async else ""
+    breach_url = reverse(f"pwned-breach{suffix}", kwargs={"field": "password"})
+    clean_url = reverse(f"pwned-clean{suffix}")
+    requests = []
+    for index in range(count):
+        if index % 2:
+            password = f"load-test-{index // 2 % CLEAN_PASSWORDS}"
+            requests.append((clean_url, {"password": password}))
+        else:
+            requests.append((breach_url, {"password": COMPROMISED_PASSWORD}))
+    return requests
+
+
+def run_wsgi(
+    requests: typing.List[Request], concurrency: int
+) -> typing.Tuple[float, typing.List[float], int]:
+    """
+    Send ``requests`` through the WSGI handler from ``concurrency`` threads, and
+    return the total time taken, the latency of each request, and the number of
+    failed requests.
+
+    """
+    from django.core.handlers.wsgi import (  # pylint: disable=import-outside-toplevel
+        WSGIHandler,
+    )
+
+    client = httpx.Client(
+        transport=httpx.WSGITransport(app=WSGIHandler()),
+        base_url="http://testserver",
+    )
+
+    def send(request: Request) -> typing.Tuple[float, bool]:
+        """
+        Send one request, and return its latency and whether it succeeded.
+
+        """
+        url, data = request
+        start = time.perf_counter()
+        response = client.post(url, data=data)
+        return time.perf_counter() - start, response.status_code == 200
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, requests))
+    elapsed = time.perf_counter() - start
+    return (
+        elapsed,
+        [latency for latency, _ in results],
+        [ok for _, ok in results].count(False),
+    )
+
+
+def run_asgi(
+    requests: typing.List[Request], concurrency: int
+) -> typing.Tuple[float, typing.List[float], int]:
+    """
+    Send ``requests`` through the ASGI handler, ``concurrency`` at a time, and
+    return the total time taken, the latency of each request, and the number of
+    failed requests.
+
+    """
+    from django.core.handlers.asgi import (  # pylint: disable=import-outside-toplevel
+        ASGIHandler,
+    )
+
+    async def main() -> typing.List[typing.Tuple[float, bool]]:
+        """
+        Send all of the requests.
+
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=ASGIHandler()),
+            base_url="http://testserver",
+        ) as client:
+
+            async def send(request: Request) -> typing.Tuple[float, bool]:
+                """
+                Send one request, and return its latency and whether it succeeded.
+
+                """
+                url, data = request
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(url, data=data)
+                    return time.perf_counter() - start, response.status_code == 200
+
+            return await asyncio.gather(*(send(request) for request in requests))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    return (
+        elapsed,
+        [latency for latency, _ in results],
+        [ok for _, ok in results].count(False),
+    )
+
+
+def report(
+    handler: str,
+    concurrency: int,
+    elapsed: float,
+    latencies: typing.List[float],
+    failures: int,
+) -> None:
+    """
+    Print the throughput and latency percentiles of one run.
+
+    """
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(
+        f"{handler:<5} {concurrency:>11} {len(latencies) / elapsed:>12,.1f} "
+        f"{percentiles[49] * 1000:>9.1f} {percentiles[94] * 1000:>9.1f} "
+        f"{percentiles[98] * 1000:>9.1f} {failures:>8}"
+    )
+
+
+def run_load_test() -> int:
+    """
+    Run the load test, and return the exit status.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--concurrency",
+        default="1,4,16,64",
+        help="Comma-separated concurrency levels to test.",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=400,
+        help="Number of requests sent at each concurrency level.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Median latency of the fake server, in seconds.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.load_settings")
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from pwned_passwords_django import api, testing
+
+    server = testing.FakeRangeServer(
+        passwords={COMPROMISED_PASSWORD: 1000},
+        latency=testing.lognormal_latency(args.latency),
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+    )
+    # The middleware checks passwords with the default client, so point its HTTP
+    # clients at the fake server.
+    api.default_client.client = httpx.Client(transport=server.transport())
+    api.default_client.async_client = httpx.AsyncClient(
+        transport=server.async_transport()
+    )
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    print(
+        f"{'':<5} {'concurrency':>11} {'requests/s':>12} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'failures':>8}"
+    )
+    for handler, runner, use_async in (
+        ("wsgi", run_wsgi, False),
+        ("asgi", run_asgi, True),
+    ):
+        requests = build_requests(args.requests, use_async)
+        # Warm up the handler and the fake server's cache of response bodies.
+        runner(requests[: 2 * CLEAN_PASSWORDS], max(levels))
+        for concurrency in levels:
+            report(handler, concurrency, *runner(requests, concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_load_test())
@@ -6,21 +6,81 @@ password is compromised.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+import asyncio
+import concurrent.futures
 import hashlib
 import logging
+import re
 import sys
+import threading
+import time
 import typing
 
 import httpx
 from django.conf import settings
+from django.utils.module_loading import import_string
 from django.views.decorators.debug import sensitive_variables
 
-from . import __version__, exceptions
+from . import __version__, exceptions, throttle, timing
+from .metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_REQUEST_TIMEOUT: float = 1.0  # 1 second
 
+HEX_RE = re.compile(r"[0-9A-Fa-f]+")
+
+# The default maximum number of simultaneous requests made by check_passwords().
+DEFAULT_BATCH_CONCURRENCY: int = 8
+
+# Checks run in the background by synchronous code -- such as the middleware checking
+# several password values concurrently -- use a small thread pool shared by the whole
+# process. The pool is created on first use.
+EXECUTOR_MAX_WORKERS: int = 4
+
+# The prefix of the names of the threads in thread pools belonging to
+# pwned-passwords-django.
+THREAD_NAME_PREFIX = "pwned_passwords_django"
+
+_executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# The result of checking one password in a batch: either its breach count, or the
+# error encountered in fetching its hash prefix.
+BatchResult = typing.Union[int, exceptions.PwnedPasswordsError]
+
+# The result of fetching one hash prefix: either a mapping of hash suffixes to breach
+# counts, or the error encountered in fetching it.
+RangeResult = typing.Union[typing.Mapping[str, int], exceptions.PwnedPasswordsError]
+
+
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """
+    Return the thread pool shared by the synchronous code of
+    ``pwned-passwords-django`` for running checks in the background, creating it if
+    necessary.
+
+    """
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix=THREAD_NAME_PREFIX,
+                )
+    return _executor
+
+
+def in_worker_thread() -> bool:
+    """
+    Return whether the current thread belongs to one of the thread pools of
+    ``pwned-passwords-django`` -- such as the one returned by :func:`get_executor` --
+    rather than, for example, to the server handling requests.
+
+    """
+    return threading.current_thread().name.startswith(THREAD_NAME_PREFIX)
+
 
 class PwnedPasswords:
     """
@@ -41,11 +101,18 @@ class PwnedPasswords:
     :param client: A synchronous HTTP client object. Defaults to an ``httpx.Client``.
     :param async_client: An asynchronous HTTP client object. Defaults to an
        ``httpx.AsyncClient``.
+    :param metrics: A :class:`~pwned_passwords_django.metrics.Metrics` instance to
+       record metrics with. Defaults to an instance of the class named by
+       ``settings.PWNED_PASSWORDS["METRICS"]``, or to a
+       :class:`~pwned_passwords_django.metrics.Metrics`, which records nothing, if
+       that setting is not provided.
 
     """
 
     api_endpoint: str = "https://api.pwnedpasswords.com/range/"
 
+    metrics: Metrics = Metrics()
+
     user_agent: str = (
         f"pwned-passwords-django/{__version__} "
         f"(Python/{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro} "
@@ -56,6 +123,7 @@ class PwnedPasswords:
         self,
         client: typing.Optional[httpx.Client] = None,
         async_client: typing.Optional[httpx.AsyncClient] = None,
+        metrics: typing.Optional[Metrics] = None,
     ) -> None:
         settings_dict = getattr(settings, "PWNED_PASSWORDS", {})
         self.request_timeout = httpx.Timeout(
@@ -64,6 +132,11 @@ class PwnedPasswords:
         self.add_padding = settings_dict.get("ADD_PADDING", True)
         self.client = client or httpx.Client()
         self.async_client = async_client or httpx.AsyncClient()
+        if metrics is None:
+            metrics = import_string(
+                settings_dict.get("METRICS", "pwned_passwords_django.metrics.Metrics")
+            )()
+        self.metrics = metrics
 
     def _prepare_password(self, password: str) -> typing.Tuple[str, str]:
         """
@@ -85,17 +158,18 @@ class PwnedPasswords:
         # usedforsecurity=False argument, and rely on it being ignored for Python
         # 3.7/3.8, and interpreted as intended on Python 3.9+. Once support for Python
         # 3.7 and 3.8 ends, this can be updated to call hashlib.sha1() directly.
-        password_hash = (
-            hashlib.new("sha1", password.encode("utf-8"), usedforsecurity=False)
-            .hexdigest()
-            .upper()  # Pwned Passwords wants all hashes to be uppercase.
-        )
+        with timing.measure(timing.HASH):
+            password_hash = (
+                hashlib.new("sha1", password.encode("utf-8"), usedforsecurity=False)
+                .hexdigest()
+                .upper()  # Pwned Passwords wants all hashes to be uppercase.
+            )
         return password_hash[:5], password_hash[5:]
 
-    def _get_hits(self, response_text: str, suffix: str) -> int:
+    def _parse_hits(self, response_text: str) -> typing.Dict[str, int]:
         """
-        Given a resposne from Pwned Passwords and a password hash suffix, return the
-        count of hits for that suffix in the response.
+        Given a response from Pwned Passwords, return a mapping of each hash suffix
+        in the response to its count of hits.
 
         """
         hits = {}
@@ -105,7 +179,7 @@ class PwnedPasswords:
             # them, like "1,234" instead of "1234". So to be safe, we remove them before
             # trying to parse as int.
             hits[line_suffix] = int(count.replace(",", ""))
-        return hits.get(suffix, 0)
+        return hits
 
     def _request(self, prefix: str) -> httpx.Response:
         """
@@ -116,11 +190,17 @@ class PwnedPasswords:
         headers = {"User-Agent": self.user_agent}
         if self.add_padding:
             headers["Add-Padding"] = "true"
-        response = self.client.get(
-            url=f"{self.api_endpoint}{prefix}",
-            headers=headers,
-            timeout=self.request_timeout,
-        )
+        start = time.perf_counter()
+        response = None
+        try:
+            with timing.measure(timing.NET):
+                response = self.client.get(
+                    url=f"{self.api_endpoint}{prefix}",
+                    headers=headers,
+                    timeout=self.request_timeout,
+                )
+        finally:
+            self._observe_request("sync", start, response)
         response.raise_for_status()
         return response
 
@@ -133,57 +213,105 @@ class PwnedPasswords:
         headers = {"User-Agent": self.user_agent}
         if self.add_padding:
             headers["Add-Padding"] = "true"
-        response = await self.async_client.get(
-            url=f"{self.api_endpoint}{prefix}",
-            headers=headers,
-            timeout=self.request_timeout,
-        )
+        start = time.perf_counter()
+        response = None
+        try:
+            with timing.measure(timing.NET):
+                response = await self.async_client.get(
+                    url=f"{self.api_endpoint}{prefix}",
+                    headers=headers,
+                    timeout=self.request_timeout,
+                )
+        finally:
+            self._observe_request("async", start, response)
         response.raise_for_status()
         return response
 
-    @sensitive_variables()
-    def check_password(self, password: str) -> int:
+    def _observe_request(
+        self, mode: str, start: float, response: typing.Optional[httpx.Response]
+    ) -> None:
         """
-        Check a password against the Pwned Passwords API and return the count of
-        times it appears in breaches in the Pwned Passwords database.
+        Record metrics for a request to Pwned Passwords which began at ``start`` (as
+        returned by :func:`time.perf_counter`).
 
-        :param password: The password to check.
+        """
+        self.metrics.observe_request(
+            mode,
+            time.perf_counter() - start,
+            None if response is None else len(response.content),
+        )
 
-        :raises TypeError: When the given password value is not a string.
+    def _fetch_range(self, prefix: str) -> typing.Mapping[str, int]:
+        """
+        Given a hash prefix, return a mapping of the hash suffixes Pwned Passwords
+        has for it to their breach counts.
 
-        :raises exceptions.PwnedPasswordsError: When the Pwned Passwords API times out,
-           returns an HTTP 4XX or 5XX status code, or when any other error occurs in
-           contacting the Pwned Passwords API or checking the password.
+        This and :meth:`_fetch_range_async` are the only methods which contact
+        Pwned Passwords, so a subclass can look up hashes elsewhere by overriding
+        them.
 
         """
-        if not isinstance(password, str):
-            raise TypeError("Password to check must be a string.")
-        try:
-            prefix, suffix = self._prepare_password(password)
-            response = self._request(prefix)
-            return self._get_hits(response.text, suffix)
-        except httpx.HTTPStatusError as exc:
-            logger.error(
-                "Pwned Passwords API replied with HTTP error status code "
-                f"{exc.response.status_code}."
+        return self._parse_hits(self._request(prefix).text)
+
+    async def _fetch_range_async(self, prefix: str) -> typing.Mapping[str, int]:
+        """
+        Asynchronous version of :meth:`_fetch_range`.
+
+        """
+        return self._parse_hits((await self._request_async(prefix)).text)
+
+    def _translate_error(
+        self, exc: Exception, prefix: typing.Optional[str] = None
+    ) -> exceptions.PwnedPasswordsError:
+        """
+        Given an exception raised while checking a password (or a hash prefix), log
+        it, record it in :attr:`metrics`, and return the equivalent
+        :exc:`~pwned_passwords_django.exceptions.PwnedPasswordsError`.
+
+        """
+        error = self._error_for(exc, prefix)
+        self.metrics.record_error(error.code)
+        return error
+
+    def _error_for(
+        self, exc: Exception, prefix: typing.Optional[str]
+    ) -> exceptions.PwnedPasswordsError:
+        """
+        Log the given exception, and return the equivalent
+        :exc:`~pwned_passwords_django.exceptions.PwnedPasswordsError`.
+
+        """
+        if isinstance(exc, httpx.HTTPStatusError):
+            throttle.log_error(
+                logger,
+                exceptions.ErrorCode.HTTP_ERROR,
+                "Pwned Passwords API replied with HTTP error status code %s.",
+                exc.response.status_code,
             )
-            raise exceptions.PwnedPasswordsError(
+            return exceptions.PwnedPasswordsError(
                 message="Pwned Passwords API replied with HTTP error status code.",
                 code=exceptions.ErrorCode.HTTP_ERROR,
                 params={"status_code": exc.response.status_code},
-            ) from exc
-        except httpx.TimeoutException as exc:
-            logger.error("Pwned Passwords API timed out.")
-            raise exceptions.PwnedPasswordsError(
+            )
+        if isinstance(exc, httpx.TimeoutException):
+            throttle.log_error(
+                logger,
+                exceptions.ErrorCode.API_TIMEOUT,
+                "Pwned Passwords API timed out.",
+            )
+            return exceptions.PwnedPasswordsError(
                 message="Pwned Passwords API timed out.",
                 code=exceptions.ErrorCode.API_TIMEOUT,
                 params={"timeout_threshold": self.request_timeout},
-            ) from exc
-        except httpx.RequestError as exc:
-            logger.error(
-                f"Error making request to Pwned Passwords: {exc.__class__.__name__}"
             )
-            raise exceptions.PwnedPasswordsError(
+        if isinstance(exc, httpx.RequestError):
+            throttle.log_error(
+                logger,
+                exceptions.ErrorCode.REQUEST_ERROR,
+                "Error making request to Pwned Passwords: %s",
+                exc.__class__.__name__,
+            )
+            return exceptions.PwnedPasswordsError(
                 message="Error making request to Pwned Passwords.",
                 code=exceptions.ErrorCode.REQUEST_ERROR,
                 params={
@@ -193,18 +321,44 @@ class PwnedPasswords:
                     "prefix": prefix,
                     "timeout": self.request_timeout,
                 },
-            ) from exc
-        except Exception as exc:
-            logger.error(
-                f"Error attempting to check password: {exc.__class__.__name__}"
             )
-            raise exceptions.PwnedPasswordsError(
-                message="Error attempting to check password.",
-                code=exceptions.ErrorCode.UNKNOWN_ERROR,
-                params={
-                    "exception_class": exc.__class__.__name__,
-                },
-            ) from exc
+        throttle.log_error(
+            logger,
+            exceptions.ErrorCode.UNKNOWN_ERROR,
+            "Error attempting to check password: %s",
+            exc.__class__.__name__,
+        )
+        return exceptions.PwnedPasswordsError(
+            message="Error attempting to check password.",
+            code=exceptions.ErrorCode.UNKNOWN_ERROR,
+            params={
+                "exception_class": exc.__class__.__name__,
+            },
+        )
+
+    @sensitive_variables()
+    def check_password(self, password: str) -> int:
+        """
+        Check a password against the Pwned Passwords API and return the count of
+        times it appears in breaches in the Pwned Passwords database.
+
+        :param password: The password to check.
+
+        :raises TypeError: When the given password value is not a string.
+
+        :raises exceptions.PwnedPasswordsError: When the Pwned Passwords API times out,
+           returns an HTTP 4XX or 5XX status code, or when any other error occurs in
+           contacting the Pwned Passwords API or checking the password.
+
+        """
+        if not isinstance(password, str):
+            raise TypeError("Password to check must be a string.")
+        prefix = None
+        try:
+            prefix, suffix = self._prepare_password(password)
+            return self._fetch_range(prefix).get(suffix, 0)
+        except Exception as exc:
+            raise self._translate_error(exc, prefix) from exc
 
     @sensitive_variables()
     async def check_password_async(self, password: str) -> int:
@@ -224,55 +378,230 @@ class PwnedPasswords:
         """
         if not isinstance(password, str):
             raise TypeError("Password to check must be a string.")
+        prefix = None
         try:
             prefix, suffix = self._prepare_password(password)
-            response = await self._request_async(prefix)
-            return self._get_hits(response.text, suffix)
-        except httpx.HTTPStatusError as exc:
-            logger.error(
-                "Pwned Passwords API replied with HTTP error status code "
-                f"{exc.response.status_code}."
-            )
-            raise exceptions.PwnedPasswordsError(
-                message="Pwned Passwords API replied with HTTP error status code.",
-                code=exceptions.ErrorCode.HTTP_ERROR,
-                params={"status_code": exc.response.status_code},
-            ) from exc
-        except httpx.TimeoutException as exc:
-            logger.error("Pwned Passwords API timed out.")
-            raise exceptions.PwnedPasswordsError(
-                message="Pwned Passwords API timed out.",
-                code=exceptions.ErrorCode.API_TIMEOUT,
-                params={"timeout_threshold": self.request_timeout},
-            ) from exc
-        except httpx.RequestError as exc:
-            logger.error(
-                f"Error making request to Pwned Passwords: {exc.__class__.__name__}"
-            )
-            raise exceptions.PwnedPasswordsError(
-                message="Error making request to Pwned Passwords.",
-                code=exceptions.ErrorCode.REQUEST_ERROR,
-                params={
-                    "add_padding": self.add_padding,
-                    "api_endpoint": self.api_endpoint,
-                    "exception_class": exc.__class__.__name__,
-                    "prefix": prefix,
-                    "timeout": self.request_timeout,
-                },
-            ) from exc
+            return (await self._fetch_range_async(prefix)).get(suffix, 0)
         except Exception as exc:
-            logger.error(
-                f"Error attempting to check password: {exc.__class__.__name__}"
-            )
-            raise exceptions.PwnedPasswordsError(
-                message="Error attempting to check password.",
-                code=exceptions.ErrorCode.UNKNOWN_ERROR,
-                params={
-                    "exception_class": exc.__class__.__name__,
-                },
-            ) from exc
+            raise self._translate_error(exc, prefix) from exc
+
+    @sensitive_variables()
+    def _group_by_prefix(
+        self, passwords: typing.Iterable[str]
+    ) -> typing.Dict[str, typing.Dict[str, str]]:
+        """
+        Given some passwords, return a mapping of each distinct hash prefix among
+        them to a mapping of the passwords having that prefix to their hash suffixes.
+
+        """
+        by_prefix: typing.Dict[str, typing.Dict[str, str]] = {}
+        for password in passwords:
+            if not isinstance(password, str):
+                raise TypeError("Password to check must be a string.")
+            prefix, suffix = self._prepare_password(password)
+            by_prefix.setdefault(prefix, {})[password] = suffix
+        return by_prefix
+
+    def _check_prefix(self, prefix: str) -> RangeResult:
+        """
+        Given a hash prefix, return a mapping of the hash suffixes Pwned Passwords
+        has for it to their breach counts, or the error encountered in fetching them.
+
+        """
+        try:
+            return self._fetch_range(prefix)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            return self._translate_error(exc, prefix)
+
+    async def _check_prefix_async(
+        self, prefix: str, semaphore: asyncio.Semaphore
+    ) -> RangeResult:
+        """
+        Asynchronous version of :meth:`_check_prefix`, which waits on the given
+        semaphore before making the request.
+
+        """
+        async with semaphore:
+            try:
+                return await self._fetch_range_async(prefix)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                return self._translate_error(exc, prefix)
+
+    @staticmethod
+    @sensitive_variables()
+    def _batch_results(
+        by_prefix: typing.Dict[str, typing.Dict[str, str]],
+        ranges: typing.Iterable[RangeResult],
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Given passwords grouped by hash prefix, and the result of fetching each
+        prefix, return the result for each password.
+
+        """
+        results: typing.Dict[str, BatchResult] = {}
+        for suffixes, hits in zip(by_prefix.values(), ranges):
+            for password, suffix in suffixes.items():
+                if isinstance(hits, exceptions.PwnedPasswordsError):
+                    results[password] = hits
+                else:
+                    results[password] = hits.get(suffix, 0)
+        return results
+
+    @sensitive_variables()
+    def check_passwords(
+        self,
+        passwords: typing.Iterable[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Check many passwords against the Pwned Passwords API, and return a
+        :class:`dict` mapping each distinct password to either the count of times it
+        appears in breaches in the Pwned Passwords database, or -- if the request for
+        its hash prefix failed -- the
+        :exc:`~pwned_passwords_django.exceptions.PwnedPasswordsError` describing the
+        failure.
+
+        Each distinct hash prefix is requested only once, no matter how many of the
+        passwords share it, and up to ``max_concurrency`` requests are made at a time,
+        on a thread pool. A failure to fetch one prefix does not affect the passwords
+        having other prefixes.
+
+        :param passwords: The passwords to check.
+        :param max_concurrency: The maximum number of simultaneous requests to make.
+
+        :raises TypeError: When any of the given password values is not a string.
+
+        """
+        return self._check_grouped(self._group_by_prefix(passwords), max_concurrency)
+
+    @sensitive_variables()
+    async def check_passwords_async(
+        self,
+        passwords: typing.Iterable[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Asynchronous version of :meth:`check_passwords`, which makes up to
+        ``max_concurrency`` requests at a time with the asynchronous HTTP client.
+
+        :raises TypeError: When any of the given password values is not a string.
+
+        """
+        return await self._check_grouped_async(
+            self._group_by_prefix(passwords), max_concurrency
+        )
+
+    @staticmethod
+    def _group_hashes(
+        hashes: typing.Iterable[str],
+    ) -> typing.Dict[str, typing.Dict[str, str]]:
+        """
+        Given some SHA-1 hashes in hexadecimal, return a mapping of each distinct
+        hash prefix among them to a mapping of the hashes having that prefix to their
+        suffixes.
+
+        """
+        by_prefix: typing.Dict[str, typing.Dict[str, str]] = {}
+        for password_hash in hashes:
+            if not isinstance(password_hash, str):
+                raise TypeError("Hash to check must be a string.")
+            if len(password_hash) != 40 or not HEX_RE.fullmatch(password_hash):
+                raise ValueError("Hash to check must be 40 hexadecimal digits.")
+            upper = password_hash.upper()
+            by_prefix.setdefault(upper[:5], {})[password_hash] = upper[5:]
+        return by_prefix
+
+    def check_hashes(
+        self,
+        hashes: typing.Iterable[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Check many SHA-1 hashes of passwords, in hexadecimal, against the Pwned
+        Passwords API, in the same way as :meth:`check_passwords`, and return a
+        :class:`dict` mapping each distinct hash to its breach count or the error
+        encountered in checking it. This allows checking passwords which are only
+        available as unsalted SHA-1 hashes.
+
+        :param hashes: The hashes to check.
+        :param max_concurrency: The maximum number of simultaneous requests to make.
+
+        :raises TypeError: When any of the given hashes is not a string.
+
+        :raises ValueError: When any of the given hashes is not 40 hexadecimal
+           digits.
+
+        """
+        return self._check_grouped(self._group_hashes(hashes), max_concurrency)
+
+    async def check_hashes_async(
+        self,
+        hashes: typing.Iterable[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Asynchronous version of :meth:`check_hashes`.
+
+        :raises TypeError: When any of the given hashes is not a string.
+
+        :raises ValueError: When any of the given hashes is not 40 hexadecimal
+           digits.
+
+        """
+        return await self._check_grouped_async(
+            self._group_hashes(hashes), max_concurrency
+        )
+
+    def _check_grouped(
+        self,
+        by_prefix: typing.Dict[str, typing.Dict[str, str]],
+        max_concurrency: int,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Given values grouped by hash prefix, fetch each prefix, up to
+        ``max_concurrency`` at a time on a thread pool, and return the result for
+        each value.
+
+        """
+        if not by_prefix:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_concurrency, len(by_prefix))
+        ) as executor:
+            ranges = list(executor.map(self._check_prefix, by_prefix))
+        return self._batch_results(by_prefix, ranges)
+
+    async def _check_grouped_async(
+        self,
+        by_prefix: typing.Dict[str, typing.Dict[str, str]],
+        max_concurrency: int,
+    ) -> typing.Dict[str, BatchResult]:
+        """
+        Asynchronous version of :meth:`_check_grouped`.
+
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        ranges = await asyncio.gather(
+            *(self._check_prefix_async(prefix, semaphore) for prefix in by_prefix)
+        )
+        return self._batch_results(by_prefix, ranges)
+
+
+def _default_client() -> PwnedPasswords:
+    """
+    Return a new instance of the :class:`PwnedPasswords` subclass named by
+    ``settings.PWNED_PASSWORDS["API_CLIENT"]``, or of :class:`PwnedPasswords` itself
+    if that setting is not provided.
+
+    """
+    path = getattr(settings, "PWNED_PASSWORDS", {}).get("API_CLIENT")
+    return PwnedPasswords() if path is None else import_string(path)()
 
 
-default_client = PwnedPasswords()
+default_client = _default_client()
 check_password = default_client.check_password
 check_password_async = default_client.check_password_async
+check_passwords = default_client.check_passwords
+check_passwords_async = default_client.check_passwords_async
+check_hashes = default_client.check_hashes
+check_hashes_async = default_client.check_hashes_async
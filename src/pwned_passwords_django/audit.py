@@ -0,0 +1,389 @@
+"""
+Auditing a large file of passwords, or of their SHA-1 hashes, or the unsalted SHA-1
+password hashes of users, against Pwned Passwords.
+
+The file is read and checked a chunk of lines at a time, so memory use does not grow
+with the size of the file. Hashing is spread across a pool of processes, and breach
+counts are looked up either in the bulk index of a local mirror (see
+:mod:`pwned_passwords_django.bulk`) or with
+:meth:`~pwned_passwords_django.api.PwnedPasswords.check_hashes`, which makes
+concurrent requests and honors the ``API_CLIENT`` setting -- so an audit can also
+run against the database mirror.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import collections
+import concurrent.futures
+import csv
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import typing
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import AbstractBaseUser
+
+from . import api, bulk, exceptions
+
+PLAINTEXT = "plaintext"
+SHA1 = "sha1"
+INPUT_FORMATS = (PLAINTEXT, SHA1)
+
+# The default number of lines read, hashed and checked at once.
+DEFAULT_CHUNK_SIZE: int = 10_000
+
+# The prefix of passwords encoded by Django's UnsaltedSHA1PasswordHasher, which
+# stores a bare SHA-1 hash of the password.
+UNSALTED_SHA1_PREFIX = "sha1$$"
+
+# The columns of the audit's output.
+OUTPUT_HEADER = ("line", "sha1", "count")
+
+Path = typing.Union[str, pathlib.Path]
+
+# A resolver takes a list of SHA-1 hashes, in uppercase hexadecimal, and returns a
+# mapping of each of them to its breach count.
+Resolver = typing.Callable[[typing.List[str]], typing.Mapping[str, int]]
+
+
+class Progress(typing.NamedTuple):
+    """
+    How far an audit has progressed through its input.
+
+    """
+
+    #: The position in the input, in bytes, after the last line checked.
+    offset: int
+    #: The number of lines checked.
+    lines: int
+    #: The number of lines found to be compromised.
+    compromised: int
+    #: The number of lines which could not be checked, because they were blank or,
+    #: in SHA-1 input, not a valid hash.
+    skipped: int
+    #: When the audit records a checkpoint, the position in its output after the
+    #: results for the lines checked, as returned by the output's ``tell()``.
+    output_offset: typing.Optional[int] = None
+
+
+def hash_lines(
+    lines: typing.List[bytes], input_format: str
+) -> typing.List[typing.Optional[str]]:
+    """
+    Return the SHA-1 hash, in uppercase hexadecimal, of each of the given lines, or
+    ``None`` for a line which cannot be checked.
+
+    For plaintext input, each line is a password, which is hashed as is, without its
+    line ending; blank lines cannot be checked. For SHA-1 input, each line begins
+    with a hash in hexadecimal, optionally followed by a colon and anything else, as
+    in the downloadable Pwned Passwords dataset; lines which do not cannot be
+    checked.
+
+    This is a module-level function so that it can be run in a process pool.
+
+    """
+    hashes: typing.List[typing.Optional[str]] = []
+    for line in lines:
+        if input_format == SHA1:
+            value = line.split(b":", 1)[0].strip()
+            hashes.append(
+                value.decode("ascii").upper()
+                if len(value) == 40 and api.HEX_RE.fullmatch(value.decode("latin-1"))
+                else None
+            )
+            continue
+        password = line.rstrip(b"\r\n")
+        # See the comment in api.PwnedPasswords._prepare_password() regarding the
+        # use of hashlib.new() and usedforsecurity=False.
+        hashes.append(
+            hashlib.new("sha1", password, usedforsecurity=False).hexdigest().upper()
+            if password
+            else None
+        )
+    return hashes
+
+
+def mirror_resolver(directory: Path) -> Resolver:
+    """
+    Return a resolver which looks hashes up in the bulk index of the local mirror in
+    the given directory.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When NumPy is not
+       installed, or the directory does not contain a bulk index.
+
+    """
+    index = bulk.BulkIndex(directory)
+
+    def resolve(hashes: typing.List[str]) -> typing.Mapping[str, int]:
+        """
+        Look the hashes up in the bulk index.
+
+        """
+        return dict(zip(hashes, index.lookup(bulk.digests_from_hex(hashes)).tolist()))
+
+    return resolve
+
+
+def api_resolver(
+    client: typing.Optional[api.PwnedPasswords] = None,
+    max_concurrency: int = api.DEFAULT_BATCH_CONCURRENCY,
+) -> Resolver:
+    """
+    Return a resolver which checks hashes with
+    :meth:`~pwned_passwords_django.api.PwnedPasswords.check_hashes`, using the given
+    client or, by default, the default client.
+
+    The resolver raises the first error encountered, since an audit cannot report a
+    result for a hash which could not be checked.
+
+    """
+
+    def resolve(hashes: typing.List[str]) -> typing.Mapping[str, int]:
+        """
+        Check the hashes.
+
+        """
+        results = (client or api.default_client).check_hashes(hashes, max_concurrency)
+        for result in results.values():
+            if isinstance(result, exceptions.PwnedPasswordsError):
+                raise result
+        return typing.cast(typing.Mapping[str, int], results)
+
+    return resolve
+
+
+def load_checkpoint(checkpoint: Path, source: Path) -> typing.Optional[Progress]:
+    """
+    Return the progress recorded in the given checkpoint file for an audit of the
+    given source file, or ``None`` if there is no checkpoint file.
+
+    :raises ValueError: When the checkpoint is for a different source file, or is
+       not a valid checkpoint.
+
+    """
+    try:
+        with open(checkpoint, encoding="utf-8") as checkpoint_file:
+            state = json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+    try:
+        recorded_source = state.pop("source")
+        progress = Progress(**state)
+    except (AttributeError, KeyError, TypeError) as exc:
+        raise ValueError(f"{checkpoint} is not a valid audit checkpoint.") from exc
+    if recorded_source != os.path.abspath(source):
+        raise ValueError(f"{checkpoint} is a checkpoint for {recorded_source}.")
+    return progress
+
+
+def save_checkpoint(checkpoint: Path, source: Path, progress: Progress) -> None:
+    """
+    Record the progress of an audit of the given source file in the given
+    checkpoint file. The file is replaced atomically, so an interrupted audit always
+    leaves a complete checkpoint behind.
+
+    """
+    temporary = f"{checkpoint}.tmp"
+    with open(temporary, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(
+            {"source": os.path.abspath(source), **progress._asdict()}, checkpoint_file
+        )
+    os.replace(temporary, checkpoint)
+
+
+def unsalted_sha1_hash(encoded: str) -> typing.Optional[str]:
+    """
+    Return the SHA-1 hash, in uppercase hexadecimal, stored in a password encoded by
+    Django's ``UnsaltedSHA1PasswordHasher``, or ``None`` if the password was encoded
+    in some other way.
+
+    """
+    if not encoded.startswith(UNSALTED_SHA1_PREFIX):
+        return None
+    value = encoded[len(UNSALTED_SHA1_PREFIX) :]
+    return value.upper() if len(value) == 40 and api.HEX_RE.fullmatch(value) else None
+
+
+def check_unsalted_sha1_users(
+    resolve: Resolver,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    using: typing.Optional[str] = None,
+) -> typing.Iterator[typing.Tuple[AbstractBaseUser, int]]:
+    """
+    Check the password of every user whose password is stored as an unsalted SHA-1
+    hash, and yield each such user with the breach count of their password.
+
+    The stored hash is exactly what Pwned Passwords indexes, so no plaintext is
+    needed. Users are read with :meth:`~django.db.models.query.QuerySet.iterator`,
+    ``chunk_size`` at a time, and each chunk is checked at once, so memory use does
+    not grow with the number of users.
+
+    :param resolve: The resolver to look up breach counts with; see
+       :func:`mirror_resolver` and :func:`api_resolver`.
+    :param chunk_size: The number of users to read and check at once.
+    :param using: The alias of the database to read users from.
+
+    :raises pwned_passwords_django.exceptions.PwnedPasswordsError: When looking up
+       breach counts fails.
+
+    """
+    user_model = get_user_model()
+    users = (
+        user_model._default_manager.using(using)
+        .filter(password__startswith=UNSALTED_SHA1_PREFIX)
+        .only("pk", user_model.USERNAME_FIELD, "password")
+        .order_by("pk")
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = [
+            (user, unsalted_sha1_hash(user.password))
+            for user in itertools.islice(users, chunk_size)
+        ]
+        if not chunk:
+            return
+        counts = resolve(list({value for _, value in chunk if value is not None}))
+        for user, value in chunk:
+            if value is not None:
+                yield user, counts[value]
+
+
+def _read_chunks(
+    source: typing.BinaryIO, chunk_size: int
+) -> typing.Iterator[typing.Tuple[typing.List[bytes], int]]:
+    """
+    Yield each chunk of ``chunk_size`` lines of the source file, and the position in
+    the file after it.
+
+    """
+    while True:
+        lines = list(itertools.islice(source, chunk_size))
+        if not lines:
+            return
+        yield lines, source.tell()
+
+
+def run_audit(  # pylint: disable=too-many-arguments,too-many-locals
+    source: Path,
+    output: typing.TextIO,
+    resolve: Resolver,
+    input_format: str = PLAINTEXT,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    processes: int = 1,
+    checkpoint: typing.Optional[Path] = None,
+    start: typing.Optional[Progress] = None,
+    progress: typing.Optional[typing.Callable[[Progress], None]] = None,
+) -> Progress:
+    """
+    Audit the passwords, or SHA-1 hashes of passwords, in the source file, writing a
+    CSV row to ``output`` -- the line number, SHA-1 hash and breach count -- for each
+    line found to be compromised, and return the final progress of the audit.
+    Passwords themselves are never written.
+
+    :param source: The path to the file to audit.
+    :param output: The stream to write results to. Results are flushed after each
+       chunk.
+    :param resolve: The resolver to look up breach counts with; see
+       :func:`mirror_resolver` and :func:`api_resolver`.
+    :param input_format: :data:`PLAINTEXT` or :data:`SHA1`.
+    :param chunk_size: The number of lines to read, hash and check at once.
+    :param processes: The number of processes to hash lines in. With ``1``, lines
+       are hashed in the current process.
+    :param checkpoint: The path of a file in which to record the audit's progress
+       after each chunk, which is removed when the audit completes. ``output`` must
+       then be seekable.
+    :param start: Progress from which to resume an interrupted audit, as returned by
+       :func:`load_checkpoint`. The CSV header is only written when not resuming,
+       and ``output`` is first truncated to the position recorded in the
+       checkpoint, discarding any results written after it was saved.
+    :param progress: A function to call with the audit's progress after each chunk.
+
+    :raises pwned_passwords_django.exceptions.PwnedPasswordsError: When looking up
+       breach counts fails. Progress up to the last complete chunk is kept in the
+       checkpoint file.
+
+    """
+    writer = csv.writer(output)
+    if start is None:
+        start = Progress(offset=0, lines=0, compromised=0, skipped=0)
+        writer.writerow(OUTPUT_HEADER)
+    elif start.output_offset is not None:
+        # Results are written before the checkpoint is saved, so an audit which
+        # stopped in between wrote results which will be written again.
+        output.seek(start.output_offset)
+        output.truncate()
+    current = start
+    with open(source, "rb") as source_file, (
+        concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+        if processes > 1
+        else _InlineExecutor()
+    ) as executor:
+        source_file.seek(start.offset)
+        # Keep a bounded number of chunks in flight, so that hashing runs ahead of
+        # checking without reading the whole file into memory.
+        pending: typing.Deque[typing.Tuple[concurrent.futures.Future, int, int]] = (
+            collections.deque()
+        )
+        chunks = _read_chunks(source_file, chunk_size)
+        while True:
+            for lines, offset in itertools.islice(chunks, 2 * processes - len(pending)):
+                pending.append(
+                    (
+                        executor.submit(hash_lines, lines, input_format),
+                        len(lines),
+                        offset,
+                    )
+                )
+            if not pending:
+                break
+            future, line_count, offset = pending.popleft()
+            hashes = future.result()
+            unique = {value for value in hashes if value is not None}
+            # Most lines are usually not compromised, so only look for lines whose
+            # hash is among those that are.
+            counts = {
+                value: count for value, count in resolve(list(unique)).items() if count
+            }
+            compromised = 0
+            if counts:
+                for number, value in enumerate(hashes, start=current.lines + 1):
+                    if value in counts:
+                        writer.writerow((number, value, counts[value]))
+                        compromised += 1
+            output.flush()
+            current = Progress(
+                offset=offset,
+                lines=current.lines + line_count,
+                compromised=current.compromised + compromised,
+                skipped=current.skipped + hashes.count(None),
+                output_offset=output.tell() if checkpoint is not None else None,
+            )
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, source, current)
+            if progress is not None:
+                progress(current)
+    if checkpoint is not None:
+        pathlib.Path(checkpoint).unlink(missing_ok=True)
+    return current
+
+
+class _InlineExecutor(concurrent.futures.Executor):
+    """
+    An executor which runs each function immediately in the current process.
+
+    """
+
+    def submit(  # pylint: disable=arguments-differ
+        self, fn: typing.Callable, *args: typing.Any, **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        """
+        Run the function, and return a completed future of its result.
+
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
@@ -0,0 +1,325 @@
+"""
+Bounded queues for deferred work, such as checks whose results are not needed to
+finish handling the current request.
+
+Work submitted to a queue runs in the background -- on a thread pool for
+synchronous code (:class:`BackgroundQueue`), or as tasks on the event loop for
+asynchronous code (:class:`AsyncBackgroundQueue`) -- and the number of items of work
+pending at once is limited, so that under load deferred work cannot pile up without
+bound. When a queue is full, its policy decides what happens to new work:
+
+* :data:`DROP_NEW` sheds the new work.
+
+* :data:`DROP_OLDEST` cancels the oldest pending work which can still be cancelled,
+  to make room for the new work.
+
+* :data:`REJECT` raises :exc:`~pwned_passwords_django.exceptions.QueueFull`.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+import concurrent.futures
+import threading
+import typing
+import weakref
+
+from django.conf import settings
+
+from . import api
+from .exceptions import QueueClosed, QueueFull
+
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+REJECT = "reject"
+POLICIES = (DROP_NEW, DROP_OLDEST, REJECT)
+
+# The default maximum number of items of work pending at once in a queue.
+DEFAULT_QUEUE_SIZE: int = 1000
+
+_queue: typing.Optional["BackgroundQueue"] = None
+_queue_lock = threading.Lock()
+_async_queues: typing.MutableMapping[
+    asyncio.AbstractEventLoop, "AsyncBackgroundQueue"
+] = weakref.WeakKeyDictionary()
+
+
+def _check_policy(policy: str) -> str:
+    """
+    Return the given queue policy, if it is valid.
+
+    :raises ValueError: When it is not.
+
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown background queue policy {policy!r}.")
+    return policy
+
+
+def _cancelled_future(
+    future: "typing.Union[concurrent.futures.Future, asyncio.Future]",
+) -> typing.Any:
+    """
+    Cancel and return the given future, which stands for shed work.
+
+    """
+    future.cancel()
+    return future
+
+
+class BackgroundQueue:
+    """
+    A bounded queue of work run on a pool of threads, for synchronous code.
+
+    :param max_workers: The number of threads to run work on.
+    :param max_size: The maximum number of items of work, running or waiting to
+       run, pending at once.
+    :param policy: What to do with new work when the queue is full; one of
+       :data:`DROP_NEW`, :data:`DROP_OLDEST` or :data:`REJECT`.
+
+    :raises ValueError: When the policy is not valid.
+
+    """
+
+    def __init__(
+        self,
+        max_workers: int = api.EXECUTOR_MAX_WORKERS,
+        max_size: int = DEFAULT_QUEUE_SIZE,
+        policy: str = DROP_NEW,
+    ) -> None:
+        self.max_size = max_size
+        self.policy = _check_policy(policy)
+        #: The number of items of work shed or cancelled because the queue was full.
+        self.dropped = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"{api.THREAD_NAME_PREFIX}_background",
+        )
+        # Pending work, in the order it was submitted.
+        self._pending: typing.Dict[concurrent.futures.Future, None] = {}
+        # Reentrant, since cancelling a future calls _discard() immediately.
+        self._lock = threading.RLock()
+        self._closed = False
+
+    def __len__(self) -> int:
+        """
+        Return the number of items of work pending.
+
+        """
+        return len(self._pending)
+
+    def _discard(self, future: concurrent.futures.Future) -> None:
+        """
+        Forget the given future, once its work has finished.
+
+        """
+        with self._lock:
+            self._pending.pop(future, None)
+
+    def _make_room(self) -> bool:
+        """
+        Apply the queue's policy to make room for new work, returning whether there
+        is now room. Must be called with the lock held.
+
+        """
+        if self.policy == REJECT:
+            raise QueueFull(f"Background queue is full ({self.max_size} pending).")
+        if self.policy == DROP_OLDEST:
+            for future in self._pending:
+                if future.cancel():
+                    self._pending.pop(future, None)
+                    self.dropped += 1
+                    return True
+        self.dropped += 1
+        return False
+
+    def submit(
+        self, fn: typing.Callable, *args: typing.Any, **kwargs: typing.Any
+    ) -> concurrent.futures.Future:
+        """
+        Submit a function to be called with the given arguments in the background,
+        and return a future for its result. If the work is shed, the future is
+        already cancelled.
+
+        :raises pwned_passwords_django.exceptions.QueueFull: When the queue is full
+           and its policy is :data:`REJECT`.
+
+        :raises pwned_passwords_django.exceptions.QueueClosed: When the queue has
+           been drained.
+
+        """
+        with self._lock:
+            if self._closed:
+                raise QueueClosed("Cannot submit work to a drained background queue.")
+            if len(self._pending) >= self.max_size and not self._make_room():
+                return _cancelled_future(concurrent.futures.Future())
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._pending[future] = None
+        # Added outside the lock, since a callback added to a future which is already
+        # done is called immediately.
+        future.add_done_callback(self._discard)
+        return future
+
+    def check_password(self, password: str) -> concurrent.futures.Future:
+        """
+        Submit a check of the given password with
+        :func:`~pwned_passwords_django.api.check_password`, and return a future for
+        its breach count.
+
+        """
+        return self.submit(api.check_password, password)
+
+    def drain(self, timeout: typing.Optional[float] = None) -> bool:
+        """
+        Stop accepting work, and wait up to ``timeout`` seconds (by default, for as
+        long as it takes) for pending work to finish. Work still waiting to run after
+        that is cancelled. Return whether all pending work finished.
+
+        """
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending)
+        _, not_done = concurrent.futures.wait(pending, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        return not not_done
+
+
+class AsyncBackgroundQueue:
+    """
+    A bounded set of tasks run on the event loop, for asynchronous code.
+
+    :param max_size: The maximum number of tasks pending at once.
+    :param policy: What to do with new work when the queue is full; one of
+       :data:`DROP_NEW`, :data:`DROP_OLDEST` or :data:`REJECT`.
+
+    :raises ValueError: When the policy is not valid.
+
+    """
+
+    def __init__(
+        self, max_size: int = DEFAULT_QUEUE_SIZE, policy: str = DROP_NEW
+    ) -> None:
+        self.max_size = max_size
+        self.policy = _check_policy(policy)
+        #: The number of items of work shed or cancelled because the queue was full.
+        self.dropped = 0
+        # Pending tasks, in the order they were submitted.
+        self._tasks: typing.Dict[asyncio.Task, None] = {}
+        self._closed = False
+
+    def __len__(self) -> int:
+        """
+        Return the number of tasks pending.
+
+        """
+        return len(self._tasks)
+
+    def submit(
+        self,
+        fn: typing.Callable[..., typing.Awaitable[typing.Any]],
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> "asyncio.Future[typing.Any]":
+        """
+        Start a task running the given coroutine function with the given arguments,
+        and return it. If the work is shed, a cancelled future is returned instead,
+        and the coroutine function is not called. Must be called from a running
+        event loop.
+
+        :raises pwned_passwords_django.exceptions.QueueFull: When the queue is full
+           and its policy is :data:`REJECT`.
+
+        :raises pwned_passwords_django.exceptions.QueueClosed: When the queue has
+           been drained.
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._closed:
+            raise QueueClosed("Cannot submit work to a drained background queue.")
+        if len(self._tasks) >= self.max_size:
+            if self.policy == REJECT:
+                raise QueueFull(f"Background queue is full ({self.max_size} pending).")
+            self.dropped += 1
+            if self.policy == DROP_NEW:
+                return _cancelled_future(loop.create_future())
+            oldest = next(iter(self._tasks))
+            self._tasks.pop(oldest)
+            oldest.cancel()
+        task = loop.create_task(fn(*args, **kwargs))
+        self._tasks[task] = None
+        task.add_done_callback(lambda task: self._tasks.pop(task, None))
+        return task
+
+    def check_password(self, password: str) -> "asyncio.Future[int]":
+        """
+        Start a check of the given password with
+        :func:`~pwned_passwords_django.api.check_password_async`, and return a task
+        for its breach count.
+
+        """
+        return self.submit(api.check_password_async, password)
+
+    async def drain(self, timeout: typing.Optional[float] = None) -> bool:
+        """
+        Stop accepting work, and wait up to ``timeout`` seconds (by default, for as
+        long as it takes) for pending tasks to finish. Tasks still running after that
+        are cancelled. Return whether all pending tasks finished.
+
+        """
+        self._closed = True
+        if not self._tasks:
+            return True
+        _, not_done = await asyncio.wait(list(self._tasks), timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        await asyncio.gather(*not_done, return_exceptions=True)
+        return not not_done
+
+
+def _queue_settings() -> typing.Tuple[int, str]:
+    """
+    Return the queue size and policy set in
+    ``settings.PWNED_PASSWORDS["BACKGROUND_QUEUE_SIZE"]`` and
+    ``settings.PWNED_PASSWORDS["BACKGROUND_QUEUE_POLICY"]``.
+
+    """
+    config = getattr(settings, "PWNED_PASSWORDS", {})
+    return (
+        config.get("BACKGROUND_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+        config.get("BACKGROUND_QUEUE_POLICY", DROP_NEW),
+    )
+
+
+def get_queue() -> BackgroundQueue:
+    """
+    Return the background queue shared by the synchronous code of
+    ``pwned-passwords-django`` for deferred work, creating it if necessary.
+
+    """
+    global _queue  # pylint: disable=global-statement
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                max_size, policy = _queue_settings()
+                _queue = BackgroundQueue(max_size=max_size, policy=policy)
+    return _queue
+
+
+def get_async_queue() -> AsyncBackgroundQueue:
+    """
+    Return the background queue shared by the asynchronous code of
+    ``pwned-passwords-django`` running on the current event loop, creating it if
+    necessary. Must be called from a running event loop.
+
+    """
+    loop = asyncio.get_running_loop()
+    queue = _async_queues.get(loop)
+    if queue is None:
+        max_size, policy = _queue_settings()
+        queue = _async_queues[loop] = AsyncBackgroundQueue(
+            max_size=max_size, policy=policy
+        )
+    return queue
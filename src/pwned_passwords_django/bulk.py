@@ -0,0 +1,154 @@
+"""
+Vectorized lookup of many SHA-1 hashes at once against a local mirror, using NumPy.
+
+This requires NumPy, which is not installed by default; install it with
+``pip install pwned-passwords-django[bulk]``.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pathlib
+import typing
+
+from django.core.exceptions import ImproperlyConfigured
+
+from . import api, mirror
+from .fallback import SHA1_DIGEST_SIZE
+
+
+def _numpy() -> typing.Any:
+    """
+    Import and return NumPy.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When NumPy is not
+       installed.
+
+    """
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            "Bulk lookups require NumPy; install pwned-passwords-django[bulk]."
+        ) from exc
+    return numpy
+
+
+def digests_from_hex(hashes: typing.Iterable[str]) -> typing.Any:
+    """
+    Convert SHA-1 hashes in hexadecimal to an array of digests, with one row of 20
+    bytes for each hash, for use with :meth:`BulkIndex.lookup`.
+
+    :raises ValueError: When any of the hashes is not 40 hexadecimal digits.
+
+    """
+    np = _numpy()
+    hashes = list(hashes)
+    # Each hash is checked on its own, since hashes of the wrong lengths could still
+    # add up to the right total length, misaligning the rows.
+    if not all(
+        len(sha1_hash) == 40 and api.HEX_RE.fullmatch(sha1_hash) for sha1_hash in hashes
+    ):
+        raise ValueError("Each hash must be 40 hexadecimal digits.")
+    data = bytes.fromhex("".join(hashes))
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, SHA1_DIGEST_SIZE)
+
+
+class BulkIndex:
+    """
+    The bulk index of a local mirror, built by
+    :func:`~pwned_passwords_django.mirror.build_mirror` with ``bulk_index=True``.
+
+    The index's arrays are memory-mapped, so only the parts actually searched are
+    read into memory, and every search runs in NumPy rather than in Python.
+
+    :param directory: The path to the mirror directory.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When NumPy is not
+       installed, or the directory does not contain a valid bulk index.
+
+    """
+
+    def __init__(self, directory: typing.Union[str, pathlib.Path]) -> None:
+        np = _numpy()
+        directory = pathlib.Path(directory)
+        sizes = [
+            (directory / name).stat().st_size // item_size
+            for name, item_size in (
+                (mirror.BULK_HIGH_FILE, mirror.BULK_HIGH.size),
+                (mirror.BULK_LOW_FILE, mirror.BULK_LOW.size),
+                (mirror.BULK_COUNTS_FILE, mirror.BULK_COUNT.size),
+            )
+        ]
+        if len(set(sizes)) != 1:
+            raise ImproperlyConfigured(f"{directory} does not contain a bulk index.")
+        if not sizes[0]:
+            # NumPy cannot memory-map an empty file.
+            self.high = np.zeros(0, dtype="<u8")
+            self.low = np.zeros(0, dtype=[("mid", "<u8"), ("tail", "<u4")])
+            self.counts = np.zeros(0, dtype="<u4")
+            return
+        self.high = np.memmap(directory / mirror.BULK_HIGH_FILE, dtype="<u8", mode="r")
+        self.low = np.memmap(
+            directory / mirror.BULK_LOW_FILE,
+            dtype=[("mid", "<u8"), ("tail", "<u4")],
+            mode="r",
+        )
+        self.counts = np.memmap(
+            directory / mirror.BULK_COUNTS_FILE, dtype="<u4", mode="r"
+        )
+
+    def __len__(self) -> int:
+        """
+        Return the number of hashes in the index.
+
+        """
+        return len(self.high)
+
+    def lookup(self, digests: typing.Any) -> typing.Any:
+        """
+        Return an array of the breach count of each of the given SHA-1 digests, with
+        ``0`` for those not in the index.
+
+        :param digests: The digests, as an array with one row of 20 bytes for each
+           (see :func:`digests_from_hex`), or as :class:`bytes` holding them one
+           after another.
+
+        """
+        np = _numpy()
+        digests = (
+            np.frombuffer(digests, dtype=np.uint8)
+            if isinstance(digests, (bytes, bytearray, memoryview))
+            else np.asarray(digests, dtype=np.uint8)
+        )
+        digests = np.ascontiguousarray(digests.reshape(-1, SHA1_DIGEST_SIZE))
+        high = digests[:, :8].copy().view(">u8").ravel().astype(np.uint64)
+        mid = digests[:, 8:16].copy().view(">u8").ravel().astype(np.uint64)
+        tail = digests[:, 16:].copy().view(">u4").ravel().astype(np.uint32)
+
+        # Searching in sorted order lets each search start where the last ended,
+        # and reads the index sequentially.
+        order = np.argsort(high, kind="stable")
+        left = np.empty(len(high), dtype=np.intp)
+        right = np.empty(len(high), dtype=np.intp)
+        left[order] = np.searchsorted(self.high, high[order], side="left")
+        right[order] = np.searchsorted(self.high, high[order], side="right")
+
+        counts = np.zeros(len(high), dtype=np.uint32)
+        candidates = np.flatnonzero(left < right)
+        first = left[candidates]
+        low = self.low[first]
+        exact = (low["mid"] == mid[candidates]) & (low["tail"] == tail[candidates])
+        counts[candidates[exact]] = self.counts[first[exact]]
+
+        # Rarely, several hashes share their leading eight bytes; the remaining
+        # candidates for those are checked one by one.
+        for position in candidates[~exact & (right[candidates] - first > 1)]:
+            for index in range(left[position] + 1, right[position]):
+                if (
+                    self.low[index]["mid"] == mid[position]
+                    and self.low[index]["tail"] == tail[position]
+                ):
+                    counts[position] = self.counts[index]
+                    break
+        return counts
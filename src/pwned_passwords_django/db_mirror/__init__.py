@@ -0,0 +1,5 @@
+"""
+An optional application storing a mirror of the Pwned Passwords dataset in the
+database.
+
+"""
@@ -0,0 +1,19 @@
+"""
+Application configuration for the database mirror.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.apps import AppConfig
+
+
+class DatabaseMirrorConfig(AppConfig):
+    """
+    Configuration for the database mirror of the Pwned Passwords dataset.
+
+    """
+
+    name = "pwned_passwords_django.db_mirror"
+    label = "pwned_passwords_db_mirror"
+    verbose_name = "Pwned Passwords database mirror"
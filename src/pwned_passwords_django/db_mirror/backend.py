@@ -0,0 +1,294 @@
+"""
+Loading the Pwned Passwords dataset into the database mirror, and checking passwords
+against it.
+
+Each hash prefix is stored as a single row, whose ``hashes`` column packs the
+prefix's hash suffixes and breach counts into fixed-size binary records, sorted by
+suffix. Checking a password is then one indexed read, and a binary search of the
+packed records.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import bisect
+import collections.abc
+import contextlib
+import itertools
+import struct
+import time
+import typing
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, transaction
+
+from .. import api, mirror, timing
+
+# Each record is a hash suffix -- 35 hexadecimal digits, stored in 18 bytes -- and a
+# breach count, as an unsigned 32-bit integer.
+RECORD = struct.Struct(">18sI")
+SUFFIX_SIZE: int = 18
+MAX_COUNT: int = 2**32 - 1
+
+# The default number of rows written to the database at once when loading.
+DEFAULT_BATCH_SIZE: int = 1000
+
+# The number of rows read from the database at once when checking many passwords.
+READ_BATCH_SIZE: int = 500
+
+
+def pack_range(entries: typing.Iterable[typing.Tuple[str, int]]) -> bytes:
+    """
+    Pack hash suffixes, in hexadecimal, and their breach counts into the binary
+    format stored in :class:`~pwned_passwords_django.db_mirror.models.PasswordRange`.
+    The entries must be sorted by suffix. Counts too large to store are capped.
+
+    """
+    return b"".join(
+        RECORD.pack(int(suffix, 16).to_bytes(SUFFIX_SIZE, "big"), min(count, MAX_COUNT))
+        for suffix, count in entries
+    )
+
+
+class _Suffixes(collections.abc.Sequence):
+    """
+    Read-only sequence view of the packed suffixes in a range, for use with
+    :mod:`bisect`.
+
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def __len__(self) -> int:
+        """
+        Return the number of records.
+
+        """
+        return len(self.data) // RECORD.size
+
+    def __getitem__(self, index: int) -> bytes:
+        """
+        Return the packed suffix of the record at the given index.
+
+        """
+        start = index * RECORD.size
+        return self.data[start : start + SUFFIX_SIZE]
+
+
+class PackedRange(collections.abc.Mapping):
+    """
+    Read-only mapping of the hash suffixes in a packed range to their breach counts,
+    which looks up a suffix by binary search without unpacking the range.
+
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.suffixes = _Suffixes(data)
+
+    def __getitem__(self, suffix: str) -> int:
+        """
+        Return the breach count of the given hash suffix.
+
+        """
+        try:
+            key = int(suffix, 16).to_bytes(SUFFIX_SIZE, "big")
+        except (TypeError, ValueError, OverflowError) as exc:
+            raise KeyError(suffix) from exc
+        index = bisect.bisect_left(self.suffixes, key)
+        if index == len(self.suffixes) or self.suffixes[index] != key:
+            raise KeyError(suffix)
+        return RECORD.unpack_from(self.data, index * RECORD.size)[1]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        """
+        Iterate over the hash suffixes, in hexadecimal.
+
+        """
+        for packed, _ in RECORD.iter_unpack(self.data):
+            yield f"{int.from_bytes(packed, 'big'):035X}"
+
+    def __len__(self) -> int:
+        """
+        Return the number of hash suffixes.
+
+        """
+        return len(self.suffixes)
+
+
+def load_ranges(
+    lines: typing.Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    using: typing.Optional[str] = None,
+) -> int:
+    """
+    Load the Pwned Passwords dataset into the database mirror, replacing any rows
+    already stored for the same prefixes, and return the number of hashes loaded.
+
+    Rows are written with :meth:`~django.db.models.query.QuerySet.bulk_create`,
+    ``batch_size`` rows at a time, each batch in its own transaction.
+
+    :param lines: Lines in the format of the downloadable Pwned Passwords SHA-1
+       dataset, sorted by hash: a full SHA-1 hash in hexadecimal, a colon, and a
+       breach count. Blank lines are ignored.
+    :param batch_size: The number of rows to write at once.
+    :param using: The alias of the database to load into.
+
+    :raises ValueError: When a line is not a valid hash and count, or the hashes are
+       not sorted.
+
+    """
+    from .models import PasswordRange  # pylint: disable=import-outside-toplevel
+
+    def _save(batch: typing.List[PasswordRange]) -> None:
+        """
+        Write a batch of rows.
+
+        """
+        with transaction.atomic(using=using):
+            PasswordRange.objects.using(using).filter(
+                prefix__in=[password_range.prefix for password_range in batch]
+            ).delete()
+            PasswordRange.objects.using(using).bulk_create(batch)
+
+    count = 0
+    batch: typing.List[PasswordRange] = []
+    for prefix, group in itertools.groupby(
+        mirror.parse_sorted_dataset(lines), key=lambda entry: entry[0][:5]
+    ):
+        entries = [(line_hash[5:], int(breaches)) for line_hash, breaches in group]
+        batch.append(PasswordRange(prefix=prefix, hashes=pack_range(entries)))
+        count += len(entries)
+        if len(batch) >= batch_size:
+            _save(batch)
+            batch = []
+    if batch:
+        _save(batch)
+    return count
+
+
+@contextlib.contextmanager
+def _worker_connections() -> typing.Iterator[None]:
+    """
+    Context manager which, when run in a worker thread of ``pwned-passwords-django``,
+    closes that thread's database connections if they have outlived
+    :setting:`CONN_MAX_AGE` or become unusable, both before and after the enclosed
+    block -- as Django does for the threads handling requests at the start and end
+    of each request. Worker threads never handle requests, so would otherwise keep
+    their connections open indefinitely.
+
+    """
+    if not api.in_worker_thread():
+        yield
+        return
+    close_old_connections()
+    try:
+        yield
+    finally:
+        close_old_connections()
+
+
+class DatabasePwnedPasswords(api.PwnedPasswords):
+    """
+    A :class:`~pwned_passwords_django.api.PwnedPasswords` client which checks
+    passwords against the database mirror instead of contacting Pwned Passwords.
+
+    Errors in reading from the database are reported, and handled by the validator
+    and middleware, in the same way as errors in contacting Pwned Passwords. A
+    prefix with no row in the database is treated as having no compromised hashes.
+
+    :param using: The alias of the database holding the mirror.
+
+    Other arguments are as for
+    :class:`~pwned_passwords_django.api.PwnedPasswords`.
+
+    """
+
+    def __init__(
+        self, using: typing.Optional[str] = None, **kwargs: typing.Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self.using = using
+
+    def _fetch_range(self, prefix: str) -> typing.Mapping[str, int]:
+        """
+        Read the packed range for the given hash prefix from the database.
+
+        """
+        return self._fetch_ranges([prefix])[prefix]
+
+    async def _fetch_range_async(self, prefix: str) -> typing.Mapping[str, int]:
+        """
+        Read the packed range for the given hash prefix from the database, in a
+        thread.
+
+        """
+        return await sync_to_async(self._fetch_range)(prefix)
+
+    def _fetch_ranges(
+        self, prefixes: typing.List[str]
+    ) -> typing.Dict[str, typing.Mapping[str, int]]:
+        """
+        Read the packed ranges for the given hash prefixes from the database, in as
+        few queries as possible.
+
+        """
+        from .models import PasswordRange  # pylint: disable=import-outside-toplevel
+
+        ranges: typing.Dict[str, typing.Mapping[str, int]] = {
+            prefix: PackedRange(b"") for prefix in prefixes
+        }
+        for start in range(0, len(prefixes), READ_BATCH_SIZE):
+            batch = prefixes[start : start + READ_BATCH_SIZE]
+            began = time.perf_counter()
+            rows = None
+            try:
+                with _worker_connections(), timing.measure(timing.NET):
+                    rows = list(
+                        PasswordRange.objects.using(self.using)
+                        .filter(prefix__in=batch)
+                        .values_list("prefix", "hashes")
+                    )
+            finally:
+                self.metrics.observe_request(
+                    "database",
+                    time.perf_counter() - began,
+                    None if rows is None else sum(len(data) for _, data in rows),
+                )
+            for prefix, data in rows:
+                ranges[prefix] = PackedRange(bytes(data))
+        return ranges
+
+    def _check_grouped(
+        self,
+        by_prefix: typing.Dict[str, typing.Dict[str, str]],
+        max_concurrency: int,
+    ) -> typing.Dict[str, api.BatchResult]:
+        """
+        Check many values grouped by hash prefix against the database mirror,
+        reading the ranges for many prefixes in each query, for
+        :meth:`~pwned_passwords_django.api.PwnedPasswords.check_passwords` and
+        :meth:`~pwned_passwords_django.api.PwnedPasswords.check_hashes`.
+        ``max_concurrency`` is ignored.
+
+        """
+        try:
+            ranges: typing.Iterable[api.RangeResult] = self._fetch_ranges(
+                list(by_prefix)
+            ).values()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            ranges = itertools.repeat(self._translate_error(exc))
+        return self._batch_results(by_prefix, ranges)
+
+    async def _check_grouped_async(
+        self,
+        by_prefix: typing.Dict[str, typing.Dict[str, str]],
+        max_concurrency: int,
+    ) -> typing.Dict[str, api.BatchResult]:
+        """
+        Asynchronous version of :meth:`_check_grouped`, which reads from the
+        database in a thread.
+
+        """
+        return await sync_to_async(self._check_grouped)(by_prefix, max_concurrency)
@@ -0,0 +1,65 @@
+"""
+Management command which loads the Pwned Passwords dataset into the database mirror.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pwned_passwords_django.db_mirror import backend
+
+
+class Command(BaseCommand):
+    """
+    Load the database mirror from the downloadable Pwned Passwords dataset.
+
+    """
+
+    help = (
+        "Load the downloadable Pwned Passwords SHA-1 dataset, sorted by hash, into "
+        "the database mirror."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add the command's arguments.
+
+        """
+        parser.add_argument(
+            "source",
+            help=(
+                "Path to the Pwned Passwords SHA-1 dataset, in HASH:COUNT format, "
+                "sorted by hash."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=backend.DEFAULT_BATCH_SIZE,
+            help=(
+                "Number of rows to write at once (default "
+                f"{backend.DEFAULT_BATCH_SIZE})."
+            ),
+        )
+        parser.add_argument(
+            "--database",
+            default=None,
+            help="Alias of the database to load into (default: the default database).",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Load the dataset.
+
+        """
+        try:
+            with open(options["source"], encoding="utf-8") as source:
+                count = backend.load_ranges(
+                    source,
+                    batch_size=options["batch_size"],
+                    using=options["database"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f"Loaded {count} hashes.")
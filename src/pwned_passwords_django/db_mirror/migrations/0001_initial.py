@@ -0,0 +1,36 @@
+"""
+Create the table for the database mirror.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Initial migration for the database mirror.
+
+    """
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="PasswordRange",
+            fields=[
+                (
+                    "prefix",
+                    models.CharField(max_length=5, primary_key=True, serialize=False),
+                ),
+                ("hashes", models.BinaryField()),
+            ],
+            options={
+                "verbose_name": "password range",
+                "verbose_name_plural": "password ranges",
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+"""
+Model storing the database mirror of the Pwned Passwords dataset.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.db import models
+
+
+class PasswordRange(models.Model):
+    """
+    The hash suffixes, and their breach counts, listed in Pwned Passwords for one
+    hash prefix, packed as described in
+    :func:`~pwned_passwords_django.db_mirror.backend.pack_range`.
+
+    """
+
+    prefix = models.CharField(max_length=5, primary_key=True)
+    hashes = models.BinaryField()
+
+    class Meta:
+        """
+        Metadata for the model.
+
+        """
+
+        verbose_name = "password range"
+        verbose_name_plural = "password ranges"
+
+    def __str__(self) -> str:
+        """
+        Return the hash prefix.
+
+        """
+        return self.prefix
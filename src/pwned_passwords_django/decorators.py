@@ -0,0 +1,116 @@
+"""
+A view decorator which checks POST submissions to a single view for
+potentially-compromised passwords using the Pwned Passwords API.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+import functools
+import typing
+
+from django import http
+
+from . import memo
+from .middleware import PwnedPasswordsList, has_scannable_payload
+
+
+def check_pwned_passwords(
+    fields: typing.Optional[typing.Sequence[str]] = None,
+) -> typing.Callable[[typing.Callable], typing.Callable]:
+    """
+    View decorator which checks ``POST`` submissions to the decorated view against
+    the Pwned Passwords database, setting ``request.pwned_passwords`` and
+    ``request.apwned_passwords()`` exactly as :ref:`the middleware <middleware>`
+    does. Both sync and async views are supported.
+
+    This is useful when only a few views accept passwords, since unlike the
+    middleware, it does not parse the payloads of ``POST`` requests to any other view.
+    Like the middleware, it only checks form data no larger than
+    ``settings.PWNED_PASSWORDS["MIDDLEWARE_MAX_CONTENT_LENGTH"]``.
+
+    :param fields: The keys of ``request.POST`` to check. If not provided, keys
+       matching ``settings.PWNED_PASSWORDS["PASSWORD_REGEX"]`` will be checked, as in
+       the middleware.
+
+    .. code-block:: python
+
+       from pwned_passwords_django.decorators import check_pwned_passwords
+
+
+       @check_pwned_passwords(fields=["password1"])
+       def signup(request):
+           if request.method == "POST" and request.pwned_passwords:
+               ...
+
+    If you also use the middleware, exclude the decorated views from it via the
+    ``MIDDLEWARE_URL_NAMES`` or ``MIDDLEWARE_PATH_PREFIXES`` settings, to avoid
+    checking the same payload twice.
+
+    """
+    if fields is not None:
+        fields = tuple(fields)
+
+    def decorator(view_func: typing.Callable) -> typing.Callable:
+        """
+        Decorate the given view function.
+
+        """
+        if asyncio.iscoroutinefunction(view_func):
+
+            @functools.wraps(view_func)
+            async def _wrapped_view(
+                request: http.HttpRequest, *args, **kwargs
+            ) -> http.HttpResponse:
+                """
+                Check the request, then call the async view.
+
+                """
+                with memo.request_scope():
+                    return await _handle_async(request, *args, **kwargs)
+
+            async def _handle_async(
+                request: http.HttpRequest, *args, **kwargs
+            ) -> http.HttpResponse:
+                """
+                Handle the request within a request-scoped memo of results.
+
+                """
+                pwned_passwords = PwnedPasswordsList()
+                if has_scannable_payload(request):
+                    # Work around https://code.djangoproject.com/ticket/34063; see
+                    # the comment in the async middleware.
+                    request.body  # pylint: disable=pointless-statement
+                    pwned_passwords = PwnedPasswordsList(request=request, fields=fields)
+                    pwned_passwords.start()
+                request.pwned_passwords = pwned_passwords
+                request.apwned_passwords = pwned_passwords.aresolve
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                    await pwned_passwords.aresolve()
+                finally:
+                    await pwned_passwords.aclose()
+                return response
+
+        else:
+
+            @functools.wraps(view_func)
+            def _wrapped_view(
+                request: http.HttpRequest, *args, **kwargs
+            ) -> http.HttpResponse:
+                """
+                Check the request, then call the view.
+
+                """
+                pwned_passwords = PwnedPasswordsList()
+                if has_scannable_payload(request):
+                    pwned_passwords = PwnedPasswordsList(request=request, fields=fields)
+                request.pwned_passwords = pwned_passwords
+                request.apwned_passwords = pwned_passwords.aresolve
+                with memo.request_scope():
+                    return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
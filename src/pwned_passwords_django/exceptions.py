@@ -31,3 +31,20 @@ class PwnedPasswordsError(Exception):
         self.message = message
         self.code = code
         self.params = params
+
+
+class QueueFull(Exception):
+    """
+    Raised when work is submitted to a full background queue whose policy is to
+    reject new work.
+
+    """
+
+
+class QueueClosed(QueueFull):
+    """
+    Raised when work is submitted to a background queue which has been drained, and
+    so no longer accepts work. A subclass of :exc:`QueueFull`, so that code which
+    sheds work when a queue is full also sheds it while shutting down.
+
+    """
@@ -0,0 +1,299 @@
+"""
+Local password checks used as a fallback when Pwned Passwords cannot be
+contacted.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import bisect
+import collections.abc
+import functools
+import gzip
+import hashlib
+import heapq
+import mmap
+import pathlib
+import struct
+import typing
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.utils.translation import gettext as _
+from django.views.decorators.debug import sensitive_variables
+
+# When a password is found in the list of common passwords rather than by asking Pwned
+# Passwords, its exact breach count is unknown; it is reported as this count.
+COMMON_PASSWORD_COUNT: int = 1
+
+# Hash files begin with this magic value, then a two-byte format version and a
+# two-byte digest size, followed by the sorted, fixed-size truncated digests.
+HASH_FILE_MAGIC: bytes = b"PPDH"
+HASH_FILE_VERSION: int = 1
+HASH_FILE_HEADER = struct.Struct(">4sHH")
+DEFAULT_HASH_FILE_DIGEST_SIZE: int = 8
+SHA1_DIGEST_SIZE: int = 20
+
+COMMON_PASSWORDS_PATH = (
+    pathlib.Path(password_validation.__file__).resolve().parent
+    / "common-passwords.txt.gz"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def common_passwords() -> typing.FrozenSet[str]:
+    """
+    Return the list of common passwords bundled with Django, as a
+    :class:`frozenset`.
+
+    The list is read from disk on the first call, and the same set is returned to all
+    later callers, so that each process holds only a single copy no matter how many
+    validators use it.
+
+    """
+    with gzip.open(COMMON_PASSWORDS_PATH, "rt", encoding="utf-8") as password_file:
+        return frozenset(line.strip() for line in password_file)
+
+
+def is_common_password(password: str) -> bool:
+    """
+    Return whether the given password appears in the list of common passwords
+    bundled with Django, using the same normalization as
+    :class:`~django.contrib.auth.password_validation.CommonPasswordValidator`.
+
+    """
+    return password.lower().strip() in common_passwords()
+
+
+def check_common_first() -> bool:
+    """
+    Return whether passwords in the list of common passwords should be treated as
+    compromised without contacting Pwned Passwords, according to
+    ``settings.PWNED_PASSWORDS["CHECK_COMMON_FIRST"]``.
+
+    """
+    return getattr(settings, "PWNED_PASSWORDS", {}).get("CHECK_COMMON_FIRST", False)
+
+
+class SharedCommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    A version of Django's
+    :class:`~django.contrib.auth.password_validation.CommonPasswordValidator` which
+    uses the shared set returned by :func:`common_passwords`, instead of reading and
+    storing its own copy of the list when instantiated.
+
+    """
+
+    def __init__(self) -> None:
+        # pylint: disable=super-init-not-called
+        pass
+
+    @property
+    def passwords(self) -> typing.FrozenSet[str]:
+        """
+        The shared set of common passwords.
+
+        """
+        return common_passwords()
+
+
+common_password_validator = SharedCommonPasswordValidator()
+
+
+class _Records(collections.abc.Sequence):
+    """
+    Read-only sequence view of the fixed-size digest records in a hash file, for use
+    with :mod:`bisect`.
+
+    """
+
+    def __init__(self, buffer: mmap.mmap, digest_size: int) -> None:
+        self.buffer = buffer
+        self.digest_size = digest_size
+        self.length = (len(buffer) - HASH_FILE_HEADER.size) // digest_size
+
+    def __len__(self) -> int:
+        """
+        Return the number of records.
+
+        """
+        return self.length
+
+    def __getitem__(self, index: int) -> bytes:
+        """
+        Return the digest record at the given index.
+
+        """
+        start = HASH_FILE_HEADER.size + index * self.digest_size
+        return self.buffer[start : start + self.digest_size]
+
+
+class HashFile:
+    """
+    A set of truncated SHA-1 password hashes, stored sorted in a file built by
+    :func:`build_hash_file` and searched with :mod:`bisect` over a memory-mapped
+    buffer, so that no plaintext passwords are stored and only the pages actually
+    searched are read into memory.
+
+    :param path: The path to the hash file.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When the file is not a valid
+       hash file.
+
+    """
+
+    def __init__(self, path: typing.Union[str, pathlib.Path]) -> None:
+        error = ImproperlyConfigured(f"{path} is not a Pwned Passwords hash file.")
+        with open(path, "rb") as hash_file:
+            try:
+                self.buffer = mmap.mmap(hash_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as exc:  # Raised for empty files.
+                raise error from exc
+        if len(self.buffer) < HASH_FILE_HEADER.size:
+            raise error
+        magic, version, digest_size = HASH_FILE_HEADER.unpack_from(self.buffer)
+        if (
+            magic != HASH_FILE_MAGIC
+            or version != HASH_FILE_VERSION
+            or not 0 < digest_size <= SHA1_DIGEST_SIZE
+            or (len(self.buffer) - HASH_FILE_HEADER.size) % digest_size
+        ):
+            raise error
+        self.digest_size = digest_size
+        self.records = _Records(self.buffer, digest_size)
+
+    def __len__(self) -> int:
+        """
+        Return the number of hashes in this file.
+
+        """
+        return len(self.records)
+
+    def contains_digest(self, digest: bytes) -> bool:
+        """
+        Return whether the given SHA-1 digest (or any prefix of it at least as long
+        as this file's digest size) is in this file.
+
+        """
+        key = digest[: self.digest_size]
+        index = bisect.bisect_left(self.records, key)
+        return index < len(self.records) and self.records[index] == key
+
+    @sensitive_variables()
+    def __contains__(self, password: object) -> bool:
+        """
+        Return whether the given password's hash is in this file.
+
+        """
+        if not isinstance(password, str):
+            return False
+        # See the comment in api.PwnedPasswords._prepare_password() regarding the
+        # use of hashlib.new() and usedforsecurity=False.
+        return self.contains_digest(
+            hashlib.new(
+                "sha1", password.encode("utf-8"), usedforsecurity=False
+            ).digest()
+        )
+
+
+def build_hash_file(
+    lines: typing.Iterable[str],
+    output: typing.BinaryIO,
+    limit: int,
+    digest_size: int = DEFAULT_HASH_FILE_DIGEST_SIZE,
+) -> int:
+    """
+    Build a hash file for use with :class:`HashFile`, containing the truncated
+    hashes of the ``limit`` most-breached passwords, and return the number of
+    hashes written.
+
+    :param lines: Lines in the format of the downloadable Pwned Passwords SHA-1
+       dataset: a full SHA-1 hash in hexadecimal, a colon, and a breach count.
+       Blank lines are ignored.
+    :param output: A binary file object to write the hash file to.
+    :param limit: The maximum number of hashes to include.
+    :param digest_size: The number of leading bytes of each SHA-1 digest to store.
+
+    """
+    if not 0 < digest_size <= SHA1_DIGEST_SIZE:
+        raise ValueError("Digest size must be between 1 and 20 bytes.")
+    shift = digest_size * 8
+    hex_digits = digest_size * 2
+
+    def _entries() -> typing.Iterator[int]:
+        """
+        Yield each entry packed into a single integer ordered by breach count, which
+        takes far less memory than a tuple.
+
+        """
+        for line in lines:
+            line_hash, _, count = line.strip().partition(":")
+            if line_hash:
+                yield int(count.replace(",", "")) << shift | int(
+                    line_hash[:hex_digits], 16
+                )
+
+    mask = (1 << shift) - 1
+    digests = sorted({entry & mask for entry in heapq.nlargest(limit, _entries())})
+    output.write(HASH_FILE_HEADER.pack(HASH_FILE_MAGIC, HASH_FILE_VERSION, digest_size))
+    for digest in digests:
+        output.write(digest.to_bytes(digest_size, "big"))
+    return len(digests)
+
+
+@functools.lru_cache(maxsize=None)
+def _hash_file(path: str) -> HashFile:
+    """
+    Open and return the hash file at the given path, which is then shared by all
+    callers.
+
+    """
+    return HashFile(path)
+
+
+class HashFileValidator(password_validation.CommonPasswordValidator):
+    """
+    A password validator which rejects passwords whose hashes appear in a
+    :class:`HashFile`, with the same message and code as
+    :class:`~django.contrib.auth.password_validation.CommonPasswordValidator`.
+
+    """
+
+    def __init__(self, path: str) -> None:
+        # pylint: disable=super-init-not-called
+        self.path = path
+
+    @property
+    def passwords(self) -> HashFile:
+        """
+        The shared hash file.
+
+        """
+        return _hash_file(self.path)
+
+    @sensitive_variables()
+    def validate(self, password: str, user: typing.Any = None) -> None:
+        """
+        Reject the password if its hash appears in the hash file.
+
+        """
+        if password in self.passwords:
+            raise ValidationError(
+                _("This password is too common."),
+                code="password_too_common",
+            )
+
+
+def get_fallback_validator() -> password_validation.CommonPasswordValidator:
+    """
+    Return the validator to use as a fallback when Pwned Passwords cannot be
+    contacted: a :class:`HashFileValidator` if
+    ``settings.PWNED_PASSWORDS["FALLBACK_HASH_FILE"]`` is set, and otherwise the
+    shared validator for Django's list of common passwords.
+
+    """
+    path = getattr(settings, "PWNED_PASSWORDS", {}).get("FALLBACK_HASH_FILE")
+    if path is None:
+        return common_password_validator
+    return HashFileValidator(str(path))
@@ -0,0 +1,239 @@
+"""
+Checking users' passwords against Pwned Passwords when they log in.
+
+Only at login is an existing user's password available in plaintext, so this is the
+one chance to find users whose passwords have been compromised since they were set.
+The check runs in the background, on the shared queue returned by
+:func:`~pwned_passwords_django.background.get_queue`, so logging in never waits for
+it.
+
+Results are cached, so that a user who logs in often does not cause a request to
+Pwned Passwords each time. Cache keys are a keyed hash (HMAC) of the user's stored
+password hash, so a result is reused only until the user's password changes, and
+neither the password nor its hash is stored in the cache.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import concurrent.futures
+import inspect
+import logging
+import typing
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.backends import BaseBackend, ModelBackend
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.dispatch import Signal
+from django.utils.crypto import salted_hmac
+from django.views.decorators.debug import sensitive_variables
+
+from . import api, background, exceptions, throttle
+
+logger = logging.getLogger(__name__)
+
+KEY_SALT = "pwned_passwords_django.login"
+
+# The default lifetime, in seconds, of cached login check results.
+DEFAULT_LOGIN_CHECK_TTL: int = 86400  # 1 day
+
+#: Sent, from the thread running the check, when a user logs in with a password
+#: which appears in Pwned Passwords. Receives the ``user`` and the breach ``count``.
+password_compromised = Signal()
+
+
+def _settings() -> typing.Dict[str, typing.Any]:
+    """
+    Return the ``PWNED_PASSWORDS`` settings.
+
+    """
+    return getattr(settings, "PWNED_PASSWORDS", {})
+
+
+def _cache_key(user: AbstractBaseUser) -> str:
+    """
+    Return the cache key for the result of checking the given user's current
+    password.
+
+    """
+    digest = salted_hmac(
+        KEY_SALT, f"{user.pk}:{user.password}", algorithm="sha256"
+    ).hexdigest()
+    return f"{KEY_SALT}:{digest}"
+
+
+def _cache() -> typing.Any:
+    """
+    Return the cache in which login check results are stored, according to
+    ``settings.PWNED_PASSWORDS["LOGIN_CHECK_CACHE"]``.
+
+    """
+    return caches[_settings().get("LOGIN_CHECK_CACHE", "default")]
+
+
+def get_login_check_result(user: AbstractBaseUser) -> typing.Optional[int]:
+    """
+    Return the breach count found when the given user last logged in with their
+    current password, or ``None`` if it has not been checked, or the result has
+    expired.
+
+    """
+    return _cache().get(_cache_key(user))
+
+
+@sensitive_variables()
+def _check(user: AbstractBaseUser, password: str) -> typing.Optional[int]:
+    """
+    Run :func:`_check_password` on a thread of the background queue.
+
+    The check uses the cache, and receivers of :data:`password_compromised` may use
+    the database, but the queue's threads never handle requests, so Django never
+    closes their database connections. Like Django at the start and end of each
+    request, close those that have outlived :setting:`CONN_MAX_AGE` or become
+    unusable, both before and after the check.
+
+    """
+    close_old_connections()
+    try:
+        return _check_password(user, password)
+    finally:
+        close_old_connections()
+
+
+@sensitive_variables()
+def _check_password(user: AbstractBaseUser, password: str) -> typing.Optional[int]:
+    """
+    Check the user's password, unless a result for it is already cached, and cache
+    the result. Return the breach count, or ``None`` if the check failed.
+
+    """
+    key = _cache_key(user)
+    cache = _cache()
+    count = cache.get(key)
+    if count is not None:
+        return count
+    try:
+        count = api.check_password(password)
+    except exceptions.PwnedPasswordsError as exc:
+        throttle.log_error(
+            logger,
+            exc.code,
+            "Skipping login check due to error contacting Pwned Passwords.",
+        )
+        return None
+    cache.set(key, count, _settings().get("LOGIN_CHECK_TTL", DEFAULT_LOGIN_CHECK_TTL))
+    if count:
+        password_compromised.send(sender=type(user), user=user, count=count)
+    return count
+
+
+@sensitive_variables()
+def check_login(
+    user: AbstractBaseUser, password: str
+) -> "concurrent.futures.Future[typing.Optional[int]]":
+    """
+    Start checking, in the background, the password the given user has just logged
+    in with, and return a future which resolves to its breach count, or to ``None``
+    if the check failed. A cached result, if any, is used instead of contacting
+    Pwned Passwords. If the background queue is full, or has been drained because
+    the process is shutting down, the check may be shed, and the future cancelled;
+    the password will be checked the next time the user logs in.
+
+    When the password is compromised, :data:`password_compromised` is sent.
+
+    """
+    try:
+        return background.get_queue().submit(_check, user, password)
+    except exceptions.QueueFull:
+        # Logging in must not fail because the queue is full, or closed.
+        future: "concurrent.futures.Future[typing.Optional[int]]" = (
+            concurrent.futures.Future()
+        )
+        future.cancel()
+        return future
+
+
+@sensitive_variables()
+def _accepts(
+    method: typing.Callable,
+    request: typing.Any,
+    args: typing.Tuple[typing.Any, ...],
+    kwargs: typing.Dict[str, typing.Any],
+) -> bool:
+    """
+    Return whether the given authentication method accepts the given credentials.
+
+    """
+    try:
+        inspect.signature(method).bind(request, *args, **kwargs)
+    except TypeError:
+        return False
+    return True
+
+
+class PwnedPasswordsBackendMixin:
+    """
+    Mixin for Django authentication backends, which checks the password of each user
+    who successfully authenticates with :func:`check_login`.
+
+    Like Django itself, the mixin skips a backend -- by returning ``None`` -- when
+    the backend does not accept the credentials given, so that backends with
+    different signatures, such as
+    :class:`~django.contrib.auth.backends.RemoteUserBackend`, can be used alongside
+    each other.
+
+    """
+
+    @sensitive_variables()
+    def authenticate(
+        self, request: typing.Any, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Optional[AbstractBaseUser]:
+        """
+        Authenticate the user, and start checking their password if successful.
+
+        """
+        parent = super().authenticate  # type: ignore[misc]
+        # Django decides whether a backend accepts the credentials from the
+        # signature of its authenticate() method, which the signature of this one
+        # would hide.
+        if not _accepts(parent, request, args, kwargs):
+            return None
+        user = parent(request, *args, **kwargs)
+        if user is not None and isinstance(kwargs.get("password"), str):
+            check_login(user, kwargs["password"])
+        return user
+
+    @sensitive_variables()
+    async def aauthenticate(
+        self, request: typing.Any, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Optional[AbstractBaseUser]:
+        """
+        Asynchronously authenticate the user, and start checking their password if
+        successful.
+
+        """
+        parent = getattr(super(), "aauthenticate", None)
+        if parent is None or getattr(parent, "__func__", None) is getattr(
+            BaseBackend, "aauthenticate", None
+        ):
+            # Without an asynchronous implementation of its own, the backend
+            # authenticates in a thread, as Django's default aauthenticate() does;
+            # authenticate() then starts the check.
+            return await sync_to_async(self.authenticate)(request, *args, **kwargs)
+        if not _accepts(parent, request, args, kwargs):
+            return None
+        user = await parent(request, *args, **kwargs)
+        if user is not None and isinstance(kwargs.get("password"), str):
+            check_login(user, kwargs["password"])
+        return user
+
+
+class PwnedPasswordsModelBackend(PwnedPasswordsBackendMixin, ModelBackend):
+    """
+    Django's :class:`~django.contrib.auth.backends.ModelBackend`, checking the
+    password of each user who logs in against Pwned Passwords.
+
+    """
@@ -0,0 +1,141 @@
+"""
+Management command which audits a file of passwords, or of their SHA-1 hashes,
+against Pwned Passwords.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pwned_passwords_django import api, audit, exceptions
+
+
+class Command(BaseCommand):
+    """
+    Audit a file of passwords or SHA-1 hashes against Pwned Passwords.
+
+    """
+
+    help = (
+        "Check every line of a file of passwords, or of their SHA-1 hashes, against "
+        "Pwned Passwords, and write the line number, hash and breach count of each "
+        "compromised one as CSV."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add the command's arguments.
+
+        """
+        parser.add_argument("source", help="Path to the file to audit.")
+        parser.add_argument(
+            "--format",
+            choices=audit.INPUT_FORMATS,
+            default=audit.PLAINTEXT,
+            help="Whether each line is a password or a SHA-1 hash.",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write results to. Defaults to standard output.",
+        )
+        parser.add_argument(
+            "--mirror",
+            help=(
+                "Look hashes up in the bulk index of the local mirror in this "
+                "directory, instead of checking them with the API client."
+            ),
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help=(
+                "File in which to record progress, so that an interrupted audit "
+                "resumes where it stopped when run again. Requires --output."
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=audit.DEFAULT_CHUNK_SIZE,
+            help="Number of lines to read and check at once.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes to hash lines in.",
+        )
+        parser.add_argument(
+            "--max-concurrency",
+            type=int,
+            default=api.DEFAULT_BATCH_CONCURRENCY,
+            help="Maximum number of simultaneous requests to the API.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run the audit.
+
+        """
+        if options["checkpoint"] and not options["output"]:
+            raise CommandError("--checkpoint requires --output.")
+
+        def report(progress: audit.Progress) -> None:
+            """
+            Report the audit's progress.
+
+            """
+            self.stderr.write(
+                f"{progress.offset / max(size, 1):.1%}: checked {progress.lines} lines, "
+                f"{progress.compromised} compromised, {progress.skipped} skipped."
+            )
+
+        try:
+            size = os.path.getsize(options["source"])
+            resolve = (
+                audit.mirror_resolver(options["mirror"])
+                if options["mirror"]
+                else audit.api_resolver(max_concurrency=options["max_concurrency"])
+            )
+            start = (
+                audit.load_checkpoint(options["checkpoint"], options["source"])
+                if options["checkpoint"]
+                else None
+            )
+            with (
+                open(
+                    options["output"],
+                    "a" if start else "w",
+                    encoding="utf-8",
+                    newline="",
+                )
+                if options["output"]
+                else contextlib.nullcontext(self.stdout)
+            ) as output:
+                result = audit.run_audit(
+                    options["source"],
+                    output,
+                    resolve,
+                    input_format=options["format"],
+                    chunk_size=options["chunk_size"],
+                    processes=options["processes"],
+                    checkpoint=options["checkpoint"],
+                    start=start,
+                    progress=report,
+                )
+        except exceptions.PwnedPasswordsError as exc:
+            raise CommandError(
+                f"{exc.message} Run the command again with the same --checkpoint "
+                "to resume."
+                if options["checkpoint"]
+                else exc.message
+            ) from exc
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stderr.write(
+            f"Checked {result.lines} lines: {result.compromised} compromised, "
+            f"{result.skipped} skipped."
+        )
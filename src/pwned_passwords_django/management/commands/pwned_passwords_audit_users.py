@@ -0,0 +1,90 @@
+"""
+Management command which audits users' passwords stored as unsalted SHA-1 hashes
+against Pwned Passwords.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import csv
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from pwned_passwords_django import api, audit, exceptions
+
+
+class Command(BaseCommand):
+    """
+    Audit users' unsalted SHA-1 password hashes against Pwned Passwords.
+
+    """
+
+    help = (
+        "Check the password of every user whose password is stored as an unsalted "
+        "SHA-1 hash against Pwned Passwords, and write the primary key, username "
+        "and breach count of each compromised account as CSV."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add the command's arguments.
+
+        """
+        parser.add_argument(
+            "--mirror",
+            help=(
+                "Look hashes up in the bulk index of the local mirror in this "
+                "directory, instead of checking them with the API client."
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=audit.DEFAULT_CHUNK_SIZE,
+            help="Number of users to read and check at once.",
+        )
+        parser.add_argument(
+            "--max-concurrency",
+            type=int,
+            default=api.DEFAULT_BATCH_CONCURRENCY,
+            help="Maximum number of simultaneous requests to the API.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to read users from.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run the audit.
+
+        """
+        user_model = get_user_model()
+        writer = csv.writer(self.stdout)
+        writer.writerow(("pk", user_model.USERNAME_FIELD, "count"))
+        checked = compromised = 0
+        try:
+            resolve = (
+                audit.mirror_resolver(options["mirror"])
+                if options["mirror"]
+                else audit.api_resolver(max_concurrency=options["max_concurrency"])
+            )
+            for user, count in audit.check_unsalted_sha1_users(
+                resolve, chunk_size=options["chunk_size"], using=options["database"]
+            ):
+                checked += 1
+                if not count:
+                    continue
+                compromised += 1
+                writer.writerow((user.pk, user.get_username(), count))
+        except exceptions.PwnedPasswordsError as exc:
+            raise CommandError(exc.message) from exc
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stderr.write(
+            f"Checked {checked} accounts with unsalted SHA-1 password hashes: "
+            f"{compromised} compromised."
+        )
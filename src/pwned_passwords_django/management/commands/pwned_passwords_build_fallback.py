@@ -0,0 +1,68 @@
+"""
+Management command which builds a hash file for use as a fallback when Pwned
+Passwords cannot be contacted.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pwned_passwords_django import fallback
+
+
+class Command(BaseCommand):
+    """
+    Build a fallback hash file from the downloadable Pwned Passwords dataset.
+
+    """
+
+    help = (
+        "Build a fallback hash file of the most-breached passwords from the "
+        "downloadable Pwned Passwords SHA-1 dataset."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add the command's arguments.
+
+        """
+        parser.add_argument(
+            "source",
+            help="Path to the Pwned Passwords SHA-1 dataset, in HASH:COUNT format.",
+        )
+        parser.add_argument("output", help="Path to write the hash file to.")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10_000_000,
+            help="Number of most-breached passwords to include (default 10,000,000).",
+        )
+        parser.add_argument(
+            "--digest-size",
+            type=int,
+            default=fallback.DEFAULT_HASH_FILE_DIGEST_SIZE,
+            help=(
+                "Number of bytes of each SHA-1 hash to store (default "
+                f"{fallback.DEFAULT_HASH_FILE_DIGEST_SIZE})."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """
+        Build the hash file.
+
+        """
+        try:
+            with open(options["source"], encoding="utf-8") as source, open(
+                options["output"], "wb"
+            ) as output:
+                count = fallback.build_hash_file(
+                    source,
+                    output,
+                    limit=options["limit"],
+                    digest_size=options["digest_size"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f"Wrote {count} hashes to {options['output']}.")
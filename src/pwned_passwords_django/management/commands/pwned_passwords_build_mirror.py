@@ -0,0 +1,55 @@
+"""
+Management command which builds a local mirror of the Pwned Passwords range API.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pwned_passwords_django import mirror
+
+
+class Command(BaseCommand):
+    """
+    Build a range API mirror from the downloadable Pwned Passwords dataset.
+
+    """
+
+    help = (
+        "Build a local mirror of the Pwned Passwords range API from the "
+        "downloadable Pwned Passwords SHA-1 dataset, sorted by hash."
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add the command's arguments.
+
+        """
+        parser.add_argument(
+            "source",
+            help=(
+                "Path to the Pwned Passwords SHA-1 dataset, in HASH:COUNT format, "
+                "sorted by hash."
+            ),
+        )
+        parser.add_argument("output", help="Directory to write the mirror to.")
+        parser.add_argument(
+            "--bulk-index",
+            action="store_true",
+            help="Also write the index used for vectorized bulk lookups.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Build the mirror.
+
+        """
+        try:
+            with open(options["source"], encoding="utf-8") as source:
+                count = mirror.build_mirror(
+                    source, options["output"], bulk_index=options["bulk_index"]
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f"Wrote {count} hashes to {options['output']}.")
@@ -0,0 +1,136 @@
+"""
+A request-scoped record of Pwned Passwords results, allowing the middleware and the
+validator to share the results of checks made while handling the same request.
+
+Passwords are never stored; results are keyed by a keyed hash (HMAC) of the password,
+and are discarded when the request finishes.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+import contextlib
+import contextvars
+import typing
+
+from django.utils.crypto import salted_hmac
+from django.views.decorators.debug import sensitive_variables
+
+from .metrics import Metrics
+
+KEY_SALT = "pwned_passwords_django.memo"
+
+# Each entry is either a breach count, or a future which will resolve to a breach
+# count once an in-progress asynchronous check completes.
+Entry = typing.Union[int, "asyncio.Future[int]"]
+
+_memo: "contextvars.ContextVar[typing.Optional[typing.Dict[str, Entry]]]" = (
+    contextvars.ContextVar("pwned_passwords_django_memo", default=None)
+)
+
+
+@sensitive_variables()
+def _key(password: str) -> str:
+    """
+    Return the key under which results for the given password are stored.
+
+    """
+    return salted_hmac(KEY_SALT, password, algorithm="sha256").hexdigest()
+
+
+@contextlib.contextmanager
+def request_scope() -> typing.Iterator[None]:
+    """
+    Context manager which makes a new, empty memo active for its duration. The
+    middleware uses this around the handling of each request.
+
+    """
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+@sensitive_variables()
+def record(password: str, count: int) -> None:
+    """
+    Record the breach count for the given password, if a memo is active.
+
+    """
+    memo = _memo.get()
+    if memo is not None:
+        memo[_key(password)] = count
+
+
+@sensitive_variables()
+def claim(password: str) -> typing.Optional["asyncio.Future[int]"]:
+    """
+    If a memo is active and has no entry for the given password, record that an
+    asynchronous check of it is in progress, and return a future on which the caller
+    must set the result (or which it must cancel, if the check fails). Otherwise,
+    return ``None``.
+
+    Must be called from a running event loop.
+
+    """
+    memo = _memo.get()
+    if memo is None:
+        return None
+    key = _key(password)
+    if key in memo:
+        return None
+    future = asyncio.get_running_loop().create_future()
+    memo[key] = future
+    return future
+
+
+@sensitive_variables()
+def lookup(
+    password: str, metrics: typing.Optional[Metrics] = None
+) -> typing.Optional[int]:
+    """
+    Return the recorded breach count for the given password, or ``None`` if there is
+    no completed result for it. If ``metrics`` is given, record the lookup in it.
+
+    """
+    memo = _memo.get()
+    if memo is None:
+        return None
+    entry = memo.get(_key(password))
+    if isinstance(entry, asyncio.Future):
+        entry = None if not entry.done() or entry.cancelled() else entry.result()
+    if metrics is not None:
+        metrics.record_cache_lookup(hit=entry is not None)
+    return entry
+
+
+@sensitive_variables()
+async def alookup(
+    password: str, metrics: typing.Optional[Metrics] = None
+) -> typing.Optional[int]:
+    """
+    Return the recorded breach count for the given password, waiting for any
+    in-progress asynchronous check of it to finish, or ``None`` if there is no result
+    for it. If ``metrics`` is given, record the lookup in it.
+
+    """
+    memo = _memo.get()
+    if memo is None:
+        return None
+    entry = memo.get(_key(password))
+    if metrics is not None:
+        metrics.record_cache_lookup(hit=entry is not None)
+        if isinstance(entry, asyncio.Future) and not entry.done():
+            metrics.record_single_flight_join()
+    if isinstance(entry, asyncio.Future):
+        try:
+            return await asyncio.shield(entry)
+        except asyncio.CancelledError:
+            # If the check itself was cancelled, there's no result; otherwise it's
+            # our caller being cancelled, which must propagate.
+            if entry.cancelled():
+                return None
+            raise
+    return entry
@@ -0,0 +1,252 @@
+"""
+Collection of metrics about communication with Pwned Passwords, for monitoring and
+capacity planning.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import bisect
+import threading
+import typing
+
+from .exceptions import ErrorCode
+
+# Upper bounds of the histogram buckets for the duration, in seconds, of requests to
+# Pwned Passwords.
+DURATION_BUCKETS: typing.Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+# Upper bounds of the histogram buckets for the size, in bytes, of responses from
+# Pwned Passwords. Responses are typically around 20-40 KB, and somewhat larger when
+# padded.
+SIZE_BUCKETS: typing.Tuple[float, ...] = (
+    1024,
+    4096,
+    16384,
+    32768,
+    65536,
+    131072,
+)
+
+
+class Metrics:
+    """
+    Interface for recording metrics about communication with Pwned Passwords.
+
+    This base class records nothing, and is the default; to collect metrics, use
+    :class:`InMemoryMetrics`, or subclass this class and implement its methods to
+    send metrics to your own monitoring system. Implementations may be called from
+    several threads at once.
+
+    """
+
+    def observe_request(
+        self, mode: str, duration: float, response_size: typing.Optional[int]
+    ) -> None:
+        """
+        Record a request to Pwned Passwords made by the ``"sync"`` or ``"async"``
+        HTTP client (``mode``) -- or a read from the ``"database"`` mirror -- which
+        took ``duration`` seconds and returned ``response_size`` bytes, or ``None``
+        if no response was received.
+
+        """
+
+    def record_error(self, code: ErrorCode) -> None:
+        """
+        Record an error in checking a password, with the given code.
+
+        """
+
+    def record_fallback(self, count: int = 1) -> None:
+        """
+        Record that ``count`` passwords were checked with the fallback validator
+        because Pwned Passwords could not be contacted.
+
+        """
+
+    def record_cache_lookup(self, hit: bool) -> None:
+        """
+        Record a lookup in the results already known while handling the current
+        request, and whether it found a result.
+
+        """
+
+    def record_single_flight_join(self) -> None:
+        """
+        Record that a check waited for an identical check already in progress, rather
+        than contacting Pwned Passwords itself.
+
+        """
+
+
+class _Histogram:
+    """
+    A cumulative histogram with fixed bucket bounds, in the style of Prometheus.
+
+    """
+
+    def __init__(self, buckets: typing.Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # One more count than bounds, for observations above the last bound.
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record a value.
+
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def cumulative_counts(self) -> typing.List[typing.Tuple[str, int]]:
+        """
+        Return each bucket's upper bound (as a string, with ``"+Inf"`` for the last)
+        and the number of values less than or equal to it.
+
+        """
+        bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+        cumulative = []
+        running = 0
+        for bound, count in zip(bounds, self.counts):
+            running += count
+            cumulative.append((bound, running))
+        return cumulative
+
+
+class InMemoryMetrics(Metrics):
+    """
+    :class:`Metrics` implementation which keeps counters and histograms in memory,
+    for the current process. Use :func:`export_prometheus` or
+    :func:`~pwned_passwords_django.views.metrics` to read them.
+
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations: typing.Dict[str, _Histogram] = {}
+        self.response_sizes: typing.Dict[str, _Histogram] = {}
+        self.errors: typing.Dict[ErrorCode, int] = {code: 0 for code in ErrorCode}
+        self.fallbacks = 0
+        self.cache_lookups = {True: 0, False: 0}
+        self.single_flight_joins = 0
+
+    def observe_request(
+        self, mode: str, duration: float, response_size: typing.Optional[int]
+    ) -> None:
+        """
+        Record a request's duration and response size.
+
+        """
+        with self._lock:
+            self.durations.setdefault(mode, _Histogram(DURATION_BUCKETS)).observe(
+                duration
+            )
+            if response_size is not None:
+                self.response_sizes.setdefault(mode, _Histogram(SIZE_BUCKETS)).observe(
+                    response_size
+                )
+
+    def record_error(self, code: ErrorCode) -> None:
+        """
+        Count an error with the given code.
+
+        """
+        with self._lock:
+            self.errors[code] += 1
+
+    def record_fallback(self, count: int = 1) -> None:
+        """
+        Count passwords checked with the fallback validator.
+
+        """
+        with self._lock:
+            self.fallbacks += count
+
+    def record_cache_lookup(self, hit: bool) -> None:
+        """
+        Count a lookup as a hit or a miss.
+
+        """
+        with self._lock:
+            self.cache_lookups[hit] += 1
+
+    def record_single_flight_join(self) -> None:
+        """
+        Count a check which waited for one in progress.
+
+        """
+        with self._lock:
+            self.single_flight_joins += 1
+
+
+def _histogram_lines(
+    name: str, description: str, histograms: typing.Dict[str, _Histogram]
+) -> typing.List[str]:
+    """
+    Return the Prometheus text-format lines for a family of histograms labeled by
+    mode.
+
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for mode, histogram in sorted(histograms.items()):
+        for bound, count in histogram.cumulative_counts():
+            lines.append(f'{name}_bucket{{mode="{mode}",le="{bound}"}} {count}')
+        lines.append(f'{name}_sum{{mode="{mode}"}} {histogram.total:g}')
+        lines.append(f'{name}_count{{mode="{mode}"}} {sum(histogram.counts)}')
+    return lines
+
+
+def export_prometheus(metrics: InMemoryMetrics) -> str:
+    """
+    Return the given metrics in the Prometheus text exposition format.
+
+    """
+    with metrics._lock:  # pylint: disable=protected-access
+        lines = _histogram_lines(
+            "pwned_passwords_request_duration_seconds",
+            "Duration of requests to Pwned Passwords.",
+            metrics.durations,
+        )
+        lines += _histogram_lines(
+            "pwned_passwords_response_size_bytes",
+            "Size of response bodies from Pwned Passwords.",
+            metrics.response_sizes,
+        )
+        lines += [
+            "# HELP pwned_passwords_errors_total Errors in checking passwords.",
+            "# TYPE pwned_passwords_errors_total counter",
+        ]
+        lines += [
+            f'pwned_passwords_errors_total{{code="{code.value}"}} {count}'
+            for code, count in metrics.errors.items()
+        ]
+        lines += [
+            "# HELP pwned_passwords_fallbacks_total Passwords checked with the "
+            "fallback validator.",
+            "# TYPE pwned_passwords_fallbacks_total counter",
+            f"pwned_passwords_fallbacks_total {metrics.fallbacks}",
+            "# HELP pwned_passwords_cache_lookups_total Lookups of results already "
+            "known while handling a request.",
+            "# TYPE pwned_passwords_cache_lookups_total counter",
+            'pwned_passwords_cache_lookups_total{result="hit"} '
+            f"{metrics.cache_lookups[True]}",
+            'pwned_passwords_cache_lookups_total{result="miss"} '
+            f"{metrics.cache_lookups[False]}",
+            "# HELP pwned_passwords_single_flight_joins_total Checks which waited for "
+            "an identical check already in progress.",
+            "# TYPE pwned_passwords_single_flight_joins_total counter",
+            f"pwned_passwords_single_flight_joins_total {metrics.single_flight_joins}",
+        ]
+    return "\n".join(lines) + "\n"
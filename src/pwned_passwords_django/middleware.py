@@ -7,83 +7,481 @@ potentially-compromised passwords using the Pwned Passwords API.
 # SPDX-License-Identifier: BSD-3-Clause
 
 import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
 import logging
 import re
 import typing
 
+from asgiref.sync import async_to_sync
 from django import http
 from django.conf import settings
-from django.contrib.auth.password_validation import CommonPasswordValidator
-from django.core.exceptions import ValidationError
+from django.core.exceptions import SynchronousOnlyOperation, ValidationError
+from django.urls import Resolver404, resolve
 from django.utils.decorators import sync_and_async_middleware
 from django.views.decorators.debug import sensitive_variables
 
-from . import api, exceptions
+from . import api, exceptions, fallback, memo, throttle, timing
 
 logger = logging.getLogger(__name__)
 
-_fallback_validator = CommonPasswordValidator()
+# Only these content types populate request.POST, so only requests with these content
+# types are worth scanning.
+FORM_CONTENT_TYPES: typing.FrozenSet[str] = frozenset(
+    ("application/x-www-form-urlencoded", "multipart/form-data")
+)
+
+# Requests with a larger body than this are not scanned, unless overridden by the
+# MIDDLEWARE_MAX_CONTENT_LENGTH setting. This is the same as the default value of
+# Django's DATA_UPLOAD_MAX_MEMORY_SIZE setting.
+DEFAULT_MAX_CONTENT_LENGTH: int = 2621440  # 2.5 MB
+
+
+@functools.lru_cache(maxsize=None)
+def _password_regex(pattern: str) -> typing.Pattern:
+    """
+    Compile and return the regex used to find likely password fields.
+
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=None)
+def _scan_allowlist(
+    url_names: typing.Optional[typing.Tuple[str, ...]],
+    path_prefixes: typing.Optional[typing.Tuple[str, ...]],
+) -> typing.Optional[typing.Callable[[http.HttpRequest], bool]]:
+    """
+    Build and return a function which determines, from the configured URL names and
+    path prefixes, whether the middleware should scan a request; or return ``None``
+    if neither is configured and all requests are to be scanned.
+
+    """
+    if url_names is None and path_prefixes is None:
+        return None
+    names = frozenset(url_names or ())
+    prefixes = tuple(path_prefixes or ())
+
+    def _allowed(request: http.HttpRequest) -> bool:
+        """
+        Return whether the given request should be scanned.
+
+        """
+        # str.startswith() accepts a tuple of prefixes, so this is a single call
+        # regardless of the number of prefixes, and cheaper than URL resolution.
+        if prefixes and request.path_info.startswith(prefixes):
+            return True
+        if names:
+            try:
+                match = resolve(
+                    request.path_info, urlconf=getattr(request, "urlconf", None)
+                )
+            except Resolver404:
+                return False
+            return match.view_name in names
+        return False
+
+    return _allowed
+
+
+def has_scannable_payload(request: http.HttpRequest) -> bool:
+    """
+    Return whether the given request has a payload worth scanning for passwords,
+    based only on its method and headers, so that nothing is read from the body of a
+    request which will not be scanned. Both the middleware and the
+    :func:`~pwned_passwords_django.decorators.check_pwned_passwords` decorator use
+    this to decide whether to scan a request.
+
+    """
+    if request.method != "POST" or request.content_type not in FORM_CONTENT_TYPES:
+        return False
+    max_content_length = getattr(settings, "PWNED_PASSWORDS", {}).get(
+        "MIDDLEWARE_MAX_CONTENT_LENGTH", DEFAULT_MAX_CONTENT_LENGTH
+    )
+    if max_content_length is None:
+        return True
+    # Without a valid Content-Length -- as with a chunked upload -- there is no way
+    # to know how large the body is without reading it.
+    try:
+        content_length = int(request.META["CONTENT_LENGTH"])
+    except (KeyError, ValueError):
+        return False
+    return 0 <= content_length <= max_content_length
+
+
+def _should_scan(request: http.HttpRequest) -> bool:
+    """
+    Return whether the middleware should scan the given request's payload.
+
+    """
+    if not has_scannable_payload(request):
+        return False
+    settings_dict = getattr(settings, "PWNED_PASSWORDS", {})
+    url_names = settings_dict.get("MIDDLEWARE_URL_NAMES")
+    path_prefixes = settings_dict.get("MIDDLEWARE_PATH_PREFIXES")
+    allowed = _scan_allowlist(
+        tuple(url_names) if url_names is not None else None,
+        tuple(path_prefixes) if path_prefixes is not None else None,
+    )
+    return allowed is None or allowed(request)
+
+
+def _keys_to_search(
+    request: http.HttpRequest, fields: typing.Optional[typing.Sequence[str]] = None
+) -> typing.List[str]:
+    """
+    Return the keys of ``request.POST`` which are likely to contain passwords: either
+    those in ``fields``, if given, or otherwise those matching the configured regex.
+
+    """
+    with timing.measure(timing.PARSE):
+        if fields is not None:
+            return [key for key in fields if key in request.POST]
+        settings_dict = getattr(settings, "PWNED_PASSWORDS", {})
+        search_re = _password_regex(settings_dict.get("PASSWORD_REGEX", r"PASS"))
+        return [key for key in request.POST.keys() if search_re.search(key)]
 
 
 def _fallback(password: str) -> bool:
     """
     Fallback password check in case of Pwned Passwords errors, using Django's
-    built-in CommonPasswordValidator.
+    built-in CommonPasswordValidator or the configured hash file.
 
     """
+    api.default_client.metrics.record_fallback()
     try:
-        _fallback_validator.validate(password)
+        with timing.measure(timing.FALLBACK):
+            fallback.get_fallback_validator().validate(password)
         return False
     except ValidationError:
         return True
 
 
 @sensitive_variables()
-async def _scan_payload_async(request: http.HttpRequest) -> typing.List[str]:
+def _check_common_first(values: typing.Iterable[str]) -> typing.Dict[str, int]:
     """
-    Asynchronous helper function which performs the scan of the request's payload.
+    If ``settings.PWNED_PASSWORDS["CHECK_COMMON_FIRST"]`` is enabled, return a
+    mapping of each of the given values which appears in the list of common passwords
+    to an approximate breach count; otherwise, return an empty mapping.
 
     """
-    settings_dict = getattr(settings, "PWNED_PASSWORDS", {})
-    search_re = re.compile(settings_dict.get("PASSWORD_REGEX", r"PASS"), re.IGNORECASE)
+    if not fallback.check_common_first():
+        return {}
+    return {
+        value: fallback.COMMON_PASSWORD_COUNT
+        for value in values
+        if fallback.is_common_password(value)
+    }
+
 
-    keys_to_search = [key for key in request.POST.keys() if search_re.search(key)]
-    if not keys_to_search:
+@sensitive_variables()
+def _check_known(values: typing.List[str]) -> typing.Dict[str, int]:
+    """
+    Return a mapping of each of the given values whose breach count is already
+    known -- either because it is a common password and ``CHECK_COMMON_FIRST`` is
+    enabled, or because it has already been checked while handling the current
+    request -- to that count.
+
+    """
+    with timing.measure(timing.CACHE):
+        results = _check_common_first(values)
+        for value in values:
+            if value not in results:
+                count = memo.lookup(value, api.default_client.metrics)
+                if count is not None:
+                    results[value] = count
+    return results
+
+
+@sensitive_variables()
+def _candidates(
+    request: http.HttpRequest, fields: typing.Optional[typing.Sequence[str]] = None
+) -> typing.Dict[str, str]:
+    """
+    Return a mapping of the keys of ``request.POST`` which are likely to contain
+    passwords to their values.
+
+    """
+    return {key: request.POST[key] for key in _keys_to_search(request, fields)}
+
+
+@sensitive_variables()
+async def _scan_candidates_async(candidates: typing.Dict[str, str]) -> typing.List[str]:
+    """
+    Asynchronous helper function which checks the given candidate passwords, as
+    returned by :func:`_candidates`, and returns the keys of those which are
+    compromised.
+
+    Since the candidates are extracted beforehand, this does nothing but look up
+    results, so it can safely run while the view handles the request.
+
+    """
+    if not candidates:
         return []
+    values = list(dict.fromkeys(candidates.values()))
+    results = _check_known(values)
+    # Let other code handling this request, such as the validator, know that these
+    # values are being checked, so that it can wait for the results instead of
+    # checking them again.
+    claims = {value: memo.claim(value) for value in values if value not in results}
     try:
-        return [
-            key
-            for key in keys_to_search
-            if await api.check_password_async(request.POST[key])
-        ]
-    except exceptions.PwnedPasswordsError:
-        logger.error(
+        for value, claim in claims.items():
+            results[value] = await api.check_password_async(value)
+            if claim is not None:
+                claim.set_result(results[value])
+    except exceptions.PwnedPasswordsError as exc:
+        throttle.log_error(
+            logger,
+            exc.code,
             "Falling back to Django CommonPasswordValidator due "
-            "to error contacting Pwned Passwords."
+            "to error contacting Pwned Passwords.",
         )
-        return [key for key in keys_to_search if _fallback(request.POST[key])]
+        results = {value: _fallback(value) for value in values}
+    finally:
+        for claim in claims.values():
+            if claim is not None and not claim.done():
+                claim.cancel()
+    return [key for key, value in candidates.items() if results[value]]
+
+
+async def _scan_payload_async(
+    request: http.HttpRequest, fields: typing.Optional[typing.Sequence[str]] = None
+) -> typing.List[str]:
+    """
+    Asynchronous helper function which performs the scan of the request's payload.
+
+    """
+    return await _scan_candidates_async(_candidates(request, fields))
+
+
+def _in_event_loop() -> bool:
+    """
+    Return whether the current thread is running an asyncio event loop.
+
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
 
 
 @sensitive_variables()
-def _scan_payload_sync(request: http.HttpRequest) -> typing.List[str]:
+def _check_values_sync(values: typing.List[str]) -> typing.Dict[str, int]:
     """
-    Helper function which performs the scan of the request's payload.
+    Check a list of distinct password values against Pwned Passwords, returning a
+    mapping of each value to its breach count.
+
+    The first value is checked on the calling thread, and any others are checked
+    concurrently on the shared thread pool returned by
+    :func:`~pwned_passwords_django.api.get_executor`.
 
     """
-    settings_dict = getattr(settings, "PWNED_PASSWORDS", {})
-    search_re = re.compile(settings_dict.get("PASSWORD_REGEX", r"PASS"), re.IGNORECASE)
+    first, *rest = values
+    # Run each check in a copy of the current context, so that any timings being
+    # collected for this request include it.
+    futures = {
+        value: api.get_executor().submit(
+            contextvars.copy_context().run, api.check_password, value
+        )
+        for value in rest
+    }
+    try:
+        results = {first: api.check_password(first)}
+        for value, future in futures.items():
+            results[value] = future.result()
+    finally:
+        for future in futures.values():
+            future.cancel()
+    return results
+
+
+@sensitive_variables()
+def _scan_payload_sync(
+    request: http.HttpRequest, fields: typing.Optional[typing.Sequence[str]] = None
+) -> typing.List[str]:
+    """
+    Helper function which performs the scan of the request's payload.
+
+    Each distinct value is checked only once, no matter how many keys contain it, so
+    that (for example) ``password1`` and ``password2`` fields holding the same value
+    cost only a single check.
 
-    keys_to_search = [key for key in request.POST.keys() if search_re.search(key)]
-    if not keys_to_search:
+    """
+    candidates = _candidates(request, fields)
+    if not candidates:
         return []
+    values = list(dict.fromkeys(candidates.values()))
+    results = _check_known(values)
+    unknown = [value for value in values if value not in results]
     try:
-        return [key for key in keys_to_search if api.check_password(request.POST[key])]
-    except exceptions.PwnedPasswordsError:
-        logger.error(
+        if unknown:
+            checked = _check_values_sync(unknown)
+            for value, count in checked.items():
+                memo.record(value, count)
+            results.update(checked)
+    except exceptions.PwnedPasswordsError as exc:
+        throttle.log_error(
+            logger,
+            exc.code,
             "Falling back to Django CommonPasswordValidator due "
-            "to error contacting Pwned Passwords."
+            "to error contacting Pwned Passwords.",
         )
-        return [key for key in keys_to_search if _fallback(key)]
+        results = {value: _fallback(value) for value in values}
+    return [key for key, value in candidates.items() if results[value]]
+
+
+@contextlib.contextmanager
+def _collect_timings(
+    request: http.HttpRequest,
+) -> typing.Iterator[typing.Optional[timing.Timings]]:
+    """
+    Context manager which, if ``settings.PWNED_PASSWORDS["MIDDLEWARE_SERVER_TIMING"]``
+    is enabled, collects timings for the request, stores them as
+    ``request.pwned_passwords_timings`` and yields them. Otherwise, it sets
+    ``request.pwned_passwords_timings`` to ``None`` and yields ``None``.
+
+    """
+    request.pwned_passwords_timings = None
+    if not getattr(settings, "PWNED_PASSWORDS", {}).get(
+        "MIDDLEWARE_SERVER_TIMING", False
+    ):
+        yield None
+        return
+    with timing.collect() as timings:
+        request.pwned_passwords_timings = timings
+        yield timings
+
+
+def _add_server_timing(
+    response: http.HttpResponse, timings: typing.Optional[timing.Timings]
+) -> None:
+    """
+    Add the given timings, if any, to the response's ``Server-Timing`` header.
+
+    """
+    if timings is None:
+        return
+    value = timings.server_timing()
+    if not value:
+        return
+    existing = response.get("Server-Timing")
+    response["Server-Timing"] = f"{existing}, {value}" if existing else value
+
+
+class PwnedPasswordsList(collections.UserList):
+    """
+    A :class:`list`-compatible object holding the keys of ``request.POST`` which
+    contained compromised passwords, checked lazily.
+
+    When created with a ``request``, nothing is checked until the contents are first
+    accessed; at that point the request's payload is scanned (synchronously), and
+    the result is stored for any further access. Asynchronous code can instead
+    ``await`` the :meth:`aresolve` method, which performs the scan using the
+    asynchronous HTTP client.
+
+    Asynchronous code can also call :meth:`start` to begin the check in the
+    background as soon as possible; the result is then collected from the background
+    task on first access. Since accessing the contents directly from the event loop
+    would block it, that raises
+    :exc:`~django.core.exceptions.SynchronousOnlyOperation` until the result is
+    available; asynchronous code should ``await`` :meth:`aresolve` instead.
+
+    If ``fields`` is given, only those keys of ``request.POST`` are checked;
+    otherwise, keys matching the ``PASSWORD_REGEX`` setting are checked.
+
+    When created without a ``request``, this is simply a list of the given
+    ``initlist`` (or an empty list).
+
+    """
+
+    def __init__(
+        self,
+        initlist: typing.Optional[typing.Iterable[str]] = None,
+        request: typing.Optional[http.HttpRequest] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> None:
+        # pylint: disable=super-init-not-called
+        self._request = request
+        self._fields = fields
+        self._task: typing.Optional[asyncio.Future] = None
+        self._data: typing.Optional[typing.List[str]] = None
+        if request is None:
+            self._data = list(initlist) if initlist is not None else []
+
+    @property
+    def data(self) -> typing.List[str]:
+        """
+        The underlying list, computed on first access.
+
+        """
+        if self._data is None:
+            if self._task is not None and self._task.done():
+                self._data = self._task.result()
+            elif _in_event_loop():
+                # Neither waiting for the background task nor checking synchronously
+                # can be done without blocking the event loop.
+                raise SynchronousOnlyOperation(
+                    "The result of checking for compromised passwords is not yet "
+                    "available; use 'await request.apwned_passwords()' from "
+                    "asynchronous code."
+                )
+            elif self._task is None:
+                self._data = _scan_payload_sync(self._request, self._fields)
+            else:
+                # Most likely a synchronous view running in a worker thread under
+                # ASGI, which can wait for the background task on the event loop.
+                async_to_sync(self.aresolve)()
+        return self._data
+
+    @data.setter
+    def data(self, value: typing.List[str]) -> None:
+        """
+        Set the underlying list.
+
+        """
+        self._data = value
+
+    async def aresolve(self) -> "PwnedPasswordsList":
+        """
+        Asynchronously compute the underlying list, if it has not already been
+        computed, and return this object.
+
+        """
+        if self._data is None:
+            if self._task is not None:
+                self._data = await self._task
+            else:
+                self._data = await _scan_payload_async(self._request, self._fields)
+        return self
+
+    async def aclose(self) -> None:
+        """
+        Cancel the background check, if it was started and is still running, and
+        wait for it to finish.
+
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def start(self) -> None:
+        """
+        Begin the check in a background task using the asynchronous HTTP client, if
+        it has not already been started or completed. Must be called from a running
+        event loop.
+
+        The candidate passwords are extracted from the request's payload before this
+        returns, so that the background task never touches the request, and the
+        payload is not parsed concurrently with the view.
+
+        """
+        if self._data is None and self._task is None:
+            self._task = asyncio.ensure_future(
+                _scan_candidates_async(_candidates(self._request, self._fields))
+            )
 
 
 @sync_and_async_middleware
@@ -97,7 +495,29 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
     ``"pwned_passwords_django.middleware.pwned_passwords_middleware"`` to your
     :setting:`MIDDLEWARE` setting. This will add a new attribute -- ``pwned_passwords``
     -- to each :class:`~django.http.HttpRequest` object. The ``request.pwned_passwords``
-    attribute will be a :class:`list` of :class:`str`.
+    attribute will be a :class:`PwnedPasswordsList`, which behaves like a
+    :class:`list` of :class:`str`.
+
+    In synchronous (WSGI) deployments, the check against Pwned Passwords is lazy: it
+    happens the first time ``request.pwned_passwords`` is accessed, so views which
+    never look at it never incur the cost of contacting Pwned Passwords.
+
+    In asynchronous (ASGI) deployments, the check begins in a background task as soon
+    as the request arrives, and runs concurrently with the view; the result is
+    collected when it is first read, or when the view returns a response. Asynchronous
+    views should read the result with ``await request.apwned_passwords()``, which
+    returns the same list without blocking the event loop.
+
+    .. warning:: **Asynchronous views**
+
+       Reading ``request.pwned_passwords`` directly from an asynchronous view,
+       before the result is available, raises
+       :exc:`~django.core.exceptions.SynchronousOnlyOperation`, since waiting for
+       the check would block the event loop. Before version 2.2, the check always
+       finished before the view was called, so this worked; asynchronous views
+       written for earlier versions should be changed to ``await
+       request.apwned_passwords()``, after which ``request.pwned_passwords`` can
+       also be read directly.
 
     .. warning:: **Middleware order**
 
@@ -115,6 +535,17 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
 
     * The request method is not ``POST``.
 
+    * The request method is ``POST``, but the request's URL is not one the middleware
+      has been configured to scan (see below).
+
+    * The request method is ``POST``, but the payload is not form data (its
+      ``Content-Type`` is neither ``application/x-www-form-urlencoded`` nor
+      ``multipart/form-data``), or is larger than
+      ``settings.PWNED_PASSWORDS["MIDDLEWARE_MAX_CONTENT_LENGTH"]`` (default 2.5 MB),
+      or has no valid ``Content-Length`` header from which to tell its size.
+      In these cases the middleware reads nothing from the request body, so that, for
+      example, large file uploads are never buffered on the middleware's account.
+
     * The request method is ``POST``, but the payload does not appear to contain a
       password.
 
@@ -159,6 +590,14 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
                    "You just entered a password which appears to be compromised!"
                )
 
+
+       async def some_async_view(request):
+           if request.method == "POST" and await request.apwned_passwords():
+               messages.warning(
+                   request,
+                   "You just entered a password which appears to be compromised!"
+               )
+
     ``pwned-passwords-django`` uses a regular expression to guess which items in
     :attr:`~django.http.HttpRequest.POST` are likely to be passwords. By default, it
     matches on any key in :attr:`~django.http.HttpRequest.POST` containing ``"PASS"``
@@ -168,6 +607,37 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
     setting ``settings.PWNED_PASSWORDS["PASSWORD_REGEX"]`` to tell the middleware what
     to look for. See :ref:`the settings documentation <settings>` for details.
 
+    When both the middleware and :ref:`the validator <validator>` are enabled, they
+    share results: while handling a request, a password checked by one of them is not
+    checked again by the other. The shared results are keyed by an HMAC of each
+    password, rather than the password itself, and are discarded when the request
+    finishes.
+
+    If ``settings.PWNED_PASSWORDS["CHECK_COMMON_FIRST"]`` is enabled, any password
+    appearing in the list of common passwords bundled with Django is treated as
+    compromised without contacting Pwned Passwords at all.
+
+    To see how much time checking passwords adds to each request, enable
+    ``settings.PWNED_PASSWORDS["MIDDLEWARE_SERVER_TIMING"]``. The middleware then
+    measures the time spent parsing the payload, looking up already-known results,
+    hashing, waiting on the network, and falling back to the local list of common
+    passwords. The measurements are available to the view as a
+    :class:`~pwned_passwords_django.timing.Timings` object in
+    ``request.pwned_passwords_timings``, and are added to the response as a
+    ``Server-Timing`` header -- such as ``pwned-net;dur=42.1;desc="net"`` -- which
+    browser developer tools and many log formats can display. When the setting is not
+    enabled, ``request.pwned_passwords_timings`` is ``None``.
+
+    By default, the middleware scans every ``POST`` request, which requires parsing the
+    payload of every ``POST`` request. To limit the middleware to only those URLs which
+    actually accept passwords, set ``settings.PWNED_PASSWORDS["MIDDLEWARE_URL_NAMES"]``
+    to a list of URL names (including any namespace, as in ``"accounts:signup"``),
+    and/or ``settings.PWNED_PASSWORDS["MIDDLEWARE_PATH_PREFIXES"]`` to a list of URL
+    path prefixes. If either is set, ``POST`` requests to any other URL will not have
+    their payloads parsed or checked, and ``request.pwned_passwords`` will be empty.
+    Alternatively, the :func:`~pwned_passwords_django.decorators.check_pwned_passwords`
+    decorator can be applied to individual views.
+
     """
     # We need to know whether or not the request we're handling is async: if it is, we
     # should return an async middleware that uses an async HTTP client to talk to Pwned
@@ -181,17 +651,41 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
             containing likely passwords against the Pwned Passwords database.
 
             """
-            request.pwned_passwords = []
-            if request.method == "POST":
+            with memo.request_scope(), _collect_timings(request) as timings:
+                response = await _handle_async(request)
+            _add_server_timing(response, timings)
+            return response
+
+        async def _handle_async(request: http.HttpRequest) -> http.HttpResponse:
+            """
+            Handle the request within a request-scoped memo of results.
+
+            """
+            request.pwned_passwords = PwnedPasswordsList()
+            if _should_scan(request):
                 # A bug in Django's async test client causes access to request.POST to
                 # throw an exception unless preceded by an access to
                 # request.body. Future versions of Django will fix this, but for now we
                 # do a throwaway access of request.body as a workaround.
                 #
                 # See https://code.djangoproject.com/ticket/34063 for details.
-                request.body  # pylint: disable=pointless-statement
-                request.pwned_passwords = await _scan_payload_async(request)
-            response = await get_response(request)
+                with timing.measure(timing.PARSE):
+                    request.body  # pylint: disable=pointless-statement
+                request.pwned_passwords = PwnedPasswordsList(request=request)
+                # Check in the background while the view runs, so that the round
+                # trip to Pwned Passwords overlaps with the view's own work.
+                request.pwned_passwords.start()
+            pwned_passwords = request.pwned_passwords
+            request.apwned_passwords = pwned_passwords.aresolve
+            try:
+                response = await get_response(request)
+                # Collect the result even if the view never read it, so that any
+                # failure is logged while handling the request which caused it.
+                await pwned_passwords.aresolve()
+            finally:
+                # Never let the background task outlive the request, even if the
+                # view raised.
+                await pwned_passwords.aclose()
             return response
 
     else:
@@ -202,10 +696,13 @@ def pwned_passwords_middleware(get_response: typing.Callable) -> typing.Callable
             containing likely passwords against the Pwned Passwords database.
 
             """
-            request.pwned_passwords = {}
-            if request.method == "POST":
-                request.pwned_passwords = _scan_payload_sync(request)
-            response = get_response(request)
+            request.pwned_passwords = PwnedPasswordsList()
+            if _should_scan(request):
+                request.pwned_passwords = PwnedPasswordsList(request=request)
+            request.apwned_passwords = request.pwned_passwords.aresolve
+            with memo.request_scope(), _collect_timings(request) as timings:
+                response = get_response(request)
+            _add_server_timing(response, timings)
             return response
 
     return middleware
@@ -0,0 +1,417 @@
+"""
+Serving the Pwned Passwords range API from a local mirror of the dataset.
+
+A mirror is a directory of sixteen shard files, one for each first hexadecimal digit
+of a hash prefix. Each shard begins with a header, followed by a table of offsets,
+followed by the response body for each of its prefixes, already in the format of the
+range API. Serving a prefix is then a lookup in the offset table and a single slice
+of the memory-mapped shard, with no per-line work.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import functools
+import itertools
+import mmap
+import pathlib
+import re
+import secrets
+import struct
+import typing
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.http import parse_etags
+
+from . import api
+
+# Shards begin with this magic value, then a two-byte format version and a random
+# sixteen-byte identifier shared by all shards of a mirror, followed by the offset
+# table.
+MIRROR_MAGIC: bytes = b"PPMR"
+MIRROR_VERSION: int = 1
+MIRROR_HEADER = struct.Struct(">4sH16s")
+SHARD_DIGITS: str = "0123456789ABCDEF"
+SHARD_PREFIXES: int = 16**4
+
+# The offset table holds the start of each prefix's body, and then the end of the
+# last; each body ends where the next begins.
+OFFSET = struct.Struct(">Q")
+OFFSET_PAIR = struct.Struct(">QQ")
+OFFSET_TABLE = struct.Struct(f">{SHARD_PREFIXES + 1}Q")
+
+# The files of the optional bulk index, which hold every hash in the mirror in sorted
+# order -- split into its leading eight bytes, and its remaining twelve -- and its
+# breach count, as little-endian integers. See :mod:`pwned_passwords_django.bulk`.
+BULK_HIGH_FILE: str = "bulk-high.bin"
+BULK_LOW_FILE: str = "bulk-low.bin"
+BULK_COUNTS_FILE: str = "bulk-counts.bin"
+BULK_HIGH = struct.Struct("<Q")
+BULK_LOW = struct.Struct("<QI")
+BULK_COUNT = struct.Struct("<I")
+MAX_BULK_COUNT: int = 2**32 - 1
+
+# The default lifetime, in seconds, for which responses may be cached.
+DEFAULT_MIRROR_MAX_AGE: int = 86400
+
+PREFIX_RE = re.compile(r"[0-9A-Fa-f]{5}")
+# Breach counts in the dataset, which may have thousands separators.
+COUNT_RE = re.compile(r"[0-9][0-9,]*")
+PATH_RE = re.compile(r"^/range/([0-9A-Fa-f]{5})$")
+
+
+def parse_sorted_dataset(
+    lines: typing.Iterable[str],
+) -> typing.Iterator[typing.Tuple[str, str]]:
+    """
+    Yield the uppercase hash and the breach count from each line of the downloadable
+    Pwned Passwords SHA-1 dataset, checking that the hashes are in order.
+
+    :raises ValueError: When a line is not a valid hash and count, or the hashes are
+       not sorted.
+
+    """
+    previous = ""
+    for line in lines:
+        line_hash, _, count = line.strip().partition(":")
+        if not line_hash:
+            continue
+        # Checked strictly, since int() would also accept signs, underscores,
+        # whitespace and (for the hash) a 0x prefix.
+        if not (
+            len(line_hash) == 40
+            and api.HEX_RE.fullmatch(line_hash)
+            and COUNT_RE.fullmatch(count)
+        ):
+            raise ValueError(f"{line.strip()!r} is not a hash and breach count.")
+        line_hash = line_hash.upper()
+        if line_hash <= previous:
+            raise ValueError(
+                "The dataset must be sorted by hash, without duplicates; found "
+                f"{line_hash} after {previous}."
+            )
+        previous = line_hash
+        yield line_hash, str(int(count.replace(",", "")))
+
+
+def build_mirror(
+    lines: typing.Iterable[str],
+    directory: typing.Union[str, pathlib.Path],
+    bulk_index: bool = False,
+) -> int:
+    """
+    Build a mirror for use with :class:`Mirror` in ``directory``, and return the
+    number of hashes written.
+
+    :param lines: Lines in the format of the downloadable Pwned Passwords SHA-1
+       dataset, sorted by hash: a full SHA-1 hash in hexadecimal, a colon, and a
+       breach count. Blank lines are ignored.
+    :param directory: The directory to write the shards to, which is created if it
+       does not exist.
+    :param bulk_index: Whether to also write the index used by
+       :class:`~pwned_passwords_django.bulk.BulkIndex`, which takes 24 bytes for
+       each hash.
+
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        index_files = (
+            [
+                stack.enter_context(open(directory / name, "wb"))
+                for name in (BULK_HIGH_FILE, BULK_LOW_FILE, BULK_COUNTS_FILE)
+            ]
+            if bulk_index
+            else None
+        )
+        return _write_shards(lines, directory, index_files)
+
+
+def _write_bulk_entries(
+    index_files: typing.List[typing.BinaryIO],
+    entries: typing.List[typing.Tuple[str, str]],
+) -> None:
+    """
+    Write hashes and their breach counts to the files of the bulk index.
+
+    """
+    high, low, counts = index_files
+    for line_hash, breaches in entries:
+        digest = int(line_hash, 16)
+        high.write(BULK_HIGH.pack(digest >> 96))
+        low.write(BULK_LOW.pack(digest >> 32 & 0xFFFFFFFFFFFFFFFF, digest & 0xFFFFFFFF))
+        counts.write(BULK_COUNT.pack(min(int(breaches), MAX_BULK_COUNT)))
+
+
+def _write_shards(
+    lines: typing.Iterable[str],
+    directory: pathlib.Path,
+    index_files: typing.Optional[typing.List[typing.BinaryIO]],
+) -> int:
+    """
+    Write the shards of a mirror, and the bulk index if ``index_files`` are given,
+    and return the number of hashes written.
+
+    """
+    build_id = secrets.token_bytes(16)
+    groups = itertools.groupby(
+        parse_sorted_dataset(lines), key=lambda entry: entry[0][:5]
+    )
+    pending = next(groups, None)
+    count = 0
+    for digit in SHARD_DIGITS:
+        with open(directory / f"{digit}.shard", "wb") as shard:
+            shard.write(MIRROR_HEADER.pack(MIRROR_MAGIC, MIRROR_VERSION, build_id))
+            shard.write(bytes(OFFSET_TABLE.size))
+            offsets: typing.List[int] = []
+            while pending is not None and pending[0][0] == digit:
+                prefix, group = pending
+                entries = list(group)
+                index = int(prefix[1:], 16)
+                offsets.extend([shard.tell()] * (index + 1 - len(offsets)))
+                shard.write(
+                    "\r\n".join(
+                        f"{line_hash[5:]}:{breaches}" for line_hash, breaches in entries
+                    ).encode("ascii")
+                )
+                if index_files is not None:
+                    _write_bulk_entries(index_files, entries)
+                count += len(entries)
+                pending = next(groups, None)
+            offsets.extend([shard.tell()] * (SHARD_PREFIXES + 1 - len(offsets)))
+            shard.seek(MIRROR_HEADER.size)
+            shard.write(OFFSET_TABLE.pack(*offsets))
+    return count
+
+
+def padding() -> bytes:
+    """
+    Return between 800 and 1,000 random range-API lines with a count of zero, in the
+    manner of the ``Add-Padding`` header of the range API.
+
+    """
+    lines = 800 + secrets.randbelow(201)
+    digits = secrets.token_hex(18 * lines).upper().encode("ascii")
+    return b"\r\n".join(
+        digits[start : start + 35] + b":0" for start in range(0, 36 * lines, 36)
+    )
+
+
+class Mirror:
+    """
+    A local mirror of the Pwned Passwords range API, stored in a directory built by
+    :func:`build_mirror`. The shards are memory-mapped, so only the parts actually
+    served are read into memory.
+
+    :param directory: The path to the mirror directory.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When the directory does not
+       contain a valid mirror.
+
+    """
+
+    def __init__(self, directory: typing.Union[str, pathlib.Path]) -> None:
+        self.shards: typing.Dict[str, mmap.mmap] = {}
+        build_ids = set()
+        for digit in SHARD_DIGITS:
+            path = pathlib.Path(directory) / f"{digit}.shard"
+            error = ImproperlyConfigured(
+                f"{path} is not a Pwned Passwords mirror shard."
+            )
+            with open(path, "rb") as shard_file:
+                try:
+                    shard = mmap.mmap(shard_file.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError as exc:  # Raised for empty files.
+                    raise error from exc
+            if len(shard) < MIRROR_HEADER.size + OFFSET_TABLE.size:
+                raise error
+            magic, version, build_id = MIRROR_HEADER.unpack_from(shard)
+            end = OFFSET.unpack_from(
+                shard, MIRROR_HEADER.size + OFFSET_TABLE.size - OFFSET.size
+            )
+            if (
+                magic != MIRROR_MAGIC
+                or version != MIRROR_VERSION
+                or end[0] != len(shard)
+            ):
+                raise error
+            build_ids.add(build_id)
+            self.shards[digit] = shard
+        if len(build_ids) != 1:
+            raise ImproperlyConfigured(
+                f"The shards in {directory} are not all from the same mirror."
+            )
+        self.build_id = build_ids.pop().hex()
+
+    def body(self, prefix: str, padded: bool = False) -> bytes:
+        """
+        Return the range-API response body for the given hash prefix, with
+        :func:`padding` added if ``padded`` is true.
+
+        :raises ValueError: When ``prefix`` is not five hexadecimal digits.
+
+        """
+        if not PREFIX_RE.fullmatch(prefix):
+            raise ValueError(f"{prefix!r} is not a hash prefix.")
+        prefix = prefix.upper()
+        shard = self.shards[prefix[0]]
+        start, end = OFFSET_PAIR.unpack_from(
+            shard, MIRROR_HEADER.size + int(prefix[1:], 16) * OFFSET.size
+        )
+        body = shard[start:end]
+        if padded:
+            body = body + b"\r\n" + padding() if body else padding()
+        return body
+
+    def etag(self, prefix: str, padded: bool = False) -> str:
+        """
+        Return the ``ETag`` of the response for the given hash prefix. Padding
+        changes on every response without changing its meaning, so padded responses
+        have a weak ``ETag``.
+
+        """
+        tag = f'"{self.build_id}-{prefix.upper()}"'
+        return f"W/{tag}" if padded else tag
+
+    def headers(self, prefix: str, padded: bool, max_age: int) -> typing.Dict[str, str]:
+        """
+        Return the headers of the response for the given hash prefix, allowing
+        caches to store it for ``max_age`` seconds.
+
+        """
+        return {
+            "Content-Type": "text/plain",
+            "ETag": self.etag(prefix, padded),
+            "Cache-Control": f"public, max-age={max_age}",
+            "Vary": "Add-Padding",
+        }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Return whether the value of an ``If-None-Match`` header matches ``etag``, using
+    the weak comparison required for that header.
+
+    """
+
+    def _opaque(tag: str) -> str:
+        """
+        Return an entity tag without any weakness indicator.
+
+        """
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return any(
+        tag == "*" or _opaque(tag) == _opaque(etag)
+        for tag in parse_etags(if_none_match)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _mirror(directory: str) -> Mirror:
+    """
+    Open and return the mirror in the given directory, which is then shared by all
+    callers.
+
+    """
+    return Mirror(directory)
+
+
+def get_mirror() -> Mirror:
+    """
+    Return the shared :class:`Mirror` in the directory given by
+    ``settings.PWNED_PASSWORDS["MIRROR_DIRECTORY"]``.
+
+    :raises django.core.exceptions.ImproperlyConfigured: When that setting is not
+       provided.
+
+    """
+    directory = getattr(settings, "PWNED_PASSWORDS", {}).get("MIRROR_DIRECTORY")
+    if directory is None:
+        raise ImproperlyConfigured(
+            "Serving the range API requires PWNED_PASSWORDS['MIRROR_DIRECTORY']."
+        )
+    return _mirror(str(directory))
+
+
+def get_max_age() -> int:
+    """
+    Return the lifetime, in seconds, for which responses from the mirror may be
+    cached, according to ``settings.PWNED_PASSWORDS["MIRROR_MAX_AGE"]``.
+
+    """
+    return getattr(settings, "PWNED_PASSWORDS", {}).get(
+        "MIRROR_MAX_AGE", DEFAULT_MIRROR_MAX_AGE
+    )
+
+
+class MirrorApp:
+    """
+    An ASGI application serving the range API, at ``/range/<prefix>``, from the
+    mirror in ``directory``, allowing caches to store responses for ``max_age``
+    seconds.
+
+    """
+
+    def __init__(
+        self,
+        directory: typing.Union[str, pathlib.Path],
+        max_age: int = DEFAULT_MIRROR_MAX_AGE,
+    ) -> None:
+        self.mirror = Mirror(directory)
+        self.max_age = max_age
+
+    async def __call__(
+        self,
+        scope: typing.Dict[str, typing.Any],
+        receive: typing.Callable,
+        send: typing.Callable,
+    ) -> None:
+        """
+        Serve a request.
+
+        """
+        if scope["type"] != "http":
+            return
+        headers: typing.Dict[str, str] = {}
+        body = b""
+        match = PATH_RE.match(scope["path"])
+        if match is None:
+            status = HTTPStatus.NOT_FOUND
+        elif scope["method"] not in ("GET", "HEAD"):
+            status = HTTPStatus.METHOD_NOT_ALLOWED
+            headers["Allow"] = "GET, HEAD"
+        else:
+            request_headers = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope.get("headers", [])
+            }
+            prefix = match.group(1)
+            padded = request_headers.get("add-padding", "").lower() == "true"
+            headers = self.mirror.headers(prefix, padded, self.max_age)
+            if etag_matches(request_headers.get("if-none-match", ""), headers["ETag"]):
+                status = HTTPStatus.NOT_MODIFIED
+            else:
+                status = HTTPStatus.OK
+                body = self.mirror.body(prefix, padded)
+        if status != HTTPStatus.NOT_MODIFIED:
+            headers["Content-Length"] = str(len(body))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers.items()
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"" if scope["method"] == "HEAD" else body,
+            }
+        )
@@ -0,0 +1,253 @@
+"""
+A stand-in for the Pwned Passwords range API, for testing and load testing without
+network access.
+
+:class:`FakeRangeServer` generates deterministic range responses for every hash
+prefix, and can add latency, errors, and timeouts. It can be used in-process, as an
+``httpx`` transport passed to :class:`~pwned_passwords_django.api.PwnedPasswords`, or
+run as a standalone ASGI application.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+import functools
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+import typing
+from http import HTTPStatus
+
+import httpx
+
+# A function which, given a random number generator, returns a delay in seconds.
+Latency = typing.Callable[[random.Random], float]
+
+# Each hash prefix has around this many suffixes listed in Pwned Passwords.
+DEFAULT_RANGE_SIZE: int = 900
+
+# The number of response bodies each server caches.
+BODY_CACHE_SIZE: int = 1024
+
+PREFIX_RE = re.compile(r"^/range/([0-9A-Fa-f]{5})$")
+
+
+def fixed_latency(seconds: float) -> Latency:
+    """
+    Return a latency distribution which always delays by ``seconds``.
+
+    """
+    return lambda rng: seconds
+
+
+def uniform_latency(low: float, high: float) -> Latency:
+    """
+    Return a latency distribution uniform between ``low`` and ``high`` seconds.
+
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Latency:
+    """
+    Return a log-normal latency distribution with the given median, in seconds, and
+    shape; this has the long tail typical of real network latency.
+
+    """
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+class FakeRangeServer:
+    """
+    A fake Pwned Passwords range API.
+
+    The response for each hash prefix is generated from ``seed`` and the prefix, so
+    it is the same every time it is requested: ``range_size`` random suffixes with
+    nonzero counts, plus any of ``passwords`` (a :class:`dict` mapping passwords to
+    breach counts) with that prefix, sorted as Pwned Passwords sorts them. When the
+    request has an ``Add-Padding: true`` header, between 800 and 1,000 random
+    suffixes with a count of zero are added.
+
+    Each response is delayed by a duration drawn from ``latency`` (see
+    :func:`fixed_latency`, :func:`uniform_latency`, and :func:`lognormal_latency`;
+    by default, there is no delay).
+    A fraction ``error_rate`` of requests receive an HTTP 503 response, and a
+    fraction ``timeout_rate`` time out: the transports raise
+    ``httpx.ReadTimeout``, and the ASGI application waits ``timeout_delay``
+    seconds before responding with an HTTP 504.
+
+    """
+
+    def __init__(
+        self,
+        passwords: typing.Optional[typing.Dict[str, int]] = None,
+        range_size: int = DEFAULT_RANGE_SIZE,
+        latency: typing.Optional[Latency] = None,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_delay: float = 30.0,
+        seed: int = 0,
+    ) -> None:
+        self.range_size = range_size
+        self.latency = latency or fixed_latency(0.0)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.seed = seed
+        self.planted: typing.Dict[str, typing.Dict[str, int]] = {}
+        for password, count in (passwords or {}).items():
+            password_hash = (
+                hashlib.new("sha1", password.encode("utf-8"), usedforsecurity=False)
+                .hexdigest()
+                .upper()
+            )
+            self.planted.setdefault(password_hash[:5], {})[password_hash[5:]] = count
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Generating a body takes a few milliseconds, which would otherwise dominate
+        # the time measured by a load test. Bodies are deterministic, so they can be
+        # cached.
+        self._cached_body = functools.lru_cache(maxsize=BODY_CACHE_SIZE)(
+            self._generate_body
+        )
+
+    def range_body(self, prefix: str, padded: bool = False) -> str:
+        """
+        Return the response body for the given hash prefix.
+
+        """
+        return self._cached_body(prefix.upper(), padded)
+
+    def _generate_body(self, prefix: str, padded: bool) -> str:
+        """
+        Generate the response body for the given uppercase hash prefix.
+
+        """
+        rng = random.Random(f"{self.seed}:{prefix}")
+        hits = {
+            f"{rng.getrandbits(140):035X}": rng.randint(1, 100000)
+            for _ in range(self.range_size)
+        }
+        hits.update(self.planted.get(prefix, {}))
+        if padded:
+            for _ in range(rng.randint(800, 1000)):
+                hits.setdefault(f"{rng.getrandbits(140):035X}", 0)
+        return "\r\n".join(f"{suffix}:{hits[suffix]}" for suffix in sorted(hits))
+
+    def _outcome(self) -> typing.Tuple[float, str]:
+        """
+        Decide the delay before responding to a request, and whether to respond
+        normally (``"ok"``), with an error (``"error"``), or by timing out
+        (``"timeout"``).
+
+        """
+        with self._lock:
+            delay = self.latency(self._rng)
+            roll = self._rng.random()
+        if roll < self.timeout_rate:
+            return delay, "timeout"
+        if roll < self.timeout_rate + self.error_rate:
+            return delay, "error"
+        return delay, "ok"
+
+    def _response(self, outcome: str, path: str, padded: bool) -> httpx.Response:
+        """
+        Return the response to a request for ``path`` with the given outcome.
+
+        """
+        match = PREFIX_RE.match(path)
+        if match is None:
+            return httpx.Response(HTTPStatus.NOT_FOUND)
+        if outcome == "error":
+            return httpx.Response(HTTPStatus.SERVICE_UNAVAILABLE)
+        return httpx.Response(
+            HTTPStatus.OK,
+            text=self.range_body(match.group(1), padded),
+        )
+
+    def transport(self) -> httpx.MockTransport:
+        """
+        Return a transport for a synchronous ``httpx.Client`` which sends all
+        requests to this server.
+
+        """
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            """
+            Respond to a request, blocking for the chosen latency.
+
+            """
+            delay, outcome = self._outcome()
+            time.sleep(delay)
+            if outcome == "timeout":
+                raise httpx.ReadTimeout("Timed out", request=request)
+            return self._response(
+                outcome, request.url.path, request.headers.get("Add-Padding") == "true"
+            )
+
+        return httpx.MockTransport(handler)
+
+    def async_transport(self) -> httpx.MockTransport:
+        """
+        Return a transport for an asynchronous ``httpx.AsyncClient`` which sends all
+        requests to this server.
+
+        """
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            """
+            Respond to a request, sleeping for the chosen latency.
+
+            """
+            delay, outcome = self._outcome()
+            await asyncio.sleep(delay)
+            if outcome == "timeout":
+                raise httpx.ReadTimeout("Timed out", request=request)
+            return self._response(
+                outcome, request.url.path, request.headers.get("Add-Padding") == "true"
+            )
+
+        return httpx.MockTransport(handler)
+
+    async def __call__(
+        self,
+        scope: typing.Dict[str, typing.Any],
+        receive: typing.Callable,
+        send: typing.Callable,
+    ) -> None:
+        """
+        Serve the range API as an ASGI application.
+
+        """
+        if scope["type"] != "http":
+            return
+        delay, outcome = self._outcome()
+        if outcome == "timeout":
+            await asyncio.sleep(self.timeout_delay)
+            response = httpx.Response(HTTPStatus.GATEWAY_TIMEOUT)
+        else:
+            await asyncio.sleep(delay)
+            headers = dict(scope.get("headers", []))
+            response = self._response(
+                outcome, scope["path"], headers.get(b"add-padding") == b"true"
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(response.content)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.content})
+
+
+# A default instance, so that a server can be run with, for example,
+# ``uvicorn pwned_passwords_django.testing:app``.
+app = FakeRangeServer()
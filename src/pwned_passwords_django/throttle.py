@@ -0,0 +1,225 @@
+"""
+Rate limiting of the error messages logged while Pwned Passwords is unavailable.
+
+During an outage, every check of a password fails, and logging a message for each
+failure would flood the logs (and slow down every request with the cost of logging).
+Instead, messages are rate-limited with a token bucket for each combination of logger
+and :class:`~pwned_passwords_django.exceptions.ErrorCode`. The number of messages
+suppressed is reported with the next message which is logged or, if there is none by
+the time the bucket has refilled enough to allow one, in a summary logged on its own,
+so that messages suppressed at the end of an outage are still counted.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import atexit
+import logging
+import threading
+import time
+import typing
+
+from django.conf import settings
+
+from .exceptions import ErrorCode
+
+# The default number of messages which may be logged per minute for each logger and
+# error code.
+DEFAULT_ERROR_LOG_RATE: int = 10
+
+Key = typing.Tuple[str, ErrorCode]
+
+# A logged message: its logger, format string and arguments.
+Message = typing.Tuple[logging.Logger, str, tuple]
+
+# A function which calls a function after a delay in seconds, returning an object
+# with a cancel() method; like threading.Timer, but already started.
+TimerFactory = typing.Callable[[float, typing.Callable[[], None]], typing.Any]
+
+
+def _start_timer(interval: float, function: typing.Callable[[], None]) -> typing.Any:
+    """
+    Start and return a daemon :class:`threading.Timer` calling ``function`` after
+    ``interval`` seconds.
+
+    """
+    timer = threading.Timer(interval, function)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class _Bucket:
+    """
+    A token bucket, a count of the messages suppressed since it last allowed one, and
+    the most recent of those messages, for the summary of them.
+
+    """
+
+    def __init__(self, tokens: float, updated: float, last: Message) -> None:
+        self.tokens = tokens
+        self.updated = updated
+        self.suppressed = 0
+        self.last = last
+        self.timer: typing.Any = None
+
+    def refill(self, now: float, rate: float) -> None:
+        """
+        Add the tokens accumulated since the bucket was last updated.
+
+        """
+        self.tokens = min(rate, self.tokens + (now - self.updated) * rate / 60)
+        self.updated = now
+
+
+class ErrorLogThrottle:
+    """
+    Rate limiter for logged error messages.
+
+    Each combination of logger and error code has its own token bucket holding up to
+    ``rate`` tokens, which refills at ``rate`` tokens per minute. Logging a message
+    takes a token; when there are none, the message is suppressed and counted
+    instead. Once the bucket has refilled enough to allow a message, the count is
+    logged in a summary, unless another message has reported it first.
+
+    """
+
+    def __init__(
+        self,
+        clock: typing.Callable[[], float] = time.monotonic,
+        timer: TimerFactory = _start_timer,
+    ) -> None:
+        self.clock = clock
+        self.timer = timer
+        self._buckets: typing.Dict[Key, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def _schedule(self, key: Key, bucket: _Bucket, rate: float) -> None:
+        """
+        Schedule the summary of the messages suppressed by ``bucket`` for when it
+        will next allow a message. Must be called with the lock held.
+
+        """
+        if bucket.timer is None:
+            bucket.timer = self.timer(
+                (1 - bucket.tokens) * 60 / rate, lambda: self._summarize(key, rate)
+            )
+
+    def _take(self, key: Key, rate: float, last: Message) -> typing.Optional[int]:
+        """
+        Try to take a token from the bucket for ``key``. If successful, return the
+        number of messages suppressed since the last one allowed, and reset that
+        count; otherwise, count ``last`` as a suppressed message, schedule the
+        summary of the suppressed messages, and return ``None``.
+
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(
+                    tokens=rate, updated=now, last=last
+                )
+            bucket.refill(now, rate)
+            if bucket.tokens < 1:
+                bucket.suppressed += 1
+                bucket.last = last
+                self._schedule(key, bucket, rate)
+                return None
+            bucket.tokens -= 1
+            suppressed, bucket.suppressed = bucket.suppressed, 0
+            return suppressed
+
+    def _summarize(self, key: Key, rate: float) -> None:
+        """
+        Log the summary of the messages suppressed by the bucket for ``key``, if
+        there are any and the bucket allows a message; if it does not yet, schedule
+        the summary again.
+
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            bucket.timer = None
+            if not bucket.suppressed:
+                return
+            bucket.refill(now, rate)
+            if bucket.tokens < 1:
+                self._schedule(key, bucket, rate)
+                return
+            bucket.tokens -= 1
+            suppressed, bucket.suppressed = bucket.suppressed, 0
+            last = bucket.last
+        self._log_summary(last, suppressed)
+
+    @staticmethod
+    def _log_summary(last: Message, suppressed: int) -> None:
+        """
+        Log that ``suppressed`` messages like ``last`` were suppressed.
+
+        """
+        logger, message, args = last
+        logger.error(f"{message} (%d similar messages suppressed)", *args, suppressed)
+
+    def flush(self) -> None:
+        """
+        Log the summaries of all suppressed messages not yet reported, regardless of
+        the rate limit. Called when the process exits.
+
+        """
+        with self._lock:
+            pending = []
+            for bucket in self._buckets.values():
+                if bucket.timer is not None:
+                    bucket.timer.cancel()
+                    bucket.timer = None
+                if bucket.suppressed:
+                    pending.append((bucket.last, bucket.suppressed))
+                    bucket.suppressed = 0
+        for last, suppressed in pending:
+            self._log_summary(last, suppressed)
+
+    def error(
+        self, logger: logging.Logger, code: ErrorCode, message: str, *args: typing.Any
+    ) -> None:
+        """
+        Log an error message (formatted with ``args``, as for :meth:`logging.Logger.error`)
+        to ``logger``, unless the rate limit for that logger and ``code`` has been
+        reached. The rate limit, in messages per minute, is
+        ``settings.PWNED_PASSWORDS["ERROR_LOG_RATE"]``; if that is ``None``, every
+        message is logged.
+
+        """
+        rate = getattr(settings, "PWNED_PASSWORDS", {}).get(
+            "ERROR_LOG_RATE", DEFAULT_ERROR_LOG_RATE
+        )
+        if rate is None:
+            logger.error(message, *args)
+            return
+        suppressed = self._take((logger.name, code), rate, (logger, message, args))
+        if suppressed is None:
+            return
+        if suppressed:
+            logger.error(
+                f"{message} (%d similar messages suppressed)", *args, suppressed
+            )
+        else:
+            logger.error(message, *args)
+
+    def reset(self) -> None:
+        """
+        Forget all rate-limiting state, without logging any summaries.
+
+        """
+        with self._lock:
+            for bucket in self._buckets.values():
+                if bucket.timer is not None:
+                    bucket.timer.cancel()
+            self._buckets.clear()
+
+
+error_log_throttle = ErrorLogThrottle()
+log_error = error_log_throttle.error
+atexit.register(error_log_throttle.flush)
@@ -0,0 +1,107 @@
+"""
+Optional measurement of the time ``pwned-passwords-django`` spends on each phase of
+checking the passwords submitted with a request, reported by the middleware in a
+``Server-Timing`` response header.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import contextvars
+import threading
+import time
+import typing
+
+# The phases which are measured, in the order they are reported.
+PARSE = "parse"
+CACHE = "cache"
+HASH = "hash"
+NET = "net"
+FALLBACK = "fallback"
+PHASES: typing.Tuple[str, ...] = (PARSE, CACHE, HASH, NET, FALLBACK)
+
+_timings: "contextvars.ContextVar[typing.Optional[Timings]]" = contextvars.ContextVar(
+    "pwned_passwords_django_timings", default=None
+)
+
+
+class Timings:
+    """
+    The total time, in seconds, spent on each phase of checking passwords while
+    handling a request.
+
+    When several checks run concurrently, the time each of them spends on a phase is
+    added to that phase's total, so a total may exceed the wall-clock time of the
+    request.
+
+    """
+
+    def __init__(self) -> None:
+        self._durations: typing.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, duration: float) -> None:
+        """
+        Add ``duration`` seconds to the total for ``phase``.
+
+        """
+        with self._lock:
+            self._durations[phase] = self._durations.get(phase, 0.0) + duration
+
+    def as_dict(self) -> typing.Dict[str, float]:
+        """
+        Return a :class:`dict` mapping each phase which took any time to its total, in
+        seconds.
+
+        """
+        with self._lock:
+            return {
+                phase: self._durations[phase]
+                for phase in PHASES
+                if phase in self._durations
+            }
+
+    def server_timing(self) -> str:
+        """
+        Return the totals formatted as the value of a ``Server-Timing`` header, in
+        milliseconds, such as ``pwned-net;dur=42.1;desc="net"``.
+
+        """
+        return ", ".join(
+            f'pwned-{phase};dur={duration * 1000:.1f};desc="{phase}"'
+            for phase, duration in self.as_dict().items()
+        )
+
+
+@contextlib.contextmanager
+def collect() -> typing.Iterator[Timings]:
+    """
+    Context manager which records, for its duration, the time spent on each phase of
+    checking passwords, and yields the :class:`Timings` in which they are recorded.
+
+    """
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextlib.contextmanager
+def measure(phase: str) -> typing.Iterator[None]:
+    """
+    Context manager which adds the time spent within it to the total for ``phase``,
+    if timings are being collected.
+
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
@@ -6,18 +6,22 @@ compromised passwords.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+import contextvars
 import logging
 import typing
 
 from django.contrib.auth.base_user import AbstractBaseUser
-from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.contrib.auth.password_validation import (
+    CommonPasswordValidator,
+    get_default_password_validators,
+)
 from django.core.exceptions import ValidationError
 from django.utils.functional import Promise
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import ngettext
 from django.views.decorators.debug import sensitive_variables
 
-from . import api, exceptions
+from . import api, exceptions, fallback, memo, throttle, timing
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +48,12 @@ class PwnedPasswordsValidator:
         help_message: typing.Optional[Message] = None,
         api_client: api.PwnedPasswords = api.default_client,
     ) -> None:
-        self.fallback_validator = CommonPasswordValidator()
-        self.help_message = help_message or self.fallback_validator.get_help_text()
+        self.help_message = (
+            help_message or fallback.common_password_validator.get_help_text()
+        )
         error_message = error_message or self.default_error_message
         self.api_client = api_client
+        self._fallback_validator: typing.Optional[CommonPasswordValidator] = None
 
         # If there is no plural, use the same message for both forms.
         if isinstance(error_message, (str, Promise)):
@@ -65,33 +71,235 @@ class PwnedPasswordsValidator:
         This method is called by most high-level account-creation and account-editing
         operations in Django.
 
+        If ``settings.PWNED_PASSWORDS["CHECK_COMMON_FIRST"]`` is enabled, a password
+        appearing in the list of common passwords bundled with Django is rejected
+        without contacting Pwned Passwords, with a breach count of 1.
+
+        When :ref:`the middleware <middleware>` is enabled and has already checked
+        this password while handling the current request, its result is used instead
+        of checking again.
+
         :raises django.core.exceptions.ValidationError: when the proposed password is
           compromised.
 
         """
         # pylint: disable=unused-argument
-        try:
-            amount = self.api_client.check_password(password)
-        except exceptions.PwnedPasswordsError:
-            # HIBP API failure. Instead of allowing a potentially compromised
-            # password, check Django's list of common passwords generated from
-            # the same database.
-            logger.error(
-                "Falling back to Django CommonPasswordValidator due "
-                "to error contacting Pwned Passwords."
+        amount = self._common_amount(password)
+        if amount is None:
+            amount = memo.lookup(password, self.api_client.metrics)
+        if amount is None:
+            try:
+                amount = self.api_client.check_password(password)
+            except exceptions.PwnedPasswordsError as exc:
+                self._fall_back(password, exc.code)
+                return
+            memo.record(password, amount)
+        self._validate_amount(amount)
+
+    @sensitive_variables()
+    async def avalidate(
+        self, password: str, user: typing.Optional[AbstractBaseUser] = None
+    ):
+        """
+        Asynchronous version of :meth:`validate`, which checks the password with
+        the asynchronous HTTP client.
+
+        Django does not call this method itself; use
+        :func:`~pwned_passwords_django.validators.avalidate_password` to run all
+        configured password validators from async code.
+
+        :raises django.core.exceptions.ValidationError: when the proposed password is
+          compromised.
+
+        """
+        # pylint: disable=unused-argument
+        amount = self._common_amount(password)
+        if amount is None:
+            amount = await memo.alookup(password, self.api_client.metrics)
+        if amount is None:
+            try:
+                amount = await self.api_client.check_password_async(password)
+            except exceptions.PwnedPasswordsError as exc:
+                self._fall_back(password, exc.code)
+                return
+            memo.record(password, amount)
+        self._validate_amount(amount)
+
+    @sensitive_variables()
+    def validate_many(
+        self,
+        passwords: typing.Iterable[str],
+        user: typing.Optional[AbstractBaseUser] = None,
+    ) -> typing.List[typing.Optional[ValidationError]]:
+        """
+        Check many passwords against Pwned Passwords, for example when importing
+        accounts in bulk, and return a list of the same length as ``passwords``
+        containing, for each password, the ``ValidationError`` :meth:`validate` would
+        raise for it, or ``None`` if it is not compromised.
+
+        This is much faster than calling :meth:`validate` for each password: the
+        passwords are checked by
+        :meth:`~pwned_passwords_django.api.PwnedPasswords.check_passwords`, which
+        requests each distinct hash prefix only once, and makes several requests at a
+        time. If the request for a hash prefix fails, only the passwords having that
+        prefix are checked with the fallback validator.
+
+        """
+        # pylint: disable=unused-argument
+        passwords = list(passwords)
+        amounts = self._known_amounts(passwords)
+        unknown = [password for password in passwords if password not in amounts]
+        if unknown:
+            amounts.update(self.api_client.check_passwords(unknown))
+        return self._validate_amounts(passwords, amounts)
+
+    @sensitive_variables()
+    async def avalidate_many(
+        self,
+        passwords: typing.Iterable[str],
+        user: typing.Optional[AbstractBaseUser] = None,
+    ) -> typing.List[typing.Optional[ValidationError]]:
+        """
+        Asynchronous version of :meth:`validate_many`, which checks the passwords
+        with the asynchronous HTTP client.
+
+        """
+        # pylint: disable=unused-argument
+        passwords = list(passwords)
+        amounts = self._known_amounts(passwords)
+        for password in passwords:
+            if password not in amounts:
+                amount = await memo.alookup(password)
+                if amount is not None:
+                    amounts[password] = amount
+        unknown = [password for password in passwords if password not in amounts]
+        if unknown:
+            amounts.update(await self.api_client.check_passwords_async(unknown))
+        return self._validate_amounts(passwords, amounts)
+
+    @sensitive_variables()
+    def _known_amounts(self, passwords: typing.List[str]) -> typing.Dict[str, int]:
+        """
+        Return a mapping of each of the given passwords whose breach count is already
+        known, without contacting Pwned Passwords, to that count.
+
+        """
+        amounts = {}
+        for password in passwords:
+            amount = self._common_amount(password)
+            if amount is None:
+                amount = memo.lookup(password, self.api_client.metrics)
+            if amount is not None:
+                amounts[password] = amount
+        return amounts
+
+    @sensitive_variables()
+    def _validate_amounts(
+        self,
+        passwords: typing.List[str],
+        amounts: typing.Dict[str, api.BatchResult],
+    ) -> typing.List[typing.Optional[ValidationError]]:
+        """
+        Given some passwords and the result of checking each of them, return the
+        ``ValidationError``, if any, for each password.
+
+        """
+        errors: typing.Dict[str, typing.Optional[ValidationError]] = {}
+        failed = [
+            password
+            for password in amounts
+            if isinstance(amounts[password], exceptions.PwnedPasswordsError)
+        ]
+        if failed:
+            throttle.log_error(
+                logger,
+                amounts[failed[0]].code,
+                "Falling back to Django CommonPasswordValidator for %d passwords due "
+                "to error contacting Pwned Passwords.",
+                len(failed),
             )
+            self.api_client.metrics.record_fallback(len(failed))
+        for password, amount in amounts.items():
+            try:
+                if isinstance(amount, exceptions.PwnedPasswordsError):
+                    self.fallback_validator.validate(password)
+                else:
+                    memo.record(password, amount)
+                    self._validate_amount(amount)
+            except ValidationError as error:
+                errors[password] = error
+        return [errors.get(password) for password in passwords]
+
+    @sensitive_variables()
+    def _common_amount(self, password: str) -> typing.Optional[int]:
+        """
+        If ``settings.PWNED_PASSWORDS["CHECK_COMMON_FIRST"]`` is enabled and the
+        password is in the list of common passwords, return its approximate breach
+        count; otherwise return ``None``.
+
+        """
+        if fallback.check_common_first() and fallback.is_common_password(password):
+            # Every entry in Django's list of common passwords comes from breach
+            # data, so there's no need to ask Pwned Passwords about it; only the
+            # count is unknown.
+            return fallback.COMMON_PASSWORD_COUNT
+        return None
+
+    @sensitive_variables()
+    def _fall_back(self, password: str, code: exceptions.ErrorCode) -> None:
+        """
+        Check the password with the fallback validator, after a failure to contact
+        Pwned Passwords.
+
+        """
+        # HIBP API failure. Instead of allowing a potentially compromised password,
+        # check Django's list of common passwords generated from the same database.
+        throttle.log_error(
+            logger,
+            code,
+            "Falling back to Django CommonPasswordValidator due "
+            "to error contacting Pwned Passwords.",
+        )
+        self.api_client.metrics.record_fallback()
+        with timing.measure(timing.FALLBACK):
             self.fallback_validator.validate(password)
-        else:
-            if amount:
-                raise ValidationError(
-                    ngettext(
-                        self.error_message["singular"],
-                        self.error_message["plural"],
-                        amount,
-                    ),
-                    params={"amount": amount},
-                    code="password_compromised",
-                )
+
+    def _validate_amount(self, amount: int) -> None:
+        """
+        Raise ``ValidationError`` if the given breach count is nonzero.
+
+        """
+        if amount:
+            raise ValidationError(
+                ngettext(
+                    self.error_message["singular"],
+                    self.error_message["plural"],
+                    amount,
+                ),
+                params={"amount": amount},
+                code="password_compromised",
+            )
+
+    @property
+    def fallback_validator(self) -> CommonPasswordValidator:
+        """
+        The validator used when Pwned Passwords cannot be contacted; see
+        :func:`~pwned_passwords_django.fallback.get_fallback_validator`. It can be
+        replaced for this validator instance by assigning to this attribute.
+
+        """
+        if self._fallback_validator is not None:
+            return self._fallback_validator
+        return fallback.get_fallback_validator()
+
+    @fallback_validator.setter
+    def fallback_validator(self, value: CommonPasswordValidator) -> None:
+        """
+        Set the validator used by this instance when Pwned Passwords cannot be
+        contacted.
+
+        """
+        self._fallback_validator = value
 
     def get_help_text(self) -> Message:
         """
@@ -134,3 +342,107 @@ class PwnedPasswordsValidator:
             self.error_message == other.error_message
             and self.help_message == other.help_message
         )
+
+
+@sensitive_variables()
+def validate_password_concurrently(
+    password: str,
+    user: typing.Optional[AbstractBaseUser] = None,
+    password_validators: typing.Optional[typing.Sequence[typing.Any]] = None,
+) -> None:
+    """
+    Equivalent of Django's
+    :func:`~django.contrib.auth.password_validation.validate_password` which
+    overlaps the round trip to Pwned Passwords with the work of the other validators.
+
+    Each :class:`PwnedPasswordsValidator` among ``password_validators`` (by default,
+    the validators configured in the :setting:`AUTH_PASSWORD_VALIDATORS` setting) is
+    started first, on the shared thread pool returned by
+    :func:`~pwned_passwords_django.api.get_executor`. The other validators then run
+    on the calling thread while the check is in flight. If any of them rejects the
+    password, their errors are raised immediately: a check which has not yet started
+    is cancelled, and one already in flight is not waited for. Otherwise, the result
+    of the Pwned Passwords check is waited for; if the thread pool was too busy to
+    start the check by then, it is made on the calling thread instead, so that many
+    concurrent callers are never slower than with
+    :func:`~django.contrib.auth.password_validation.validate_password`.
+
+    :raises django.core.exceptions.ValidationError: with all error messages, if the
+       password fails any validator.
+
+    """
+    if password_validators is None:
+        password_validators = get_default_password_validators()
+    futures = [
+        (
+            validator,
+            # Run in a copy of the current context, so that the check shares results
+            # recorded while handling the current request.
+            api.get_executor().submit(
+                contextvars.copy_context().run, validator.validate, password, user
+            ),
+        )
+        for validator in password_validators
+        if isinstance(validator, PwnedPasswordsValidator)
+    ]
+    errors = []
+    for validator in password_validators:
+        if isinstance(validator, PwnedPasswordsValidator):
+            continue
+        try:
+            validator.validate(password, user)
+        except ValidationError as error:
+            errors.append(error)
+    if errors:
+        for _validator, future in futures:
+            future.cancel()
+        raise ValidationError(errors)
+    for validator, future in futures:
+        try:
+            if future.cancel():
+                # Every thread in the pool is busy, so rather than wait for one,
+                # check on this thread, which would only be waiting anyway.
+                validator.validate(password, user)
+            else:
+                future.result()
+        except ValidationError as error:
+            errors.append(error)
+    if errors:
+        raise ValidationError(errors)
+
+
+@sensitive_variables()
+async def avalidate_password(
+    password: str,
+    user: typing.Optional[AbstractBaseUser] = None,
+    password_validators: typing.Optional[typing.Sequence[typing.Any]] = None,
+) -> None:
+    """
+    Asynchronous equivalent of Django's
+    :func:`~django.contrib.auth.password_validation.validate_password`.
+
+    Runs each of ``password_validators`` (by default, the validators configured in
+    the :setting:`AUTH_PASSWORD_VALIDATORS` setting) against the password. Validators
+    which provide an ``avalidate()`` method, such as :class:`PwnedPasswordsValidator`,
+    are awaited, so that no thread is blocked waiting on network I/O; others are
+    called directly, since Django's built-in validators do only a small amount of
+    local work.
+
+    :raises django.core.exceptions.ValidationError: with all error messages, if the
+       password fails any validator.
+
+    """
+    errors = []
+    if password_validators is None:
+        password_validators = get_default_password_validators()
+    for validator in password_validators:
+        try:
+            avalidate = getattr(validator, "avalidate", None)
+            if avalidate is not None:
+                await avalidate(password, user)
+            else:
+                validator.validate(password, user)
+        except ValidationError as error:
+            errors.append(error)
+    if errors:
+        raise ValidationError(errors)
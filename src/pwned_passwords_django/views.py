@@ -0,0 +1,57 @@
+"""
+Views provided by pwned-passwords-django.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django import http
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from . import api, mirror
+from .metrics import InMemoryMetrics, export_prometheus
+
+
+def metrics(request: http.HttpRequest) -> http.HttpResponse:
+    """
+    Expose the metrics of the default API client in the Prometheus text exposition
+    format, when ``settings.PWNED_PASSWORDS["METRICS"]`` is
+    ``"pwned_passwords_django.metrics.InMemoryMetrics"``; otherwise, respond with a
+    404.
+
+    This view performs no access control of its own. Restrict access to it -- for
+    example, with :func:`~django.contrib.admin.views.decorators.staff_member_required`
+    or at your web server -- before adding it to your URL configuration.
+
+    """
+    # pylint: disable=unused-argument
+    collected = api.default_client.metrics
+    if not isinstance(collected, InMemoryMetrics):
+        raise http.Http404("In-memory metrics are not enabled.")
+    return http.HttpResponse(
+        export_prometheus(collected),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@require_safe
+def range_api(request: http.HttpRequest, prefix: str) -> http.HttpResponse:
+    """
+    Serve the Pwned Passwords range API for ``prefix`` from the mirror in
+    ``settings.PWNED_PASSWORDS["MIRROR_DIRECTORY"]``, padding the response if the
+    request has an ``Add-Padding: true`` header, and allowing caches to store it for
+    ``settings.PWNED_PASSWORDS["MIRROR_MAX_AGE"]`` seconds.
+
+    """
+    if not mirror.PREFIX_RE.fullmatch(prefix):
+        raise http.Http404("Not a hash prefix.")
+    local_mirror = mirror.get_mirror()
+    padded = request.headers.get("Add-Padding", "").lower() == "true"
+    headers = local_mirror.headers(prefix, padded, mirror.get_max_age())
+    response = get_conditional_response(request, etag=headers["ETag"])
+    if response is None:
+        response = http.HttpResponse(local_mirror.body(prefix, padded))
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -5,8 +5,9 @@ Base test-case class for pwned-passwords-django.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+import hashlib
 from http import HTTPStatus
-from typing import Awaitable, Callable, Optional, Tuple
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 from unittest import mock
 
 try:
@@ -17,7 +18,7 @@ except ImportError:
 import httpx
 from django.test import TestCase
 
-from pwned_passwords_django import api, exceptions
+from pwned_passwords_django import api, exceptions, throttle
 
 
 class PwnedPasswordsTests(TestCase):
@@ -30,6 +31,16 @@ class PwnedPasswordsTests(TestCase):
     sample_password_prefix = "4F571"  # nosec: B105
     sample_password_suffix = "81DCAADE980555F2CE6755CA425F00658BE"  # nosec: B105
 
+    def setUp(self):
+        """
+        Reset the rate limiting of logged errors, so that each test sees all of its
+        own, and no summary of suppressed errors is logged during a later test.
+
+        """
+        super().setUp()
+        throttle.error_log_throttle.reset()
+        self.addCleanup(throttle.error_log_throttle.reset)
+
     def custom_response_transport(
         self, response_text: str, status_code: HTTPStatus = HTTPStatus.OK
     ) -> httpx.MockTransport:
@@ -55,6 +66,47 @@ class PwnedPasswordsTests(TestCase):
 
         return httpx.MockTransport(_handler)
 
+    def range_transport(
+        self,
+        counts: Dict[str, int],
+        failing_prefixes: Iterable[str] = (),
+        requested: Optional[List[str]] = None,
+    ) -> httpx.MockTransport:
+        """
+        Return an ``httpx`` transport that behaves like the Pwned Passwords range API
+        for the given mapping of passwords to breach counts, for use in testing.
+
+        Requests for any of ``failing_prefixes`` receive an HTTP 503 response. If
+        ``requested`` is given, the prefix of each request is appended to it.
+
+        """
+        ranges: Dict[str, List[str]] = {}
+        for password, count in counts.items():
+            password_hash = (
+                hashlib.new("sha1", password.encode("utf-8"), usedforsecurity=False)
+                .hexdigest()
+                .upper()
+            )
+            ranges.setdefault(password_hash[:5], []).append(
+                f"{password_hash[5:]}:{count}"
+            )
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            """
+            Mock transport handler which returns the range for the requested prefix.
+
+            """
+            prefix = request.url.path.rsplit("/", 1)[-1]
+            if requested is not None:
+                requested.append(prefix)
+            if prefix in failing_prefixes:
+                return httpx.Response(status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+            return httpx.Response(
+                status_code=HTTPStatus.OK, content="\r\n".join(ranges.get(prefix, []))
+            )
+
+        return httpx.MockTransport(_handler)
+
     def custom_response_sync_client(
         self, response_text: str, status_code: HTTPStatus = HTTPStatus.OK
     ) -> httpx.Client:
@@ -7,7 +7,12 @@ Minimal Django settings file for test runs.
 
 from django.utils.crypto import get_random_string
 
-INSTALLED_APPS = ["pwned_passwords_django"]
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "pwned_passwords_django",
+    "pwned_passwords_django.db_mirror",
+]
 ROOT_URLCONF = "tests.urls"
 DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
 MIDDLEWARE = [
@@ -11,7 +11,7 @@ from unittest import mock
 import httpx
 from django.test import override_settings, tag
 
-from pwned_passwords_django import api, exceptions
+from pwned_passwords_django import api, background, exceptions
 
 from . import base
 
@@ -393,3 +393,119 @@ class PwnedPasswordsAPITests(base.PwnedPasswordsTests):
         """
         result = await api.check_password_async("password")
         assert result > 0
+
+    def test_check_passwords(self):
+        """
+        Checking many passwords requests each distinct hash prefix once, and reports
+        a failure to fetch a prefix only for the passwords having that prefix.
+
+        """
+        # "swordfish" and "hunter2" have different prefixes; the failing prefix is
+        # that of "hunter2".
+        requested = []
+        api_client = api.PwnedPasswords(
+            client=httpx.Client(
+                transport=self.range_transport(
+                    {self.sample_password: 100},
+                    failing_prefixes=["F3BBB"],
+                    requested=requested,
+                )
+            )
+        )
+        results = api_client.check_passwords(
+            [self.sample_password, "hunter2", self.sample_password, "correct horse"]
+        )
+        assert results[self.sample_password] == 100
+        assert results["correct horse"] == 0
+        assert isinstance(results["hunter2"], exceptions.PwnedPasswordsError)
+        assert results["hunter2"].code == exceptions.ErrorCode.HTTP_ERROR
+        assert sorted(requested) == sorted(set(requested))
+        assert len(requested) == 3
+
+        assert not api_client.check_passwords([])
+        with self.assertRaises(TypeError):
+            api_client.check_passwords([self.sample_password.encode("utf-8")])
+
+    async def test_check_passwords_async(self):
+        """
+        Checking many passwords requests each distinct hash prefix once, and reports
+        a failure to fetch a prefix only for the passwords having that prefix, in the
+        async code path.
+
+        """
+        requested = []
+        api_client = api.PwnedPasswords(
+            async_client=httpx.AsyncClient(
+                transport=self.range_transport(
+                    {self.sample_password: 100},
+                    failing_prefixes=["F3BBB"],
+                    requested=requested,
+                )
+            )
+        )
+        results = await api_client.check_passwords_async(
+            [self.sample_password, "hunter2", self.sample_password, "correct horse"],
+            max_concurrency=1,
+        )
+        assert results[self.sample_password] == 100
+        assert results["correct horse"] == 0
+        assert isinstance(results["hunter2"], exceptions.PwnedPasswordsError)
+        assert len(requested) == 3
+
+        assert not await api_client.check_passwords_async([])
+        with self.assertRaises(TypeError):
+            await api_client.check_passwords_async(
+                [self.sample_password.encode("utf-8")]
+            )
+
+    def test_check_hashes(self):
+        """
+        Checking many SHA-1 hashes requests each distinct prefix once, in either
+        case, and rejects values which are not hashes.
+
+        """
+        sample_hash = self.sample_password_prefix + self.sample_password_suffix
+        requested = []
+        api_client = api.PwnedPasswords(
+            client=httpx.Client(
+                transport=self.range_transport(
+                    {self.sample_password: 100}, requested=requested
+                )
+            )
+        )
+        results = api_client.check_hashes([sample_hash, sample_hash.lower(), "0" * 40])
+        assert results == {sample_hash: 100, sample_hash.lower(): 100, "0" * 40: 0}
+        assert len(requested) == 2
+        with self.assertRaises(TypeError):
+            api_client.check_hashes([sample_hash.encode("ascii")])
+        for invalid in (sample_hash[:-1], "Z" * 40):
+            with self.assertRaises(ValueError):
+                api_client.check_hashes([invalid])
+
+    async def test_check_hashes_async(self):
+        """
+        Checking many SHA-1 hashes works in the async code path.
+
+        """
+        sample_hash = self.sample_password_prefix + self.sample_password_suffix
+        api_client = api.PwnedPasswords(
+            async_client=httpx.AsyncClient(
+                transport=self.range_transport({self.sample_password: 100})
+            )
+        )
+        assert await api_client.check_hashes_async([sample_hash, "0" * 40]) == {
+            sample_hash: 100,
+            "0" * 40: 0,
+        }
+
+    def test_in_worker_thread(self):
+        """
+        Threads in the thread pools of pwned-passwords-django are distinguished from
+        other threads.
+
+        """
+        assert not api.in_worker_thread()
+        assert api.get_executor().submit(api.in_worker_thread).result()
+        queue = background.BackgroundQueue()
+        self.addCleanup(queue.drain)
+        assert queue.submit(api.in_worker_thread).result()
@@ -0,0 +1,459 @@
+"""
+Tests for pwned-passwords-django's bulk audit of password and hash files, and of
+users' unsalted SHA-1 password hashes.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+
+from pwned_passwords_django import api, audit, exceptions, mirror
+
+from .base import PwnedPasswordsTests
+
+
+def sha1(password: str) -> str:
+    """
+    Return the SHA-1 hash of a password, in uppercase hexadecimal.
+
+    """
+    return (
+        hashlib.new("sha1", password.encode(), usedforsecurity=False)
+        .hexdigest()
+        .upper()
+    )
+
+
+class AuditTests(PwnedPasswordsTests):
+    """
+    Test the bulk audit of password and hash files.
+
+    """
+
+    # Passwords and breach counts known to the test API and mirror.
+    passwords = {"swordfish": 500, "hunter2": 10}
+
+    def setUp(self):
+        """
+        Write a file of passwords to audit, and create an API client which knows
+        the test passwords.
+
+        """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.source = os.path.join(self.temp_dir, "passwords.txt")
+        with open(self.source, "w", encoding="utf-8", newline="") as source:
+            source.write("swordfish\r\ncorrect horse\n\nhunter2\nswordfish\n")
+        self.output = os.path.join(self.temp_dir, "results.csv")
+        self.checkpoint = os.path.join(self.temp_dir, "audit.json")
+        self.client = api.PwnedPasswords(
+            client=httpx.Client(transport=self.range_transport(self.passwords))
+        )
+
+    def read_results(self):
+        """
+        Return the rows of the audit's output file.
+
+        """
+        with open(self.output, encoding="utf-8", newline="") as output:
+            return list(csv.reader(output))
+
+    @property
+    def expected(self):
+        """
+        The rows expected in the output of auditing the source file.
+
+        """
+        return [
+            list(audit.OUTPUT_HEADER),
+            ["1", sha1("swordfish"), "500"],
+            ["4", sha1("hunter2"), "10"],
+            ["5", sha1("swordfish"), "500"],
+        ]
+
+    def test_hash_lines(self):
+        """
+        Plaintext lines are hashed without their line endings, and SHA-1 lines have
+        their hash extracted; lines which cannot be checked are ``None``.
+
+        """
+        assert audit.hash_lines([b"swordfish\r\n", b"\n", b"hunter2"], "plaintext") == [
+            sha1("swordfish"),
+            None,
+            sha1("hunter2"),
+        ]
+        assert audit.hash_lines(
+            [
+                f"{sha1('swordfish').lower()}:500\n".encode(),
+                b"nothex\n",
+                b"Z" * 40 + b"\n",
+                f" {sha1('hunter2')} \n".encode(),
+            ],
+            "sha1",
+        ) == [sha1("swordfish"), None, None, sha1("hunter2")]
+
+    def test_command(self):
+        """
+        The audit command writes the compromised lines as CSV, and reports its
+        progress.
+
+        """
+        stderr = io.StringIO()
+        with mock.patch.object(api, "default_client", self.client):
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                output=self.output,
+                chunk_size=2,
+                processes=1,
+                stderr=stderr,
+            )
+        assert self.read_results() == self.expected
+        assert "100.0%: checked 5 lines, 3 compromised, 1 skipped." in (
+            stderr.getvalue()
+        )
+
+        stdout = io.StringIO()
+        with mock.patch.object(api, "default_client", self.client):
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                processes=1,
+                stdout=stdout,
+                stderr=io.StringIO(),
+            )
+        assert list(csv.reader(io.StringIO(stdout.getvalue()))) == self.expected
+
+    def test_sha1_input(self):
+        """
+        SHA-1 input is checked against the bulk index of a local mirror.
+
+        """
+        directory = os.path.join(self.temp_dir, "mirror")
+        hashes = {sha1(password): count for password, count in self.passwords.items()}
+        mirror.build_mirror(
+            [f"{line_hash}:{hashes[line_hash]}" for line_hash in sorted(hashes)],
+            directory,
+            bulk_index=True,
+        )
+        with open(self.source, "w", encoding="utf-8") as source:
+            source.write(
+                f"{sha1('swordfish')}:1\n{sha1('correct horse')}\nnothex\n"
+                f"{sha1('hunter2').lower()}\n{sha1('swordfish')}\n"
+            )
+        call_command(
+            "pwned_passwords_audit",
+            self.source,
+            format="sha1",
+            mirror=directory,
+            output=self.output,
+            processes=1,
+            stderr=io.StringIO(),
+        )
+        assert self.read_results() == self.expected
+
+    def test_processes(self):
+        """
+        Hashing in a process pool produces the same results as hashing in the
+        current process.
+
+        """
+        with open(self.output, "w", encoding="utf-8", newline="") as output:
+            result = audit.run_audit(
+                self.source,
+                output,
+                audit.api_resolver(self.client),
+                chunk_size=1,
+                processes=2,
+            )
+        assert result == audit.Progress(offset=44, lines=5, compromised=3, skipped=1)
+        assert self.read_results() == self.expected
+
+    def test_resume(self):
+        """
+        An audit interrupted by an error resumes from its checkpoint, without
+        repeating or losing results, and removes the checkpoint when it completes.
+
+        """
+        failing_client = api.PwnedPasswords(
+            client=httpx.Client(
+                transport=self.range_transport(
+                    self.passwords, failing_prefixes=[sha1("hunter2")[:5]]
+                )
+            )
+        )
+        with mock.patch.object(api, "default_client", failing_client):
+            with self.assertRaisesMessage(CommandError, "same --checkpoint"):
+                call_command(
+                    "pwned_passwords_audit",
+                    self.source,
+                    output=self.output,
+                    checkpoint=self.checkpoint,
+                    chunk_size=2,
+                    processes=1,
+                    stderr=io.StringIO(),
+                )
+        assert self.read_results() == self.expected[:2]
+        assert audit.load_checkpoint(self.checkpoint, self.source) == audit.Progress(
+            offset=25,
+            lines=2,
+            compromised=1,
+            skipped=0,
+            output_offset=os.path.getsize(self.output),
+        )
+
+        with mock.patch.object(api, "default_client", self.client):
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                output=self.output,
+                checkpoint=self.checkpoint,
+                chunk_size=2,
+                processes=1,
+                stderr=io.StringIO(),
+            )
+        assert self.read_results() == self.expected
+        assert not os.path.exists(self.checkpoint)
+
+    def test_resume_after_crash(self):
+        """
+        An audit which stopped after writing the results of a chunk, but before
+        recording its progress, does not repeat those results when resumed.
+
+        """
+        save_checkpoint = audit.save_checkpoint
+        saved = []
+
+        def crash(*args):
+            """
+            Save the first checkpoint, and crash before saving the second.
+
+            """
+            if saved:
+                raise RuntimeError("Crashed.")
+            saved.append(args)
+            save_checkpoint(*args)
+
+        with mock.patch.object(api, "default_client", self.client):
+            with mock.patch.object(audit, "save_checkpoint", side_effect=crash):
+                with self.assertRaisesMessage(RuntimeError, "Crashed."):
+                    call_command(
+                        "pwned_passwords_audit",
+                        self.source,
+                        output=self.output,
+                        checkpoint=self.checkpoint,
+                        chunk_size=2,
+                        processes=1,
+                        stderr=io.StringIO(),
+                    )
+            assert self.read_results() == self.expected[:3]
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                output=self.output,
+                checkpoint=self.checkpoint,
+                chunk_size=2,
+                processes=1,
+                stderr=io.StringIO(),
+            )
+        assert self.read_results() == self.expected
+
+    def test_errors(self):
+        """
+        Errors are reported as command errors.
+
+        """
+        with self.assertRaisesMessage(CommandError, "--checkpoint requires --output"):
+            call_command(
+                "pwned_passwords_audit", self.source, checkpoint=self.checkpoint
+            )
+        with self.assertRaises(CommandError):
+            call_command(
+                "pwned_passwords_audit", os.path.join(self.temp_dir, "missing.txt")
+            )
+
+        with open(self.checkpoint, "w", encoding="utf-8") as checkpoint:
+            json.dump(["not", "a", "checkpoint"], checkpoint)
+        with self.assertRaisesMessage(CommandError, "not a valid audit checkpoint"):
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                output=self.output,
+                checkpoint=self.checkpoint,
+            )
+        audit.save_checkpoint(
+            self.checkpoint,
+            os.path.join(self.temp_dir, "other.txt"),
+            audit.Progress(offset=0, lines=0, compromised=0, skipped=0),
+        )
+        with self.assertRaisesMessage(CommandError, "is a checkpoint for"):
+            call_command(
+                "pwned_passwords_audit",
+                self.source,
+                output=self.output,
+                checkpoint=self.checkpoint,
+            )
+
+        error = exceptions.PwnedPasswordsError(
+            message="Pwned Passwords API timed out.",
+            code=exceptions.ErrorCode.API_TIMEOUT,
+            params={},
+        )
+        with mock.patch.object(
+            api.default_client, "check_hashes", return_value={"X": error}
+        ):
+            with self.assertRaisesMessage(CommandError, error.message):
+                call_command(
+                    "pwned_passwords_audit",
+                    self.source,
+                    processes=1,
+                    stdout=io.StringIO(),
+                    stderr=io.StringIO(),
+                )
+
+
+class UserAuditTests(PwnedPasswordsTests):
+    """
+    Test the audit of users' unsalted SHA-1 password hashes.
+
+    """
+
+    def setUp(self):
+        """
+        Create users with passwords in various formats, and an API client which
+        knows the test passwords.
+
+        """
+        super().setUp()
+        user_model = get_user_model()
+        self.users = {
+            username: user_model.objects.create(username=username, password=password)
+            for username, password in (
+                ("alice", f"sha1$${sha1('swordfish').lower()}"),
+                ("bob", f"sha1$${sha1('correct horse').lower()}"),
+                ("carol", make_password("swordfish")),
+                ("dave", f"sha1$${sha1('hunter2').lower()}"),
+                ("eve", "sha1$$nothex"),
+            )
+        }
+        self.client = api.PwnedPasswords(
+            client=httpx.Client(
+                transport=self.range_transport({"swordfish": 500, "hunter2": 10})
+            )
+        )
+
+    def test_unsalted_sha1_hash(self):
+        """
+        The hash is extracted only from passwords encoded by the unsalted SHA-1
+        hasher.
+
+        """
+        assert audit.unsalted_sha1_hash(self.users["alice"].password) == sha1(
+            "swordfish"
+        )
+        assert audit.unsalted_sha1_hash(self.users["carol"].password) is None
+        assert audit.unsalted_sha1_hash(self.users["eve"].password) is None
+
+    def test_check_users(self):
+        """
+        Every user with an unsalted SHA-1 password hash is checked, a chunk at a
+        time, requesting each hash prefix once per chunk.
+
+        """
+        requested = []
+        client = api.PwnedPasswords(
+            client=httpx.Client(
+                transport=self.range_transport(
+                    {"swordfish": 500, "hunter2": 10}, requested=requested
+                )
+            )
+        )
+        results = {
+            user.username: count
+            for user, count in audit.check_unsalted_sha1_users(
+                audit.api_resolver(client), chunk_size=2
+            )
+        }
+        assert results == {"alice": 500, "bob": 0, "dave": 10}
+        assert len(requested) == 3
+
+    def test_command(self):
+        """
+        The command writes the compromised accounts as CSV, without changing them.
+
+        """
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with mock.patch.object(api, "default_client", self.client):
+            call_command("pwned_passwords_audit_users", stdout=stdout, stderr=stderr)
+        assert list(csv.reader(io.StringIO(stdout.getvalue()))) == [
+            ["pk", "username", "count"],
+            [str(self.users["alice"].pk), "alice", "500"],
+            [str(self.users["dave"].pk), "dave", "10"],
+        ]
+        assert "Checked 3 accounts" in stderr.getvalue()
+        assert "2 compromised" in stderr.getvalue()
+
+        for user in self.users.values():
+            password = user.password
+            user.refresh_from_db()
+            assert user.password == password
+
+    def test_command_mirror(self):
+        """
+        The command can check hashes against the bulk index of a local mirror.
+
+        """
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        hashes = {sha1("swordfish"): 500, sha1("hunter2"): 10}
+        mirror.build_mirror(
+            [f"{line_hash}:{hashes[line_hash]}" for line_hash in sorted(hashes)],
+            temp_dir.name,
+            bulk_index=True,
+        )
+        stdout = io.StringIO()
+        call_command(
+            "pwned_passwords_audit_users",
+            mirror=temp_dir.name,
+            chunk_size=1,
+            stdout=stdout,
+            stderr=io.StringIO(),
+        )
+        assert len(stdout.getvalue().splitlines()) == 3
+
+    def test_command_errors(self):
+        """
+        Errors are reported as command errors.
+
+        """
+        with self.assertRaises(CommandError):
+            call_command(
+                "pwned_passwords_audit_users",
+                mirror=os.path.join(tempfile.gettempdir(), "no-such-mirror"),
+                stdout=io.StringIO(),
+            )
+        error = exceptions.PwnedPasswordsError(
+            message="Pwned Passwords API timed out.",
+            code=exceptions.ErrorCode.API_TIMEOUT,
+            params={},
+        )
+        with mock.patch.object(
+            api.default_client, "check_hashes", return_value={"X": error}
+        ):
+            with self.assertRaisesMessage(CommandError, error.message):
+                call_command("pwned_passwords_audit_users", stdout=io.StringIO())
@@ -0,0 +1,231 @@
+"""
+Tests for pwned-passwords-django's bounded background queues.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import override_settings
+
+from pwned_passwords_django import api, background, exceptions
+
+from .base import PwnedPasswordsTests
+
+
+class BackgroundQueueTests(PwnedPasswordsTests):
+    """
+    Test the bounded background queue for synchronous code.
+
+    """
+
+    def blocked_queue(self, policy, max_size=2):
+        """
+        Return a queue with one worker, blocked until the returned event is set, and
+        already holding ``max_size`` items of work.
+
+        """
+        queue = background.BackgroundQueue(
+            max_workers=1, max_size=max_size, policy=policy
+        )
+        release = threading.Event()
+        self.addCleanup(release.set)
+        futures = [queue.submit(release.wait)]
+        futures.extend(queue.submit(int, n) for n in range(1, max_size))
+        return queue, release, futures
+
+    def test_submit(self):
+        """
+        Submitted work runs in the background, and is forgotten once finished.
+
+        """
+        queue = background.BackgroundQueue()
+        assert queue.submit(sum, [1, 2], start=3).result() == 6
+        assert queue.drain()
+        assert not len(queue)
+        with self.assertRaises(exceptions.QueueClosed):
+            queue.submit(int)
+
+    def test_check_password(self):
+        """
+        Checks of passwords use the default API client.
+
+        """
+        queue = background.BackgroundQueue()
+        with mock.patch.object(api, "check_password", return_value=42) as mocked:
+            assert queue.check_password(self.sample_password).result() == 42
+        mocked.assert_called_once_with(self.sample_password)
+
+    def test_drop_new(self):
+        """
+        With the DROP_NEW policy, new work is shed when the queue is full.
+
+        """
+        queue, release, futures = self.blocked_queue(background.DROP_NEW)
+        shed = queue.submit(int, 99)
+        assert shed.cancelled()
+        assert queue.dropped == 1
+        release.set()
+        assert [future.result() for future in futures] == [True, 1]
+
+    def test_drop_oldest(self):
+        """
+        With the DROP_OLDEST policy, the oldest work not yet started is cancelled to
+        make room; if all pending work has started, the new work is shed.
+
+        """
+        queue, release, futures = self.blocked_queue(background.DROP_OLDEST)
+        newest = queue.submit(int, 99)
+        assert futures[1].cancelled()
+        assert not newest.cancelled()
+        assert queue.dropped == 1
+        release.set()
+        assert newest.result() == 99
+
+        queue, release, futures = self.blocked_queue(background.DROP_OLDEST, max_size=1)
+        assert queue.submit(int, 99).cancelled()
+        assert queue.dropped == 1
+
+    def test_reject(self):
+        """
+        With the REJECT policy, submitting work to a full queue raises QueueFull.
+
+        """
+        queue, _, _ = self.blocked_queue(background.REJECT)
+        with self.assertRaises(exceptions.QueueFull):
+            queue.submit(int, 99)
+
+    def test_drain_timeout(self):
+        """
+        Draining waits only up to its timeout, then cancels work not yet started.
+
+        """
+        queue, release, futures = self.blocked_queue(background.DROP_NEW)
+        assert not queue.drain(timeout=0.01)
+        assert futures[1].cancelled()
+        release.set()
+        assert futures[0].result()
+
+    def test_invalid_policy(self):
+        """
+        Unknown policies are rejected.
+
+        """
+        with self.assertRaises(ValueError):
+            background.BackgroundQueue(policy="drop_everything")
+        with self.assertRaises(ValueError):
+            background.AsyncBackgroundQueue(policy="drop_everything")
+
+    @override_settings(
+        PWNED_PASSWORDS={
+            "BACKGROUND_QUEUE_SIZE": 5,
+            "BACKGROUND_QUEUE_POLICY": background.REJECT,
+        }
+    )
+    def test_get_queue(self):
+        """
+        The shared queue is created once, from the settings.
+
+        """
+        with mock.patch.object(background, "_queue", None):
+            queue = background.get_queue()
+            assert background.get_queue() is queue
+            assert queue.max_size == 5
+            assert queue.policy == background.REJECT
+            queue.drain()
+
+
+class AsyncBackgroundQueueTests(PwnedPasswordsTests):
+    """
+    Test the bounded background queue for asynchronous code.
+
+    """
+
+    async def blocked_queue(self, policy, max_size=2):
+        """
+        Return a queue already holding ``max_size`` tasks, blocked until the
+        returned event is set.
+
+        """
+        queue = background.AsyncBackgroundQueue(max_size=max_size, policy=policy)
+        release = asyncio.Event()
+        tasks = [queue.submit(release.wait) for _ in range(max_size)]
+        await asyncio.sleep(0)
+        return queue, release, tasks
+
+    async def test_submit(self):
+        """
+        Submitted work runs as a task, and is forgotten once finished.
+
+        """
+        queue = background.AsyncBackgroundQueue()
+        assert await queue.submit(asyncio.sleep, 0, result=6) == 6
+        await asyncio.sleep(0)
+        assert not len(queue)
+        assert await queue.drain()
+        with self.assertRaises(exceptions.QueueClosed):
+            queue.submit(asyncio.sleep, 0)
+
+    async def test_check_password(self):
+        """
+        Checks of passwords use the default API client.
+
+        """
+        queue = background.AsyncBackgroundQueue()
+        with mock.patch.object(
+            api, "check_password_async", mock.AsyncMock(return_value=42)
+        ) as mocked:
+            assert await queue.check_password(self.sample_password) == 42
+        mocked.assert_awaited_once_with(self.sample_password)
+
+    async def test_policies(self):
+        """
+        Full queues shed new work, cancel the oldest task, or reject new work,
+        according to their policies.
+
+        """
+        queue, release, tasks = await self.blocked_queue(background.DROP_NEW)
+        sleep = mock.AsyncMock()
+        assert queue.submit(sleep).cancelled()
+        sleep.assert_not_called()
+        assert queue.dropped == 1
+        release.set()
+        assert await asyncio.gather(*tasks) == [True, True]
+
+        queue, release, tasks = await self.blocked_queue(background.DROP_OLDEST)
+        newest = queue.submit(asyncio.sleep, 0, result=99)
+        await asyncio.sleep(0)
+        assert tasks[0].cancelled()
+        assert queue.dropped == 1
+        assert await newest == 99
+        release.set()
+
+        queue, release, _ = await self.blocked_queue(background.REJECT)
+        with self.assertRaises(exceptions.QueueFull):
+            queue.submit(asyncio.sleep, 0)
+        release.set()
+
+    async def test_drain(self):
+        """
+        Draining waits for pending tasks up to its timeout, then cancels them.
+
+        """
+        queue, release, tasks = await self.blocked_queue(background.DROP_NEW)
+        assert not await queue.drain(timeout=0.01)
+        assert all(task.cancelled() for task in tasks)
+
+        queue, release, tasks = await self.blocked_queue(background.DROP_NEW)
+        asyncio.get_running_loop().call_later(0.01, release.set)
+        assert await queue.drain()
+
+    async def test_get_async_queue(self):
+        """
+        The shared queue is created once for each event loop.
+
+        """
+        queue = background.get_async_queue()
+        assert background.get_async_queue() is queue
+        assert queue.max_size == background.DEFAULT_QUEUE_SIZE
@@ -0,0 +1,124 @@
+"""
+Tests for pwned-passwords-django's vectorized bulk lookups.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import hashlib
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy
+from django.core.exceptions import ImproperlyConfigured
+
+from pwned_passwords_django import bulk, mirror
+
+from .base import PwnedPasswordsTests
+
+
+def sha1(password: str) -> str:
+    """
+    Return the SHA-1 hash of a password, in uppercase hexadecimal.
+
+    """
+    return (
+        hashlib.new("sha1", password.encode(), usedforsecurity=False)
+        .hexdigest()
+        .upper()
+    )
+
+
+class BulkIndexTests(PwnedPasswordsTests):
+    """
+    Test vectorized bulk lookups.
+
+    """
+
+    # Passwords and breach counts used to build the test mirror.
+    passwords = {
+        "password": 10_000_000_000,
+        "123456": 900,
+        "swordfish": 500,
+        "hunter2": 10,
+    }
+
+    # Hashes which share their leading eight bytes.
+    colliding = [f"{'A' * 16}{suffix:024X}" for suffix in (1, 2, 3)]
+
+    def setUp(self):
+        """
+        Build a mirror of the test dataset, with a bulk index, in a temporary
+        directory.
+
+        """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        hashes = {sha1(password): count for password, count in self.passwords.items()}
+        hashes.update({line_hash: 7 + n for n, line_hash in enumerate(self.colliding)})
+        self.directory = os.path.join(self.temp_dir, "mirror")
+        mirror.build_mirror(
+            [f"{line_hash}:{hashes[line_hash]}" for line_hash in sorted(hashes)],
+            self.directory,
+            bulk_index=True,
+        )
+
+    def test_lookup(self):
+        """
+        Bulk lookups return the breach count of each digest, in order.
+
+        """
+        index = bulk.BulkIndex(self.directory)
+        assert len(index) == 7
+        hashes = [
+            sha1("hunter2"),
+            sha1("correct horse"),
+            sha1("password"),
+            self.colliding[2],
+            f"{'A' * 16}{'F' * 24}",
+            sha1("swordfish"),
+            sha1("hunter2"),
+            self.colliding[0],
+        ]
+        expected = [10, 0, mirror.MAX_BULK_COUNT, 9, 0, 500, 10, 7]
+        counts = index.lookup(bulk.digests_from_hex(hashes))
+        assert counts.dtype == numpy.uint32
+        assert counts.tolist() == expected
+        assert index.lookup(bytes.fromhex("".join(hashes))).tolist() == expected
+        assert index.lookup(bulk.digests_from_hex([])).tolist() == []
+
+    def test_invalid(self):
+        """
+        Invalid hashes and indexes are rejected, and an empty index finds nothing.
+
+        """
+        with self.assertRaises(ValueError):
+            bulk.digests_from_hex(["ABCD"])
+        with self.assertRaises(ValueError):
+            bulk.digests_from_hex(["X" * 40])
+        with self.assertRaises(ValueError):
+            bulk.digests_from_hex(["A" * 38, "B" * 42])
+        with self.assertRaises(ValueError):
+            bulk.digests_from_hex(["A" * 38 + " A", "B" * 40])
+        empty = os.path.join(self.temp_dir, "empty")
+        mirror.build_mirror([], empty, bulk_index=True)
+        index = bulk.BulkIndex(empty)
+        assert len(index) == 0
+        assert index.lookup(bulk.digests_from_hex([sha1("password")])).tolist() == [0]
+        with open(os.path.join(self.directory, mirror.BULK_COUNTS_FILE), "ab") as file:
+            file.write(b"\x00" * 4)
+        with self.assertRaises(ImproperlyConfigured):
+            bulk.BulkIndex(self.directory)
+
+    def test_no_numpy(self):
+        """
+        Without NumPy, bulk lookups raise ImproperlyConfigured.
+
+        """
+        with mock.patch.dict(sys.modules, {"numpy": None}):
+            with self.assertRaises(ImproperlyConfigured):
+                bulk.BulkIndex(self.directory)
@@ -0,0 +1,211 @@
+"""
+Tests for pwned-passwords-django's database mirror.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import hashlib
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import override_settings
+
+from pwned_passwords_django import api, exceptions
+from pwned_passwords_django.db_mirror import backend
+from pwned_passwords_django.db_mirror.models import PasswordRange
+from pwned_passwords_django.metrics import InMemoryMetrics
+from pwned_passwords_django.validators import PwnedPasswordsValidator
+
+from .base import PwnedPasswordsTests
+
+
+class DatabaseMirrorTests(PwnedPasswordsTests):
+    """
+    Test the database mirror.
+
+    """
+
+    # Passwords and breach counts used to load the test mirror.
+    passwords = {
+        "password": 10_000_000_000,
+        "123456": 900,
+        "swordfish": 500,
+        "hunter2": 10,
+    }
+
+    def setUp(self):
+        """
+        Create the lines of the test dataset.
+
+        """
+        super().setUp()
+        hashes = [
+            (
+                hashlib.new("sha1", password.encode(), usedforsecurity=False)
+                .hexdigest()
+                .upper(),
+                count,
+            )
+            for password, count in self.passwords.items()
+        ]
+        # Two more hashes with the same prefix as the sample password.
+        hashes += [(f"{self.sample_password_prefix}{digit * 35}", 2) for digit in "0F"]
+        self.lines = [f"{line_hash}:{count:,}\n" for line_hash, count in sorted(hashes)]
+
+    def test_packed_range(self):
+        """
+        Packed ranges look up suffixes by binary search, and iterate in order.
+
+        """
+        suffixes = ["0" * 35, self.sample_password_suffix, "F" * 35]
+        packed = backend.PackedRange(backend.pack_range(zip(suffixes, [1, 2, 2**40])))
+        assert len(packed) == 3
+        assert list(packed) == suffixes
+        assert packed[self.sample_password_suffix] == 2
+        assert packed["0" * 35] == 1
+        assert packed["F" * 35] == backend.MAX_COUNT
+        assert packed.get("1" * 35, 0) == 0
+        assert packed.get("F" * 36, 0) == 0
+        assert packed.get("not hex", 0) == 0
+        assert backend.PackedRange(b"").get(self.sample_password_suffix, 0) == 0
+
+    def test_load(self):
+        """
+        Loading stores one row per prefix, in batches, replacing existing rows.
+
+        """
+        assert backend.load_ranges(self.lines, batch_size=2) == 6
+        assert PasswordRange.objects.count() == 4
+        sample = PasswordRange.objects.get(prefix=self.sample_password_prefix)
+        assert str(sample) == self.sample_password_prefix
+        assert dict(backend.PackedRange(bytes(sample.hashes))) == {
+            "0" * 35: 2,
+            self.sample_password_suffix: 500,
+            "F" * 35: 2,
+        }
+        assert backend.load_ranges(self.lines[:1]) == 1
+        assert PasswordRange.objects.count() == 4
+        with self.assertRaises(ValueError):
+            backend.load_ranges(self.lines[::-1])
+
+    def test_check_password(self):
+        """
+        The database client checks passwords against the mirror, recording
+        metrics.
+
+        """
+        backend.load_ranges(self.lines)
+        collected = InMemoryMetrics()
+        client = backend.DatabasePwnedPasswords(metrics=collected)
+        assert client.check_password(self.sample_password) == 500
+        assert client.check_password("password") == backend.MAX_COUNT
+        assert client.check_password("correct horse") == 0
+        assert sum(collected.durations["database"].counts) == 3
+        assert sum(collected.response_sizes["database"].counts) == 3
+        with mock.patch.object(backend, "READ_BATCH_SIZE", 2):
+            results = client.check_passwords(["swordfish", "hunter2", "correct horse"])
+        assert results == {"swordfish": 500, "hunter2": 10, "correct horse": 0}
+        assert sum(collected.durations["database"].counts) == 5
+
+    def test_worker_connections(self):
+        """
+        In a worker thread, database connections are closed before and after each
+        query if they have expired, as they would be for a request.
+
+        """
+        backend.load_ranges(self.lines)
+        client = backend.DatabasePwnedPasswords()
+        with mock.patch.object(backend, "close_old_connections") as close_mock:
+            assert client.check_password(self.sample_password) == 500
+            close_mock.assert_not_called()
+            with mock.patch.object(api, "in_worker_thread", return_value=True):
+                assert client.check_password(self.sample_password) == 500
+            assert close_mock.call_count == 2
+
+    async def test_check_password_async(self):
+        """
+        The database client checks passwords asynchronously.
+
+        """
+        await backend.sync_to_async(backend.load_ranges)(self.lines)
+        client = backend.DatabasePwnedPasswords()
+        assert await client.check_password_async(self.sample_password) == 500
+        assert await client.check_passwords_async(["hunter2"]) == {"hunter2": 10}
+
+    def test_database_error(self):
+        """
+        Errors reading from the database are reported as errors checking the
+        password, and handled by the validator's fallback.
+
+        """
+        client = backend.DatabasePwnedPasswords()
+        with mock.patch.object(
+            PasswordRange.objects, "using", side_effect=DatabaseError
+        ):
+            with self.assertRaises(exceptions.PwnedPasswordsError) as context:
+                client.check_password(self.sample_password)
+            assert context.exception.code == exceptions.ErrorCode.UNKNOWN_ERROR
+            results = client.check_passwords(["swordfish", "hunter2"])
+            assert all(
+                isinstance(result, exceptions.PwnedPasswordsError)
+                for result in results.values()
+            )
+            with self.assertRaises(ValidationError):
+                PwnedPasswordsValidator(api_client=client).validate("password")
+
+    def test_validator(self):
+        """
+        The validator can check passwords against the mirror.
+
+        """
+        backend.load_ranges(self.lines)
+        validator = PwnedPasswordsValidator(api_client=backend.DatabasePwnedPasswords())
+        with self.assertRaises(ValidationError):
+            validator.validate(self.sample_password)
+        validator.validate("correct horse")
+
+    def test_default_client(self):
+        """
+        The class of the default client is set by the API_CLIENT setting.
+
+        """
+        # pylint: disable=protected-access
+        assert type(api._default_client()) is api.PwnedPasswords
+        with override_settings(
+            PWNED_PASSWORDS={
+                "API_CLIENT": (
+                    "pwned_passwords_django.db_mirror.backend.DatabasePwnedPasswords"
+                )
+            }
+        ):
+            assert isinstance(api._default_client(), backend.DatabasePwnedPasswords)
+
+    def test_command(self):
+        """
+        The management command loads the mirror.
+
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_path = os.path.join(temp_dir, "pwned-passwords.txt")
+            with open(source_path, "w", encoding="utf-8") as source:
+                source.writelines(self.lines)
+            stdout = io.StringIO()
+            call_command(
+                "pwned_passwords_load_db_mirror",
+                source_path,
+                batch_size=1,
+                stdout=stdout,
+            )
+            assert "Loaded 6 hashes" in stdout.getvalue()
+            assert PasswordRange.objects.count() == 4
+            with self.assertRaises(CommandError):
+                call_command(
+                    "pwned_passwords_load_db_mirror",
+                    os.path.join(temp_dir, "missing.txt"),
+                )
@@ -0,0 +1,148 @@
+"""
+Tests for pwned-passwords-django's view decorator.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from pwned_passwords_django.decorators import check_pwned_passwords
+
+from .base import PwnedPasswordsTests
+
+
+class PwnedPasswordsDecoratorTests(PwnedPasswordsTests):
+    """
+    Test the Pwned Passwords view decorator.
+
+    """
+
+    def test_fields(self):
+        """
+        The decorator checks only the given fields.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+
+        @check_pwned_passwords(fields=["new_password", "missing"])
+        def view(request):
+            """
+            Minimal view which returns the checked keys.
+
+            """
+            return HttpResponse(",".join(request.pwned_passwords))
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            response = view(
+                RequestFactory().post(
+                    "/",
+                    data={
+                        "password": self.sample_password,
+                        "new_password": self.sample_password,
+                    },
+                )
+            )
+        assert response.content == b"new_password"
+        sync_mock.assert_called_once_with(self.sample_password)
+        async_mock.assert_not_called()
+        assert view.__name__ == "view"
+
+    def test_regex(self):
+        """
+        Without ``fields``, the decorator checks keys matching the password regex,
+        and only on POST.
+
+        """
+        sync_mock, _ = self.api_mocks()
+
+        @check_pwned_passwords()
+        def view(request):
+            """
+            Minimal view which returns the checked keys.
+
+            """
+            return HttpResponse(",".join(request.pwned_passwords))
+
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            response = view(
+                RequestFactory().post("/", data={"password": self.sample_password})
+            )
+            assert response.content == b"password"
+            response = view(
+                RequestFactory().get("/", data={"password": self.sample_password})
+            )
+            assert response.content == b""
+        sync_mock.assert_called_once_with(self.sample_password)
+
+    async def test_async(self):
+        """
+        The decorator supports async views, checking with the async client.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+
+        @check_pwned_passwords(fields=["password"])
+        async def view(request):
+            """
+            Minimal async view which returns the checked keys.
+
+            """
+            return HttpResponse(",".join(await request.apwned_passwords()))
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            response = await view(
+                RequestFactory().post("/", data={"password": self.sample_password})
+            )
+            assert response.content == b"password"
+            response = await view(
+                RequestFactory().get("/", data={"password": self.sample_password})
+            )
+            assert response.content == b""
+        async_mock.assert_called_once_with(self.sample_password)
+        sync_mock.assert_not_called()
+
+    async def test_async_view_error(self):
+        """
+        When an async view raises, the background check is cancelled rather than
+        left running after the request.
+
+        """
+        cancelled = asyncio.Event()
+
+        async def check_password_async(password):
+            """
+            Mock async check which never finishes unless cancelled.
+
+            """
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        @check_pwned_passwords()
+        async def view(request):
+            """
+            Minimal async view which lets the check start, then raises.
+
+            """
+            await asyncio.sleep(0)
+            raise ValueError("Broken view.")
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password_async", check_password_async
+        ):
+            with self.assertRaises(ValueError):
+                await view(
+                    RequestFactory().post("/", data={"password": self.sample_password})
+                )
+        assert cancelled.is_set()
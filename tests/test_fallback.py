@@ -0,0 +1,212 @@
+"""
+Tests for pwned-passwords-django's local fallback checks.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import hashlib
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, override_settings
+from django.utils.crypto import get_random_string
+
+from pwned_passwords_django import fallback, middleware
+from pwned_passwords_django.validators import PwnedPasswordsValidator
+
+from .base import PwnedPasswordsTests
+
+
+class CommonPasswordsFallbackTests(PwnedPasswordsTests):
+    """
+    Test the shared common-passwords fallback.
+
+    """
+
+    def test_matches_django(self):
+        """
+        The shared set of common passwords is the same as Django's.
+
+        """
+        assert fallback.common_passwords() == CommonPasswordValidator().passwords
+
+    def test_shared(self):
+        """
+        The common-passwords list is loaded once and shared by all validators.
+
+        """
+        fallback.common_passwords.cache_clear()
+        validators = [PwnedPasswordsValidator() for _ in range(3)]
+        assert fallback.common_passwords.cache_info().currsize == 0
+        for validator in validators:
+            with self.assertRaises(ValidationError):
+                validator.fallback_validator.validate("password")
+            assert validator.fallback_validator.passwords is fallback.common_passwords()
+        assert fallback.common_passwords.cache_info().misses == 1
+
+    def test_assign(self):
+        """
+        A validator's fallback validator can be replaced, as when it was a plain
+        attribute.
+
+        """
+        validator = PwnedPasswordsValidator()
+        custom = CommonPasswordValidator()
+        validator.fallback_validator = custom
+        assert validator.fallback_validator is custom
+        assert PwnedPasswordsValidator().fallback_validator is not custom
+
+    def test_validate(self):
+        """
+        The shared validator raises the same error as Django's.
+
+        """
+        with self.assertRaises(ValidationError) as shared_error:
+            fallback.common_password_validator.validate(" Password ")
+        with self.assertRaises(ValidationError) as django_error:
+            CommonPasswordValidator().validate(" Password ")
+        assert shared_error.exception.messages == django_error.exception.messages
+        assert shared_error.exception.error_list[0].code == "password_too_common"
+        fallback.common_password_validator.validate(self.sample_password * 3)
+
+
+class HashFileFallbackTests(PwnedPasswordsTests):
+    """
+    Test the hashed fallback list.
+
+    """
+
+    # Passwords and breach counts used to build the test hash files.
+    passwords = {
+        "password": 1000,
+        "123456": 900,
+        "swordfish": 500,
+        "hunter2": 10,
+        "correcthorsebatterystaple": 1,
+    }
+
+    def setUp(self):
+        """
+        Write the test dataset to a file in a temporary directory.
+
+        """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.source_path = os.path.join(self.temp_dir, "pwned-passwords.txt")
+        with open(self.source_path, "w", encoding="utf-8") as source:
+            for password, count in self.passwords.items():
+                sha1 = hashlib.new("sha1", password.encode(), usedforsecurity=False)
+                source.write(f"{sha1.hexdigest().upper()}:{count}\n")
+            source.write("\n")
+
+    def build(self, limit: int = 3, digest_size: int = 8) -> str:
+        """
+        Build a hash file from the test dataset and return its path.
+
+        """
+        path = os.path.join(self.temp_dir, f"fallback-{limit}-{digest_size}.bin")
+        with open(self.source_path, encoding="utf-8") as source, open(
+            path, "wb"
+        ) as output:
+            fallback.build_hash_file(source, output, limit, digest_size)
+        return path
+
+    def test_lookup(self):
+        """
+        A hash file contains exactly the most-breached passwords, at any digest size.
+
+        """
+        for digest_size in (1, 8, 20):
+            hash_file = fallback.HashFile(self.build(digest_size=digest_size))
+            assert len(hash_file) == 3 or digest_size == 1
+            for password in ("password", "123456", "swordfish"):
+                assert password in hash_file
+            if digest_size > 1:
+                for password in ("hunter2", "correcthorsebatterystaple", "Password"):
+                    assert password not in hash_file
+            assert b"password" not in hash_file
+
+    def test_invalid_file(self):
+        """
+        Opening an invalid hash file, or building one with an invalid digest size,
+        raises an exception.
+
+        """
+        for content in (
+            b"",
+            b"PPDH",
+            b"XXXX\x00\x01\x00\x08",
+            b"PPDH\x00\x02\x00\x08",
+            b"PPDH\x00\x01\x00\x15",
+            b"PPDH\x00\x01\x00\x08\x00",
+        ):
+            path = os.path.join(self.temp_dir, "invalid.bin")
+            with open(path, "wb") as invalid:
+                invalid.write(content)
+            with self.assertRaises(ImproperlyConfigured):
+                fallback.HashFile(path)
+        for digest_size in (0, 21):
+            with self.assertRaises(ValueError):
+                fallback.build_hash_file([], io.BytesIO(), 1, digest_size)
+
+    def test_command(self):
+        """
+        The management command builds a hash file.
+
+        """
+        path = os.path.join(self.temp_dir, "command.bin")
+        stdout = io.StringIO()
+        call_command(
+            "pwned_passwords_build_fallback",
+            self.source_path,
+            path,
+            limit=2,
+            digest_size=6,
+            stdout=stdout,
+        )
+        assert "Wrote 2 hashes" in stdout.getvalue()
+        hash_file = fallback.HashFile(path)
+        assert hash_file.digest_size == 6
+        assert "123456" in hash_file
+        assert "swordfish" not in hash_file
+        with self.assertRaises(CommandError):
+            call_command(
+                "pwned_passwords_build_fallback",
+                os.path.join(self.temp_dir, "missing.txt"),
+                path,
+            )
+
+    def test_fallback(self):
+        """
+        When configured, the hash file is used as the fallback for the validator and
+        the middleware.
+
+        """
+        # pylint: disable=protected-access
+        path = self.build(limit=4)
+        sync_mock, _ = self.api_error_mocks()
+        validator = PwnedPasswordsValidator()
+        with override_settings(
+            PWNED_PASSWORDS={"FALLBACK_HASH_FILE": path}
+        ), mock.patch.object(validator.api_client, "check_password", sync_mock):
+            assert isinstance(validator.fallback_validator, fallback.HashFileValidator)
+            with self.assertRaises(ValidationError) as error:
+                validator.validate("hunter2")
+            assert error.exception.error_list[0].code == "password_too_common"
+            # Common passwords not in the hash file are allowed.
+            validator.validate("qwertyuiop")
+            validator.validate(get_random_string(length=20))
+
+            with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+                request = RequestFactory().post(
+                    "/", data={"password": "hunter2", "new_password": "qwertyuiop"}
+                )
+                assert middleware._scan_payload_sync(request) == ["password"]
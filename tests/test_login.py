@@ -0,0 +1,312 @@
+"""
+Tests for pwned-passwords-django's login-time password check.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import threading
+from unittest import mock
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import BaseBackend, RemoteUserBackend
+from django.core.cache import cache
+from django.test import override_settings
+
+from pwned_passwords_django import api, background, exceptions, login
+
+from .base import PwnedPasswordsTests
+
+
+class UserBackend(BaseBackend):
+    """
+    Authentication backend returning the user it is given.
+
+    """
+
+    def authenticate(self, request, user=None, **kwargs):
+        """
+        Return the given user.
+
+        """
+        return user
+
+
+class MixedBackend(login.PwnedPasswordsBackendMixin, UserBackend):
+    """
+    Authentication backend returning the user it is given, and checking passwords.
+
+    """
+
+
+class StrictBackend(BaseBackend):
+    """
+    Authentication backend accepting only a user, and returning it.
+
+    """
+
+    def authenticate(self, request, user):
+        """
+        Return the given user.
+
+        """
+        return user
+
+    async def aauthenticate(self, request, user):
+        """
+        Return the given user.
+
+        """
+        return user
+
+
+class StrictMixedBackend(login.PwnedPasswordsBackendMixin, StrictBackend):
+    """
+    Authentication backend accepting only a user, and checking passwords.
+
+    """
+
+
+class RemoteUserMixedBackend(login.PwnedPasswordsBackendMixin, RemoteUserBackend):
+    """
+    Django's remote user authentication backend, checking passwords.
+
+    """
+
+
+@override_settings(
+    AUTHENTICATION_BACKENDS=["pwned_passwords_django.login.PwnedPasswordsModelBackend"],
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class LoginCheckTests(PwnedPasswordsTests):
+    """
+    Test the login-time password check.
+
+    """
+
+    def setUp(self):
+        """
+        Create a user, keep the future of each check started, and record the
+        signals sent.
+
+        """
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            username="alice", password=self.sample_password
+        )
+        self.futures = []
+        check_login = login.check_login
+
+        def capture(*args):
+            """
+            Start the check, and keep its future.
+
+            """
+            future = check_login(*args)
+            self.futures.append(future)
+            return future
+
+        patcher = mock.patch.object(login, "check_login", side_effect=capture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.receiver = mock.Mock()
+        login.password_compromised.connect(self.receiver)
+        self.addCleanup(login.password_compromised.disconnect, self.receiver)
+
+    def results(self):
+        """
+        Wait for, and return the results of, the checks started so far.
+
+        """
+        return [future.result() for future in self.futures]
+
+    def test_compromised(self):
+        """
+        Logging in with a compromised password sends a signal and caches the result,
+        which is reused by later logins.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=500) as mocked:
+            user = authenticate(username="alice", password=self.sample_password)
+            assert user == self.user
+            assert self.results() == [500]
+            authenticate(username="alice", password=self.sample_password)
+            assert self.results() == [500, 500]
+        mocked.assert_called_once_with(self.sample_password)
+        self.receiver.assert_called_once_with(
+            signal=login.password_compromised,
+            sender=type(self.user),
+            user=user,
+            count=500,
+        )
+        assert login.get_login_check_result(self.user) == 500
+
+        self.user.set_password("correct horse battery staple")
+        self.user.save()
+        assert login.get_login_check_result(self.user) is None
+
+    def test_not_compromised(self):
+        """
+        Logging in with an uncompromised password sends no signal, and failed logins
+        are not checked.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=0) as mocked:
+            authenticate(username="alice", password=self.sample_password)
+            authenticate(username="alice", password="wrong")
+            assert self.results() == [0]
+        mocked.assert_called_once_with(self.sample_password)
+        self.receiver.assert_not_called()
+        assert login.get_login_check_result(self.user) == 0
+
+    def test_error(self):
+        """
+        A failed check is logged, and its result is not cached.
+
+        """
+        error = exceptions.PwnedPasswordsError(
+            message="Pwned Passwords API timed out.",
+            code=exceptions.ErrorCode.API_TIMEOUT,
+            params={},
+        )
+        with mock.patch.object(api, "check_password", side_effect=error):
+            with self.assertLogs("pwned_passwords_django.login", "ERROR"):
+                authenticate(username="alice", password=self.sample_password)
+                assert self.results() == [None]
+        assert login.get_login_check_result(self.user) is None
+
+    def test_queue_full(self):
+        """
+        When the background queue rejects the check, logging in still succeeds,
+        and the check is skipped.
+
+        """
+        queue = background.BackgroundQueue(policy=background.REJECT, max_size=0)
+        self.addCleanup(queue.drain)
+        with mock.patch.object(background, "get_queue", return_value=queue):
+            user = authenticate(username="alice", password=self.sample_password)
+        assert user == self.user
+        assert self.futures[0].cancelled()
+
+    def test_queue_drained(self):
+        """
+        When the background queue has been drained, as when shutting down, logging
+        in still succeeds, and the check is skipped.
+
+        """
+        queue = background.BackgroundQueue()
+        queue.drain()
+        with mock.patch.object(background, "get_queue", return_value=queue):
+            user = authenticate(username="alice", password=self.sample_password)
+        assert user == self.user
+        assert self.futures[0].cancelled()
+
+    def test_connections(self):
+        """
+        The check, on a thread of the background queue, closes that thread's old
+        database connections before and after it, as Django does for each request.
+
+        """
+        calls = []
+
+        def record(name):
+            """
+            Return a function recording a call, and the thread it was made in.
+
+            """
+
+            def call(*args):
+                """
+                Record the call.
+
+                """
+                calls.append((name, threading.current_thread().name))
+                return 0
+
+            return call
+
+        with mock.patch.object(
+            login, "close_old_connections", side_effect=record("close")
+        ), mock.patch.object(api, "check_password", side_effect=record("check")):
+            authenticate(username="alice", password=self.sample_password)
+            assert self.results() == [0]
+        assert [name for name, _thread in calls] == ["close", "check", "close"]
+        assert all(thread.startswith(api.THREAD_NAME_PREFIX) for _name, thread in calls)
+
+    @override_settings(PWNED_PASSWORDS={"LOGIN_CHECK_TTL": 0})
+    def test_ttl(self):
+        """
+        The lifetime of cached results is configurable.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=500):
+            authenticate(username="alice", password=self.sample_password)
+            assert self.results() == [500]
+        assert login.get_login_check_result(self.user) is None
+
+    async def test_aauthenticate(self):
+        """
+        Logging in asynchronously checks the password once.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=500) as mocked:
+            user = await login.PwnedPasswordsModelBackend().aauthenticate(
+                None, username="alice", password=self.sample_password
+            )
+            assert user.pk == self.user.pk
+            assert [future.result() for future in self.futures] == [500]
+        mocked.assert_called_once_with(self.sample_password)
+
+    async def test_aauthenticate_default(self):
+        """
+        With a backend using Django's default asynchronous implementation, the
+        password is checked once, by the synchronous implementation.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=0):
+            backend = MixedBackend()
+            user = await backend.aauthenticate(
+                None, user=self.user, password=self.sample_password
+            )
+            assert user == self.user
+            await backend.aauthenticate(None, user=None, password=self.sample_password)
+            assert [future.result() for future in self.futures] == [0]
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=[
+            "tests.test_login.RemoteUserMixedBackend",
+            "pwned_passwords_django.login.PwnedPasswordsModelBackend",
+        ]
+    )
+    def test_strict_signature(self):
+        """
+        A backend which does not accept the given credentials is skipped, as Django
+        skips backends without the mixin.
+
+        """
+        with mock.patch.object(api, "check_password", return_value=0):
+            user = authenticate(username="alice", password=self.sample_password)
+            assert user == self.user
+            assert self.results() == [0]
+
+    async def test_strict_signature_async(self):
+        """
+        Asynchronously, too, a backend which does not accept the given credentials
+        is skipped.
+
+        """
+        backend = StrictMixedBackend()
+        assert (
+            await backend.aauthenticate(None, username="alice", password="password")
+            is None
+        )
+        assert await backend.aauthenticate(None, user=self.user) == self.user
+        assert (
+            await RemoteUserMixedBackend().aauthenticate(
+                None, username="alice", password="password"
+            )
+            is None
+        )
+        assert self.futures == []
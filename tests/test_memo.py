@@ -0,0 +1,105 @@
+"""
+Tests for pwned-passwords-django's request-scoped memo of results.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+
+from pwned_passwords_django import memo
+
+from .base import PwnedPasswordsTests
+
+
+class MemoTests(PwnedPasswordsTests):
+    """
+    Test the request-scoped memo of results.
+
+    """
+
+    def test_no_scope(self):
+        """
+        Outside a request scope, nothing is recorded.
+
+        """
+        memo.record(self.sample_password, 10)
+        assert memo.lookup(self.sample_password) is None
+
+    def test_scope(self):
+        """
+        Results are recorded within a request scope, and discarded when it ends.
+
+        """
+        with memo.request_scope():
+            assert memo.lookup(self.sample_password) is None
+            memo.record(self.sample_password, 10)
+            assert memo.lookup(self.sample_password) == 10
+            with memo.request_scope():
+                assert memo.lookup(self.sample_password) is None
+            assert memo.lookup(self.sample_password) == 10
+        assert memo.lookup(self.sample_password) is None
+
+    def test_keys(self):
+        """
+        Passwords are not stored in the memo.
+
+        """
+        # pylint: disable=protected-access
+        with memo.request_scope():
+            memo.record(self.sample_password, 10)
+            assert self.sample_password not in str(memo._memo.get())
+
+    async def test_claim(self):
+        """
+        A claimed password's result is available once set, and waited for by
+        asynchronous lookups.
+
+        """
+        assert memo.claim(self.sample_password) is None
+        assert await memo.alookup(self.sample_password) is None
+        with memo.request_scope():
+            future = memo.claim(self.sample_password)
+            assert future is not None
+            assert memo.claim(self.sample_password) is None
+            assert memo.lookup(self.sample_password) is None
+
+            lookup = asyncio.ensure_future(memo.alookup(self.sample_password))
+            await asyncio.sleep(0)
+            assert not lookup.done()
+            future.set_result(10)
+            assert await lookup == 10
+            assert memo.lookup(self.sample_password) == 10
+
+            memo.record("hunter2", 3)
+            assert await memo.alookup("hunter2") == 3
+
+    async def test_cancelled_claim(self):
+        """
+        A cancelled claim has no result.
+
+        """
+        with memo.request_scope():
+            future = memo.claim(self.sample_password)
+            lookup = asyncio.ensure_future(memo.alookup(self.sample_password))
+            await asyncio.sleep(0)
+            future.cancel()
+            assert await lookup is None
+            assert memo.lookup(self.sample_password) is None
+
+    async def test_cancelled_lookup(self):
+        """
+        Cancelling an asynchronous lookup does not cancel the claim it is waiting
+        for.
+
+        """
+        with memo.request_scope():
+            future = memo.claim(self.sample_password)
+            lookup = asyncio.ensure_future(memo.alookup(self.sample_password))
+            await asyncio.sleep(0)
+            lookup.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await lookup
+            assert not future.cancelled()
+            future.set_result(10)
+            assert memo.lookup(self.sample_password) == 10
@@ -0,0 +1,194 @@
+"""
+Tests for pwned-passwords-django's metrics.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import asyncio
+from http import HTTPStatus
+from unittest import mock
+
+import httpx
+from django.test import override_settings
+from django.urls import reverse
+
+from pwned_passwords_django import api, exceptions, memo, metrics
+from pwned_passwords_django.validators import PwnedPasswordsValidator
+
+from .base import PwnedPasswordsTests
+
+
+class MetricsTests(PwnedPasswordsTests):
+    """
+    Test the recording and export of metrics.
+
+    """
+
+    def test_default(self):
+        """
+        By default, metrics are not recorded.
+
+        """
+        api_client = api.PwnedPasswords(client=self.count_sync_client(count=1))
+        assert type(api_client.metrics) is metrics.Metrics
+        assert api_client.check_password(self.sample_password) == 1
+
+    @override_settings(
+        PWNED_PASSWORDS={"METRICS": "pwned_passwords_django.metrics.InMemoryMetrics"}
+    )
+    def test_setting(self):
+        """
+        The metrics implementation can be chosen in settings.
+
+        """
+        assert isinstance(api.PwnedPasswords().metrics, metrics.InMemoryMetrics)
+
+    def test_requests(self):
+        """
+        The duration and response size of each request are recorded, by mode.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        api_client = api.PwnedPasswords(
+            client=self.count_sync_client(count=1), metrics=collected
+        )
+        api_client.check_password(self.sample_password)
+        api_client.check_password(self.sample_password)
+        assert sum(collected.durations["sync"].counts) == 2
+        assert sum(collected.response_sizes["sync"].counts) == 2
+        assert collected.response_sizes["sync"].total == 2 * len(
+            f"{self.sample_password_suffix}:1"
+        )
+        assert "async" not in collected.durations
+
+    async def test_requests_async(self):
+        """
+        The duration and response size of each async request are recorded.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        api_client = api.PwnedPasswords(
+            async_client=self.count_async_client(count=1), metrics=collected
+        )
+        await api_client.check_password_async(self.sample_password)
+        assert sum(collected.durations["async"].counts) == 1
+        assert sum(collected.response_sizes["async"].counts) == 1
+
+    def test_errors(self):
+        """
+        Errors are counted by code, and requests which received no response are
+        recorded without a size.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        for client in (
+            self.custom_response_sync_client(
+                response_text="", status_code=HTTPStatus.SERVICE_UNAVAILABLE
+            ),
+            self.exception_client(
+                exception_class=httpx.ConnectTimeout, message="Timed out"
+            ),
+        ):
+            api_client = api.PwnedPasswords(client=client, metrics=collected)
+            with self.assertRaises(exceptions.PwnedPasswordsError):
+                api_client.check_password(self.sample_password)
+        assert collected.errors[exceptions.ErrorCode.HTTP_ERROR] == 1
+        assert collected.errors[exceptions.ErrorCode.API_TIMEOUT] == 1
+        assert sum(collected.durations["sync"].counts) == 2
+        assert sum(collected.response_sizes["sync"].counts) == 1
+
+    def test_fallbacks(self):
+        """
+        Fallbacks by the validator and the middleware are counted.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        validator = PwnedPasswordsValidator(
+            api_client=api.PwnedPasswords(
+                client=self.exception_client(
+                    exception_class=httpx.ConnectTimeout, message="Timed out"
+                ),
+                metrics=collected,
+            )
+        )
+        validator.validate("correct horse")
+        validator.validate_many(["correct horse", self.sample_password])
+        assert collected.fallbacks == 3
+
+        sync_mock, _ = self.api_error_mocks()
+        with mock.patch.object(api.default_client, "metrics", collected), mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ):
+            self.client.post(
+                reverse("pwned-middleware"), data={"password": self.sample_password}
+            )
+        assert collected.fallbacks == 4
+
+    async def test_shared_results(self):
+        """
+        Lookups of results already known while handling a request, and waits for
+        checks in progress, are counted.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        assert memo.lookup(self.sample_password, collected) is None
+        assert collected.cache_lookups == {True: 0, False: 0}
+        with memo.request_scope():
+            assert memo.lookup(self.sample_password, collected) is None
+            assert await memo.alookup(self.sample_password, collected) is None
+            memo.record(self.sample_password, 1)
+            assert memo.lookup(self.sample_password, collected) == 1
+            claim = memo.claim("correct horse")
+            asyncio.get_running_loop().call_soon(claim.set_result, 0)
+            assert await memo.alookup("correct horse", collected) == 0
+        assert collected.cache_lookups == {True: 2, False: 2}
+        assert collected.single_flight_joins == 1
+
+    def test_export_prometheus(self):
+        """
+        Metrics are exported in the Prometheus text format.
+
+        """
+        collected = metrics.InMemoryMetrics()
+        collected.observe_request("sync", 0.03, 20000)
+        collected.observe_request("sync", 10.0, None)
+        collected.record_error(exceptions.ErrorCode.API_TIMEOUT)
+        collected.record_fallback(2)
+        collected.record_cache_lookup(hit=True)
+        collected.record_single_flight_join()
+        exported = metrics.export_prometheus(collected)
+        for line in (
+            "# TYPE pwned_passwords_request_duration_seconds histogram",
+            'pwned_passwords_request_duration_seconds_bucket{mode="sync",le="0.025"} 0',
+            'pwned_passwords_request_duration_seconds_bucket{mode="sync",le="0.05"} 1',
+            'pwned_passwords_request_duration_seconds_bucket{mode="sync",le="+Inf"} 2',
+            'pwned_passwords_request_duration_seconds_sum{mode="sync"} 10.03',
+            'pwned_passwords_request_duration_seconds_count{mode="sync"} 2',
+            'pwned_passwords_response_size_bytes_bucket{mode="sync",le="32768"} 1',
+            'pwned_passwords_response_size_bytes_count{mode="sync"} 1',
+            'pwned_passwords_errors_total{code="api_timeout"} 1',
+            'pwned_passwords_errors_total{code="http_error"} 0',
+            "pwned_passwords_fallbacks_total 2",
+            'pwned_passwords_cache_lookups_total{result="hit"} 1',
+            'pwned_passwords_cache_lookups_total{result="miss"} 0',
+            "pwned_passwords_single_flight_joins_total 1",
+        ):
+            assert line in exported.splitlines(), line
+        assert exported.endswith("\n")
+
+    def test_view(self):
+        """
+        The metrics view exposes in-memory metrics of the default client, and is
+        not found when they are not enabled.
+
+        """
+        assert self.client.get(reverse("pwned-metrics")).status_code == 404
+
+        collected = metrics.InMemoryMetrics()
+        collected.record_fallback()
+        with mock.patch.object(api.default_client, "metrics", collected):
+            response = self.client.get(reverse("pwned-metrics"))
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert b"pwned_passwords_fallbacks_total 1" in response.content
@@ -5,12 +5,19 @@ Tests for pwned-passwords-django's middleware.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+import asyncio
 from unittest import mock
 
-from django.test import override_settings
+from asgiref.sync import sync_to_async
+from django.core.exceptions import SynchronousOnlyOperation, ValidationError
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
 from django.urls import reverse
 from django.utils.crypto import get_random_string
 
+from pwned_passwords_django import api, memo, middleware, timing
+from pwned_passwords_django.validators import PwnedPasswordsValidator
+
 from .base import PwnedPasswordsTests
 
 
@@ -24,8 +31,13 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
     test_clean_async = "pwned-clean-async"
     test_breach = "pwned-breach"
     test_breach_async = "pwned-breach-async"
+    test_breach_async_sync_access = "pwned-breach-async-sync-access"
+    test_breach_async_awaited_sync_access = "pwned-breach-async-awaited-sync-access"
     test_middleware = "pwned-middleware"
     test_middleware_async = "pwned-middleware-async"
+    test_unread = "pwned-unread"
+    test_validate = "pwned-validate"
+    test_validate_async = "pwned-validate-async"
 
     def test_password_detection(self):
         """
@@ -46,7 +58,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"password2": self.sample_password},
                 {"input_password": self.sample_password},
             ):
-                self.client.post(self.test_middleware, data=payload)
+                self.client.post(reverse(self.test_middleware), data=payload)
                 sync_mock.assert_called_with(self.sample_password)
                 async_mock.assert_not_called()
                 sync_mock.reset_mock()
@@ -57,7 +69,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"token": self.sample_password},
                 {"authcode": self.sample_password},
             ):
-                self.client.post(self.test_middleware, data=payload)
+                self.client.post(reverse(self.test_middleware), data=payload)
                 sync_mock.assert_not_called()
                 async_mock.assert_not_called()
 
@@ -80,7 +92,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"password2": self.sample_password},
                 {"input_password": self.sample_password},
             ):
-                await self.async_client.post(self.test_middleware_async, data=payload)
+                await self.async_client.post(
+                    reverse(self.test_middleware_async), data=payload
+                )
                 async_mock.assert_called_with(self.sample_password)
                 sync_mock.assert_not_called()
                 async_mock.reset_mock()
@@ -91,7 +105,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"token": self.sample_password},
                 {"authcode": self.sample_password},
             ):
-                await self.async_client.post(self.test_middleware_async, data=payload)
+                await self.async_client.post(
+                    reverse(self.test_middleware_async), data=payload
+                )
                 async_mock.assert_not_called()
                 sync_mock.assert_not_called()
 
@@ -105,7 +121,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
         with mock.patch(
             "pwned_passwords_django.api.check_password", sync_mock
         ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
-            self.client.get(self.test_clean, data={"password": self.sample_password})
+            self.client.get(
+                reverse(self.test_clean), data={"password": self.sample_password}
+            )
             sync_mock.assert_not_called()
             async_mock.assert_not_called()
 
@@ -120,7 +138,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
             "pwned_passwords_django.api.check_password", sync_mock
         ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
             await self.async_client.get(
-                self.test_clean_async, data={"password": self.sample_password}
+                reverse(self.test_clean_async), data={"password": self.sample_password}
             )
             sync_mock.assert_not_called()
             async_mock.assert_not_called()
@@ -153,6 +171,257 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                     data={field: self.sample_password},
                 )
 
+    async def test_compromised_async_sync_access(self):
+        """
+        Compromised passwords are detected when an async view accesses
+        ``request.pwned_passwords`` synchronously after awaiting the result, or when
+        a sync view is used with the async middleware.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            for url in (
+                reverse(
+                    self.test_breach_async_awaited_sync_access,
+                    kwargs={"field": "password"},
+                ),
+                reverse(self.test_breach, kwargs={"field": "password"}),
+            ):
+                await self.async_client.post(
+                    url, data={"password": self.sample_password}
+                )
+
+    async def test_compromised_async_sync_access_unawaited(self):
+        """
+        An async view which reads ``request.pwned_passwords`` synchronously, without
+        awaiting the result, gets SynchronousOnlyOperation while the check is still
+        running, rather than blocking the event loop.
+
+        """
+
+        async def check_password_async(password):
+            """
+            Mock async check which finishes only after the view has run.
+
+            """
+            await asyncio.sleep(0.1)
+            return 10
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password_async", check_password_async
+        ):
+            with self.assertRaises(SynchronousOnlyOperation):
+                await self.async_client.post(
+                    reverse(
+                        self.test_breach_async_sync_access, kwargs={"field": "password"}
+                    ),
+                    data={"password": self.sample_password},
+                )
+
+    def test_lazy(self):
+        """
+        The middleware does not check passwords unless ``request.pwned_passwords`` is
+        accessed, and checks them only once no matter how often it is accessed.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            self.client.post(
+                reverse(self.test_unread), data={"password": self.sample_password}
+            )
+            sync_mock.assert_not_called()
+
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            middleware.pwned_passwords_middleware(lambda request: None)(request)
+            sync_mock.assert_not_called()
+            assert request.pwned_passwords == ["password"]
+            assert "password" in request.pwned_passwords
+            assert len(request.pwned_passwords) == 1
+            sync_mock.assert_called_once_with(self.sample_password)
+            async_mock.assert_not_called()
+
+    async def test_background_async(self):
+        """
+        The async middleware checks passwords in the background, even when the view
+        does not read the result, and checks them only once no matter how often the
+        result is read.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            await self.async_client.post(
+                reverse(self.test_unread), data={"password": self.sample_password}
+            )
+            async_mock.assert_called_once_with(self.sample_password)
+            async_mock.reset_mock()
+
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+
+            async def get_response(request):
+                """
+                Minimal async response handler for the middleware, which reads the
+                result twice.
+
+                """
+                assert await request.apwned_passwords() == ["password"]
+                assert await request.apwned_passwords() is request.pwned_passwords
+
+            await middleware.pwned_passwords_middleware(get_response)(request)
+            assert request.pwned_passwords == ["password"]
+            async_mock.assert_called_once_with(self.sample_password)
+            sync_mock.assert_not_called()
+
+    async def test_background_async_sync_access(self):
+        """
+        A check can be awaited without being started in the background, and
+        synchronous access to a check from an async context uses the background
+        result if it's ready, and otherwise raises rather than block the event loop.
+
+        """
+        sync_mock, async_mock = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            pwned_passwords = middleware.PwnedPasswordsList(request=request)
+            assert await pwned_passwords.aresolve() == ["password"]
+            pwned_passwords.start()
+            async_mock.assert_called_once_with(self.sample_password)
+            async_mock.reset_mock()
+
+            pwned_passwords = middleware.PwnedPasswordsList(request=request)
+            pwned_passwords.start()
+            pwned_passwords.start()
+            await asyncio.sleep(0)
+            assert pwned_passwords == ["password"]
+            async_mock.assert_called_once_with(self.sample_password)
+            sync_mock.assert_not_called()
+            async_mock.reset_mock()
+
+            pwned_passwords = middleware.PwnedPasswordsList(request=request)
+            with self.assertRaises(SynchronousOnlyOperation):
+                list(pwned_passwords)
+            pwned_passwords.start()
+            with self.assertRaises(SynchronousOnlyOperation):
+                list(pwned_passwords)
+            assert await pwned_passwords.aresolve() == ["password"]
+            assert pwned_passwords == ["password"]
+            async_mock.assert_called_once_with(self.sample_password)
+            sync_mock.assert_not_called()
+
+    async def test_background_payload_extracted(self):
+        """
+        Starting a background check extracts the candidate passwords immediately, so
+        that the background task does not parse the payload while the view runs.
+
+        """
+        _, async_mock = self.api_mocks()
+        with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            pwned_passwords = middleware.PwnedPasswordsList(request=request)
+            pwned_passwords.start()
+            request.POST = {}
+            assert await pwned_passwords.aresolve() == ["password"]
+            async_mock.assert_called_once_with(self.sample_password)
+
+    async def test_background_async_worker_thread(self):
+        """
+        Synchronous access to a background check from a worker thread waits for the
+        background result.
+
+        """
+        sync_mock, _ = self.api_mocks()
+        release = asyncio.Event()
+
+        async def check_password_async(password):
+            """
+            Mock async check which waits to be released.
+
+            """
+            await release.wait()
+            return 10
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch(
+            "pwned_passwords_django.api.check_password_async", check_password_async
+        ):
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            pwned_passwords = middleware.PwnedPasswordsList(request=request)
+            pwned_passwords.start()
+            asyncio.get_running_loop().call_later(0.01, release.set)
+            assert await sync_to_async(list)(pwned_passwords) == ["password"]
+            sync_mock.assert_not_called()
+
+    async def test_background_view_error(self):
+        """
+        When the view raises, the background check is cancelled rather than left
+        running after the request.
+
+        """
+        cancelled = asyncio.Event()
+
+        async def check_password_async(password):
+            """
+            Mock async check which never finishes unless cancelled.
+
+            """
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def get_response(request):
+            """
+            Minimal async response handler for the middleware, which lets the
+            check start, then raises.
+
+            """
+            await asyncio.sleep(0)
+            raise ValueError("Broken view.")
+
+        with mock.patch(
+            "pwned_passwords_django.api.check_password_async", check_password_async
+        ):
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            with self.assertRaises(ValueError):
+                await middleware.pwned_passwords_middleware(get_response)(request)
+        assert cancelled.is_set()
+
+    def test_list_compatibility(self):
+        """
+        The ``request.pwned_passwords`` object behaves like a list.
+
+        """
+        resolved = middleware.PwnedPasswordsList(["password1", "password2"])
+        assert resolved == ["password1", "password2"]
+        assert resolved + ["password3"] == ["password1", "password2", "password3"]
+        assert resolved[:1] == ["password1"]
+        assert resolved.copy() == resolved
+        resolved.append("password3")
+        resolved += ["password4"]
+        assert len(resolved) == 4
+        assert not middleware.PwnedPasswordsList()
+
     def test_non_compromised(self):
         """
         Non-compromised passwords do not set a count in the middleware.
@@ -160,7 +429,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
         """
         sync_mock, _ = self.api_mocks(count=0)
         with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
-            self.client.post(self.test_clean, data={"password": self.sample_password})
+            self.client.post(
+                reverse(self.test_clean), data={"password": self.sample_password}
+            )
 
     async def test_non_compromised_async(self):
         """
@@ -170,7 +441,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
         _, async_mock = self.api_mocks(count=0)
         with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
             await self.async_client.post(
-                self.test_clean_async, data={"password": self.sample_password}
+                reverse(self.test_clean_async), data={"password": self.sample_password}
             )
 
     @override_settings(PWNED_PASSWORDS={"PASSWORD_REGEX": r"TOKEN"})
@@ -189,7 +460,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"authtoken": self.sample_password},
                 {"apitoken": self.sample_password},
             ):
-                self.client.post(self.test_middleware, data=payload)
+                self.client.post(reverse(self.test_middleware), data=payload)
                 sync_mock.assert_called_with(self.sample_password)
                 async_mock.assert_not_called()
                 sync_mock.reset_mock()
@@ -199,7 +470,7 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"authcode": self.sample_password},
                 {"password": self.sample_password},
             ):
-                self.client.post(self.test_middleware, data=payload)
+                self.client.post(reverse(self.test_middleware), data=payload)
                 sync_mock.assert_not_called()
                 async_mock.assert_not_called()
 
@@ -219,7 +490,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"authtoken": self.sample_password},
                 {"apitoken": self.sample_password},
             ):
-                await self.async_client.post(self.test_middleware_async, data=payload)
+                await self.async_client.post(
+                    reverse(self.test_middleware_async), data=payload
+                )
                 async_mock.assert_called_with(self.sample_password)
                 sync_mock.assert_not_called()
                 async_mock.reset_mock()
@@ -229,7 +502,9 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
                 {"authcode": self.sample_password},
                 {"password": self.sample_password},
             ):
-                await self.async_client.post(self.test_middleware_async, data=payload)
+                await self.async_client.post(
+                    reverse(self.test_middleware_async), data=payload
+                )
                 async_mock.assert_not_called()
                 sync_mock.assert_not_called()
 
@@ -242,7 +517,8 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
         sync_mock, _ = self.api_error_mocks()
         with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
             self.client.post(
-                self.test_clean, data={"password": get_random_string(length=20)}
+                reverse(self.test_clean),
+                data={"password": get_random_string(length=20)},
             )
 
     async def test_error_handler_async(self):
@@ -254,5 +530,403 @@ class PwnedPasswordsMiddlewareTests(PwnedPasswordsTests):
         async_mock, _ = self.api_error_mocks()
         with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
             await self.async_client.post(
-                self.test_clean_async, data={"password": get_random_string(length=20)}
+                reverse(self.test_clean_async),
+                data={"password": get_random_string(length=20)},
+            )
+
+    def test_duplicate_values(self):
+        """
+        The middleware checks each distinct value only once, and maps the result back
+        to every key containing that value.
+
+        """
+        # pylint: disable=protected-access
+        other_password = get_random_string(length=20)
+        sync_mock = mock.Mock(
+            side_effect=lambda password: 10 if password == self.sample_password else 0
+        )
+        request = RequestFactory().post(
+            "/",
+            data={
+                "password1": self.sample_password,
+                "password2": self.sample_password,
+                "old_password": other_password,
+            },
+        )
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            result = middleware._scan_payload_sync(request)
+        assert result == ["password1", "password2"]
+        assert sync_mock.call_count == 2
+        sync_mock.assert_has_calls(
+            [mock.call(self.sample_password), mock.call(other_password)],
+            any_order=True,
+        )
+
+    def test_duplicate_values_error_handler(self):
+        """
+        When the middleware falls back to CommonPasswordValidator, the fallback
+        result is mapped back to every key containing the checked value.
+
+        """
+        # pylint: disable=protected-access
+        sync_mock, _ = self.api_error_mocks()
+        request = RequestFactory().post(
+            "/",
+            data={
+                "password1": "password",
+                "password2": "password",
+                "old_password": get_random_string(length=20),
+            },
+        )
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            result = middleware._scan_payload_sync(request)
+        assert result == ["password1", "password2"]
+
+    def test_url_allowlist(self):
+        """
+        When URL names or path prefixes are configured, the middleware only scans
+        requests to matching URLs.
+
+        """
+        sync_mock, _ = self.api_mocks()
+        breach_url = reverse(self.test_breach, kwargs={"field": "password"})
+        clean_url = reverse(self.test_clean)
+        for allowlist in (
+            {"MIDDLEWARE_URL_NAMES": [self.test_breach]},
+            {"MIDDLEWARE_PATH_PREFIXES": [breach_url]},
+            {"MIDDLEWARE_URL_NAMES": [], "MIDDLEWARE_PATH_PREFIXES": [breach_url]},
+        ):
+            with override_settings(PWNED_PASSWORDS=allowlist), mock.patch(
+                "pwned_passwords_django.api.check_password", sync_mock
+            ):
+                self.client.post(breach_url, data={"password": self.sample_password})
+                sync_mock.assert_called_once_with(self.sample_password)
+                sync_mock.reset_mock()
+                # The "clean" view asserts request.pwned_passwords is empty, which
+                # would fail if the compromised password were checked.
+                self.client.post(clean_url, data={"password": self.sample_password})
+                self.client.post(
+                    "/nonexistent/", data={"password": self.sample_password}
+                )
+                sync_mock.assert_not_called()
+
+    @override_settings(PWNED_PASSWORDS={"MIDDLEWARE_URL_NAMES": ["pwned-breach-async"]})
+    async def test_url_allowlist_async(self):
+        """
+        When URL names are configured, the async middleware only scans requests to
+        matching URLs.
+
+        """
+        _, async_mock = self.api_mocks()
+        with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            await self.async_client.post(
+                reverse(self.test_breach_async, kwargs={"field": "password"}),
+                data={"password": self.sample_password},
+            )
+            async_mock.assert_called_once_with(self.sample_password)
+            async_mock.reset_mock()
+            await self.async_client.post(
+                reverse(self.test_clean_async),
+                data={"password": self.sample_password},
+            )
+            async_mock.assert_not_called()
+
+    def test_payload_gating(self):
+        """
+        The middleware only scans form data no larger than the configured maximum
+        content length.
+
+        """
+        sync_mock, _ = self.api_mocks()
+        clean_url = reverse(self.test_clean)
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            self.client.post(
+                clean_url,
+                data={"password": self.sample_password},
+                content_type="application/json",
+            )
+            with override_settings(
+                PWNED_PASSWORDS={"MIDDLEWARE_MAX_CONTENT_LENGTH": 10}
+            ):
+                self.client.post(clean_url, data={"password": self.sample_password})
+                self.client.post(
+                    clean_url,
+                    data="password=swordfish",
+                    content_type="application/x-www-form-urlencoded",
+                    CONTENT_LENGTH="invalid",
+                )
+            sync_mock.assert_not_called()
+
+            breach_url = reverse(self.test_breach, kwargs={"field": "password"})
+            with override_settings(
+                PWNED_PASSWORDS={"MIDDLEWARE_MAX_CONTENT_LENGTH": None}
+            ):
+                self.client.post(breach_url, data={"password": self.sample_password})
+            self.client.post(
+                breach_url,
+                data=f"password={self.sample_password}",
+                content_type="application/x-www-form-urlencoded",
+            )
+            assert sync_mock.call_count == 2
+
+    def test_payload_gating_content_length(self):
+        """
+        A request without a valid ``Content-Length``, such as a chunked upload, is
+        not scanned unless there is no maximum content length.
+
+        """
+        request = RequestFactory().post("/", data={"password": self.sample_password})
+        assert middleware.has_scannable_payload(request)
+        for content_length in ("", "invalid", "-1"):
+            request.META["CONTENT_LENGTH"] = content_length
+            assert not middleware.has_scannable_payload(request)
+        del request.META["CONTENT_LENGTH"]
+        request.META["HTTP_TRANSFER_ENCODING"] = "chunked"
+        assert not middleware.has_scannable_payload(request)
+        with override_settings(PWNED_PASSWORDS={"MIDDLEWARE_MAX_CONTENT_LENGTH": None}):
+            assert middleware.has_scannable_payload(request)
+
+    @override_settings(PWNED_PASSWORDS={"MIDDLEWARE_MAX_CONTENT_LENGTH": 10})
+    async def test_payload_gating_async(self):
+        """
+        The async middleware does not read the body of requests it will not scan.
+
+        """
+        # pylint: disable=protected-access
+        _, async_mock = self.api_mocks()
+        request = RequestFactory().post("/", data={"password": self.sample_password})
+        request._stream = mock.Mock(
+            spec_set=["read"], read=mock.Mock(side_effect=AssertionError)
+        )
+
+        async def get_response(request):
+            """
+            Minimal async response handler for the middleware.
+
+            """
+
+        with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            await middleware.pwned_passwords_middleware(get_response)(request)
+            assert await request.apwned_passwords() == []
+        async_mock.assert_not_called()
+
+    @override_settings(PWNED_PASSWORDS={"CHECK_COMMON_FIRST": True})
+    def test_check_common_first(self):
+        """
+        When enabled, the middleware treats common passwords as compromised without
+        contacting Pwned Passwords.
+
+        """
+        # pylint: disable=protected-access
+        sync_mock, _ = self.api_mocks(count=0)
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            request = RequestFactory().post(
+                "/", data={"password1": "password", "password2": "password"}
+            )
+            assert middleware._scan_payload_sync(request) == ["password1", "password2"]
+            sync_mock.assert_not_called()
+
+            other_password = get_random_string(length=20)
+            request = RequestFactory().post(
+                "/", data={"password": "password", "new_password": other_password}
+            )
+            assert middleware._scan_payload_sync(request) == ["password"]
+            sync_mock.assert_called_once_with(other_password)
+
+    @override_settings(PWNED_PASSWORDS={"CHECK_COMMON_FIRST": True})
+    async def test_check_common_first_async(self):
+        """
+        When enabled, the async middleware treats common passwords as compromised
+        without contacting Pwned Passwords.
+
+        """
+        # pylint: disable=protected-access
+        _, async_mock = self.api_mocks(count=0)
+        with mock.patch("pwned_passwords_django.api.check_password_async", async_mock):
+            other_password = get_random_string(length=20)
+            request = RequestFactory().post(
+                "/", data={"password": "password", "new_password": other_password}
+            )
+            assert await middleware._scan_payload_async(request) == ["password"]
+            async_mock.assert_called_once_with(other_password)
+
+    def test_shared_results(self):
+        """
+        The middleware and the validator share results while handling a request, so
+        that a password is only checked once.
+
+        """
+        sync_mock, _ = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch.object(api.default_client, "check_password", sync_mock):
+            self.client.post(
+                reverse(self.test_validate), data={"password": self.sample_password}
+            )
+            sync_mock.assert_called_once_with(self.sample_password)
+
+            # The results are discarded when the request finishes.
+            sync_mock.reset_mock()
+            self.client.post(
+                reverse(self.test_validate), data={"password": self.sample_password}
+            )
+            sync_mock.assert_called_once_with(self.sample_password)
+
+    def test_shared_results_middleware_first(self):
+        """
+        The validator uses the middleware's result for a password already checked by
+        the middleware.
+
+        """
+        # pylint: disable=protected-access
+        sync_mock, _ = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", sync_mock
+        ), mock.patch.object(api.default_client, "check_password", sync_mock):
+            request = RequestFactory().post(
+                "/", data={"password": self.sample_password}
+            )
+            with memo.request_scope():
+                assert middleware._scan_payload_sync(request) == ["password"]
+                with self.assertRaises(ValidationError):
+                    PwnedPasswordsValidator().validate(self.sample_password)
+            sync_mock.assert_called_once_with(self.sample_password)
+
+    def test_shared_results_error(self):
+        """
+        Fallback results are not shared, since Pwned Passwords may be reachable again
+        by the time the validator runs.
+
+        """
+        # pylint: disable=protected-access
+        sync_mock, _ = self.api_error_mocks()
+        request = RequestFactory().post("/", data={"password": self.sample_password})
+        with memo.request_scope():
+            with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+                middleware._scan_payload_sync(request)
+            assert memo.lookup(self.sample_password) is None
+
+    async def test_shared_results_async(self):
+        """
+        The async validator waits for the middleware's in-progress check of a
+        password, instead of checking it again.
+
+        """
+        _, async_mock = self.api_mocks()
+        with mock.patch(
+            "pwned_passwords_django.api.check_password_async", async_mock
+        ), mock.patch.object(api.default_client, "check_password_async", async_mock):
+            await self.async_client.post(
+                reverse(self.test_validate_async),
+                data={"password": self.sample_password},
+            )
+            async_mock.assert_awaited_once_with(self.sample_password)
+
+    async def test_shared_results_async_error(self):
+        """
+        When the async middleware's check fails, a validator waiting on it checks the
+        password itself.
+
+        """
+        # pylint: disable=protected-access
+        _, async_mock = self.api_error_mocks()
+        request = RequestFactory().post("/", data={"password": self.sample_password})
+        with memo.request_scope():
+            with mock.patch(
+                "pwned_passwords_django.api.check_password_async", async_mock
+            ):
+                task = asyncio.ensure_future(middleware._scan_payload_async(request))
+                await asyncio.sleep(0)
+                lookup = asyncio.ensure_future(memo.alookup(self.sample_password))
+                assert await task == ["password"]
+                assert await lookup is None
+
+    @override_settings(PWNED_PASSWORDS={"MIDDLEWARE_SERVER_TIMING": True})
+    def test_server_timing(self):
+        """
+        When enabled, the middleware reports the time spent checking passwords in a
+        Server-Timing header.
+
+        """
+        api_client = api.PwnedPasswords(client=self.count_sync_client(count=1))
+        with mock.patch(
+            "pwned_passwords_django.api.check_password", api_client.check_password
+        ):
+            response = self.client.post(
+                reverse(self.test_middleware),
+                data={"password": self.sample_password},
+            )
+        for phase in ("parse", "cache", "hash", "net"):
+            assert f"pwned-{phase};dur=" in response["Server-Timing"]
+        assert "pwned-fallback" not in response["Server-Timing"]
+
+        # Nothing was checked, so nothing is reported.
+        response = self.client.post(reverse(self.test_unread))
+        assert not response.has_header("Server-Timing")
+
+    @override_settings(PWNED_PASSWORDS={"MIDDLEWARE_SERVER_TIMING": True})
+    def test_server_timing_fallback(self):
+        """
+        When enabled, the middleware reports the time spent on the fallback check.
+
+        """
+        sync_mock, _ = self.api_error_mocks()
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            response = self.client.post(
+                reverse(self.test_middleware),
+                data={"password": self.sample_password},
             )
+        assert "pwned-fallback;dur=" in response["Server-Timing"]
+
+    @override_settings(PWNED_PASSWORDS={"MIDDLEWARE_SERVER_TIMING": True})
+    async def test_server_timing_async(self):
+        """
+        When enabled, the async middleware reports the time spent checking passwords
+        in a Server-Timing header.
+
+        """
+        api_client = api.PwnedPasswords(async_client=self.count_async_client(count=1))
+        with mock.patch(
+            "pwned_passwords_django.api.check_password_async",
+            api_client.check_password_async,
+        ):
+            response = await self.async_client.post(
+                reverse(self.test_middleware_async),
+                data={"password": self.sample_password},
+            )
+        for phase in ("parse", "cache", "hash", "net"):
+            assert f"pwned-{phase};dur=" in response["Server-Timing"]
+
+    def test_server_timing_disabled(self):
+        """
+        By default, the middleware does not measure time spent checking passwords.
+
+        """
+        sync_mock, _ = self.api_mocks()
+        request = RequestFactory().post("/", data={"password": self.sample_password})
+
+        def get_response(request):
+            """
+            Read request.pwned_passwords, and return a response.
+
+            """
+            assert request.pwned_passwords_timings is None
+            assert request.pwned_passwords == ["password"]
+            return HttpResponse()
+
+        with mock.patch("pwned_passwords_django.api.check_password", sync_mock):
+            response = middleware.pwned_passwords_middleware(get_response)(request)
+        assert not response.has_header("Server-Timing")
+
+    def test_server_timing_existing_header(self):
+        """
+        The middleware adds to, rather than replacing, any existing Server-Timing
+        header.
+
+        """
+        # pylint: disable=protected-access
+        timings = timing.Timings()
+        timings.add(timing.NET, 0.001)
+        response = HttpResponse(headers={"Server-Timing": "db;dur=5.0"})
+        middleware._add_server_timing(response, timings)
+        assert response["Server-Timing"] == ('db;dur=5.0, pwned-net;dur=1.0;desc="net"')
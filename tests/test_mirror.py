@@ -0,0 +1,269 @@
+"""
+Tests for pwned-passwords-django's local mirror of the range API.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import hashlib
+import io
+import os
+import tempfile
+from http import HTTPStatus
+
+import httpx
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from pwned_passwords_django import api, mirror
+
+from .base import PwnedPasswordsTests
+
+
+class MirrorTests(PwnedPasswordsTests):
+    """
+    Test the local mirror of the range API.
+
+    """
+
+    # Passwords and breach counts used to build the test mirror.
+    passwords = {
+        "password": 1000,
+        "123456": 900,
+        "swordfish": 500,
+        "hunter2": 10,
+        "correct horse": 1,
+    }
+
+    def setUp(self):
+        """
+        Create a temporary directory, and the lines of the test dataset.
+
+        """
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        hashes = sorted(
+            (
+                hashlib.new("sha1", password.encode(), usedforsecurity=False)
+                .hexdigest()
+                .upper(),
+                count,
+            )
+            for password, count in self.passwords.items()
+        )
+        # Two more hashes with the same prefix as the sample password.
+        hashes += [
+            (f"{self.sample_password_prefix}{'F' * 34}{digit}", 2) for digit in "EF"
+        ]
+        hashes.sort()
+        self.lines = [f"{line_hash}:{count:,}\n" for line_hash, count in hashes] + [
+            "\n"
+        ]
+        self.directory = os.path.join(self.temp_dir, "mirror")
+        mirror.build_mirror(self.lines, self.directory)
+        mirror._mirror.cache_clear()  # pylint: disable=protected-access
+        self.addCleanup(mirror._mirror.cache_clear)  # pylint: disable=protected-access
+
+    def test_body(self):
+        """
+        The mirror serves each prefix's hashes in the format of the range API.
+
+        """
+        local_mirror = mirror.Mirror(self.directory)
+        assert (
+            local_mirror.body(self.sample_password_prefix.lower())
+            == (
+                f"{self.sample_password_suffix}:500\r\n"
+                f"{'F' * 34}E:2\r\n"
+                f"{'F' * 34}F:2"
+            ).encode()
+        )
+        assert local_mirror.body("5BAA6").startswith(
+            b"1E4C9B93F3F0682250B6CF8331B7EE68FD8:1000"
+        )
+        assert local_mirror.body("00000") == b""
+        assert local_mirror.body("FFFFF") == b""
+        with self.assertRaises(ValueError):
+            local_mirror.body("XYZ12")
+
+    def test_padding(self):
+        """
+        Padded bodies add between 800 and 1,000 random lines with a count of zero.
+
+        """
+        local_mirror = mirror.Mirror(self.directory)
+        for prefix, real in ((self.sample_password_prefix, 3), ("00000", 0)):
+            lines = local_mirror.body(prefix, padded=True).split(b"\r\n")
+            padding = [line for line in lines if line.endswith(b":0")]
+            assert 800 <= len(padding) <= 1000
+            assert len(lines) == real + len(padding)
+            assert all(len(line) == 37 for line in padding)
+
+    def test_etag(self):
+        """
+        ETags identify the mirror and prefix, and are weak for padded responses.
+
+        """
+        local_mirror = mirror.Mirror(self.directory)
+        etag = local_mirror.etag("abcde")
+        assert etag == f'"{local_mirror.build_id}-ABCDE"'
+        assert local_mirror.etag("ABCDE", padded=True) == f"W/{etag}"
+        assert mirror.etag_matches(f'"other", {etag}', etag)
+        assert mirror.etag_matches(etag, f"W/{etag}")
+        assert mirror.etag_matches("*", etag)
+        assert not mirror.etag_matches('"other"', etag)
+        assert not mirror.etag_matches("", etag)
+        mirror.build_mirror(self.lines, self.temp_dir)
+        assert mirror.Mirror(self.temp_dir).etag("ABCDE") != etag
+
+    def test_invalid_mirror(self):
+        """
+        Building a mirror from invalid or unsorted data, or opening an invalid
+        mirror, raises an exception.
+
+        """
+        valid = "A" * 40
+        for lines in (
+            self.lines[::-1],
+            self.lines * 2,
+            ["ABC:1"],
+            ["X" * 40 + ":1"],
+            # Lines which int() would parse.
+            ["0x" + valid[2:] + ":1"],
+            ["A_" + valid[2:] + ":1"],
+            ["+" + valid[1:] + ":1"],
+            ["-" + valid[1:] + ":1"],
+            [" " + valid[1:] + ":1"],
+            [valid + " :1"],
+            [valid + ": 1"],
+            [valid + ":+1"],
+            [valid + ":1_0"],
+            [valid + ":"],
+        ):
+            with self.assertRaises(ValueError):
+                mirror.build_mirror(lines, os.path.join(self.temp_dir, "invalid"))
+        shard = os.path.join(self.directory, "0.shard")
+        with open(shard, "rb") as shard_file:
+            original = shard_file.read()
+        for content in (
+            b"",
+            original[:100],
+            b"XXXX" + original[4:],
+            original + b"\r\n",
+        ):
+            with open(shard, "wb") as shard_file:
+                shard_file.write(content)
+            with self.assertRaises(ImproperlyConfigured):
+                mirror.Mirror(self.directory)
+        other = os.path.join(self.temp_dir, "other")
+        mirror.build_mirror(self.lines, other)
+        os.replace(os.path.join(other, "0.shard"), shard)
+        with self.assertRaises(ImproperlyConfigured):
+            mirror.Mirror(self.directory)
+
+    def test_command(self):
+        """
+        The management command builds a mirror.
+
+        """
+        source_path = os.path.join(self.temp_dir, "pwned-passwords.txt")
+        with open(source_path, "w", encoding="utf-8") as source:
+            source.writelines(self.lines)
+        path = os.path.join(self.temp_dir, "command")
+        stdout = io.StringIO()
+        call_command("pwned_passwords_build_mirror", source_path, path, stdout=stdout)
+        assert "Wrote 7 hashes" in stdout.getvalue()
+        assert mirror.Mirror(path).body("5BAA6")
+        assert not os.path.exists(os.path.join(path, mirror.BULK_HIGH_FILE))
+        call_command(
+            "pwned_passwords_build_mirror",
+            source_path,
+            path,
+            bulk_index=True,
+            stdout=stdout,
+        )
+        assert os.path.getsize(os.path.join(path, mirror.BULK_HIGH_FILE)) == 7 * 8
+        with self.assertRaises(CommandError):
+            call_command(
+                "pwned_passwords_build_mirror",
+                os.path.join(self.temp_dir, "missing.txt"),
+                path,
+            )
+
+    def test_view(self):
+        """
+        The view serves the range API from the configured mirror, with cache
+        headers, and supports conditional requests.
+
+        """
+        url = reverse("pwned-range", kwargs={"prefix": self.sample_password_prefix})
+        with override_settings(PWNED_PASSWORDS={"MIRROR_DIRECTORY": self.directory}):
+            response = self.client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response.content == mirror.get_mirror().body(
+                self.sample_password_prefix
+            )
+            assert response["Content-Type"] == "text/plain"
+            assert response["Cache-Control"] == "public, max-age=86400"
+            assert response["Vary"] == "Add-Padding"
+            etag = response["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            assert response["ETag"] == etag
+            response = self.client.get(url, HTTP_ADD_PADDING="true")
+            assert response["ETag"] == f"W/{etag}"
+            assert response.content.count(b":0\r\n") >= 799
+            assert self.client.post(url).status_code == HTTPStatus.METHOD_NOT_ALLOWED
+            response = self.client.get(
+                reverse("pwned-range", kwargs={"prefix": "XYZ12"})
+            )
+            assert response.status_code == HTTPStatus.NOT_FOUND
+        with override_settings(
+            PWNED_PASSWORDS={"MIRROR_DIRECTORY": self.directory, "MIRROR_MAX_AGE": 60}
+        ):
+            assert self.client.get(url)["Cache-Control"] == "public, max-age=60"
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(url)
+
+    async def test_asgi(self):
+        """
+        The ASGI application serves the range API from a mirror, and works with the
+        API client.
+
+        """
+        app = mirror.MirrorApp(self.directory, max_age=60)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+        ) as client:
+            url = f"/range/{self.sample_password_prefix}"
+            response = await client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response.content == app.mirror.body(self.sample_password_prefix)
+            assert response.headers["Cache-Control"] == "public, max-age=60"
+            assert response.headers["Content-Length"] == str(len(response.content))
+            etag = response.headers["ETag"]
+            response = await client.get(url, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            assert "Content-Length" not in response.headers
+            response = await client.get(url, headers={"Add-Padding": "true"})
+            assert response.headers["ETag"] == f"W/{etag}"
+            response = await client.head(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response.content == b""
+            response = await client.post(url)
+            assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
+            assert response.headers["Allow"] == "GET, HEAD"
+            response = await client.get("/range/XYZ12")
+            assert response.status_code == HTTPStatus.NOT_FOUND
+        assert await app({"type": "lifespan"}, None, None) is None
+
+        pwned = api.PwnedPasswords(
+            async_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        )
+        pwned.api_endpoint = "http://mirror.internal/range/"
+        assert await pwned.check_password_async(self.sample_password) == 500
+        assert await pwned.check_password_async("correcthorsebatterystaple") == 0
@@ -0,0 +1,190 @@
+"""
+Tests for pwned-passwords-django's fake Pwned Passwords server.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import random
+from http import HTTPStatus
+
+import httpx
+
+from pwned_passwords_django import api, exceptions, testing
+
+from .base import PwnedPasswordsTests
+
+
+class FakeRangeServerTests(PwnedPasswordsTests):
+    """
+    Test the fake Pwned Passwords server.
+
+    """
+
+    def test_range_body(self):
+        """
+        Range bodies are deterministic for a seed and prefix, sorted, and of the
+        requested size.
+
+        """
+        server = testing.FakeRangeServer(range_size=50)
+        body = server.range_body("abcde")
+        lines = body.split("\r\n")
+        suffixes = [line.split(":")[0] for line in lines]
+        assert len(lines) == 50
+        assert suffixes == sorted(suffixes)
+        assert all(len(suffix) == 35 for suffix in suffixes)
+        assert all(int(line.split(":")[1]) > 0 for line in lines)
+        assert body == testing.FakeRangeServer(range_size=50).range_body("ABCDE")
+        assert body != server.range_body("ABCDF")
+        assert body != testing.FakeRangeServer(range_size=50, seed=1).range_body(
+            "ABCDE"
+        )
+
+    def test_range_body_padded(self):
+        """
+        Padded range bodies add between 800 and 1,000 suffixes with a count of zero.
+
+        """
+        server = testing.FakeRangeServer(range_size=50)
+        lines = server.range_body("ABCDE", padded=True).split("\r\n")
+        padding = [line for line in lines if line.endswith(":0")]
+        assert 800 <= len(padding) <= 1000
+        assert len(lines) == 50 + len(padding)
+
+    def test_planted_passwords(self):
+        """
+        Passwords given to the server are reported with their breach counts.
+
+        """
+        server = testing.FakeRangeServer(passwords={self.sample_password: 42})
+        assert f"{self.sample_password_suffix}:42" in server.range_body(
+            self.sample_password_prefix
+        ).split("\r\n")
+        client = api.PwnedPasswords(client=httpx.Client(transport=server.transport()))
+        assert client.check_password(self.sample_password) == 42
+        assert client.check_password("correct horse") == 0
+
+    async def test_planted_passwords_async(self):
+        """
+        The asynchronous transport serves the same responses.
+
+        """
+        server = testing.FakeRangeServer(passwords={self.sample_password: 42})
+        client = api.PwnedPasswords(
+            async_client=httpx.AsyncClient(transport=server.async_transport())
+        )
+        assert await client.check_password_async(self.sample_password) == 42
+
+    def test_errors(self):
+        """
+        An error rate of 1 makes every request fail with an HTTP error.
+
+        """
+        server = testing.FakeRangeServer(error_rate=1.0)
+        client = api.PwnedPasswords(client=httpx.Client(transport=server.transport()))
+        with self.assertRaises(exceptions.PwnedPasswordsError) as context:
+            client.check_password(self.sample_password)
+        assert context.exception.code == exceptions.ErrorCode.HTTP_ERROR
+
+    async def test_timeouts_async(self):
+        """
+        A timeout rate of 1 makes every request time out.
+
+        """
+        server = testing.FakeRangeServer(timeout_rate=1.0)
+        client = api.PwnedPasswords(
+            async_client=httpx.AsyncClient(transport=server.async_transport())
+        )
+        with self.assertRaises(exceptions.PwnedPasswordsError) as context:
+            await client.check_password_async(self.sample_password)
+        assert context.exception.code == exceptions.ErrorCode.API_TIMEOUT
+
+    def test_timeouts(self):
+        """
+        The synchronous transport also times out.
+
+        """
+        server = testing.FakeRangeServer(timeout_rate=1.0)
+        client = api.PwnedPasswords(client=httpx.Client(transport=server.transport()))
+        with self.assertRaises(exceptions.PwnedPasswordsError) as context:
+            client.check_password(self.sample_password)
+        assert context.exception.code == exceptions.ErrorCode.API_TIMEOUT
+
+    def test_error_rate(self):
+        """
+        Errors and timeouts happen at roughly the configured rates, reproducibly for
+        a seed.
+
+        """
+
+        def outcomes():
+            """
+            Return the outcomes of 1,000 requests to a fresh server.
+
+            """
+            server = testing.FakeRangeServer(error_rate=0.2, timeout_rate=0.1, seed=7)
+            return [server._outcome()[1] for _ in range(1000)]
+
+        results = outcomes()
+        assert results == outcomes()
+        assert 150 < results.count("error") < 250
+        assert 50 < results.count("timeout") < 150
+
+    def test_latency(self):
+        """
+        The latency distributions produce delays in their expected ranges.
+
+        """
+        rng = random.Random(0)
+        assert testing.fixed_latency(0.25)(rng) == 0.25
+        assert all(
+            0.1 <= testing.uniform_latency(0.1, 0.2)(rng) <= 0.2 for _ in "x" * 100
+        )
+        delays = sorted(testing.lognormal_latency(0.05)(rng) for _ in range(1001))
+        assert 0.04 < delays[500] < 0.06
+        assert delays[-1] > 0.1
+
+    async def test_asgi(self):
+        """
+        The server works as an ASGI application.
+
+        """
+        server = testing.FakeRangeServer(passwords={self.sample_password: 42})
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=server), base_url="http://testserver"
+        ) as client:
+            response = await client.get(f"/range/{self.sample_password_prefix}")
+            assert response.status_code == HTTPStatus.OK
+            assert response.text == server.range_body(self.sample_password_prefix)
+            response = await client.get(
+                f"/range/{self.sample_password_prefix}",
+                headers={"Add-Padding": "true"},
+            )
+            assert response.text == server.range_body(
+                self.sample_password_prefix, padded=True
+            )
+            response = await client.get("/range/nothex")
+            assert response.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_asgi_failures(self):
+        """
+        The ASGI application responds to errors with an HTTP 503 and to timeouts,
+        after ``timeout_delay``, with an HTTP 504; non-HTTP connections are ignored.
+
+        """
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=testing.FakeRangeServer(error_rate=1.0)),
+            base_url="http://testserver",
+        ) as client:
+            response = await client.get(f"/range/{self.sample_password_prefix}")
+            assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(
+                app=testing.FakeRangeServer(timeout_rate=1.0, timeout_delay=0.0)
+            ),
+            base_url="http://testserver",
+        ) as client:
+            response = await client.get(f"/range/{self.sample_password_prefix}")
+            assert response.status_code == HTTPStatus.GATEWAY_TIMEOUT
+        assert await testing.app({"type": "lifespan"}, None, None) is None
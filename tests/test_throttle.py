@@ -0,0 +1,231 @@
+"""
+Tests for pwned-passwords-django's rate limiting of logged errors.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+import logging
+import threading
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from pwned_passwords_django import api, exceptions, throttle
+
+from .base import PwnedPasswordsTests
+
+logger = logging.getLogger("pwned_passwords_django.tests")
+
+
+class FakeClock:
+    """
+    A clock which only moves when told to.
+
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """
+        Return the current time.
+
+        """
+        return self.now
+
+
+class FakeTimers:
+    """
+    A timer factory whose timers only fire when told to.
+
+    """
+
+    def __init__(self) -> None:
+        self.pending = []
+
+    def __call__(self, interval, function):
+        """
+        Create a timer calling ``function`` after ``interval`` seconds.
+
+        """
+        timer = mock.Mock(interval=interval, function=function)
+        self.pending.append(timer)
+        return timer
+
+    def fire(self):
+        """
+        Fire the timers not cancelled, and return their intervals.
+
+        """
+        pending, self.pending = self.pending, []
+        intervals = []
+        for timer in pending:
+            if not timer.cancel.called:
+                intervals.append(timer.interval)
+                timer.function()
+        return intervals
+
+
+class ErrorLogThrottleTests(SimpleTestCase):
+    """
+    Test the rate limiting of logged errors.
+
+    """
+
+    def setUp(self):
+        """
+        Create a throttle with a controllable clock.
+
+        """
+        super().setUp()
+        self.clock = FakeClock()
+        self.timers = FakeTimers()
+        self.throttle = throttle.ErrorLogThrottle(clock=self.clock, timer=self.timers)
+
+    def log_errors(self, count, code=exceptions.ErrorCode.API_TIMEOUT):
+        """
+        Log ``count`` errors with the given code, and return the messages logged.
+
+        """
+        with self.assertLogs(logger, "ERROR") as logs:
+            logger.error("Start.")
+            for _ in range(count):
+                self.throttle.error(logger, code, "Error %s.", "details")
+        return [record.getMessage() for record in logs.records[1:]]
+
+    @override_settings(PWNED_PASSWORDS={"ERROR_LOG_RATE": 2})
+    def test_rate_limit(self):
+        """
+        Messages beyond the rate limit are suppressed, and counted in the next
+        message logged.
+
+        """
+        assert self.log_errors(5) == ["Error details.", "Error details."]
+        # After half a minute, one more message is allowed.
+        self.clock.now = 30
+        assert self.log_errors(2) == ["Error details. (3 similar messages suppressed)"]
+        # The bucket never holds more than the rate.
+        self.clock.now = 3600
+        assert self.log_errors(3) == [
+            "Error details. (1 similar messages suppressed)",
+            "Error details.",
+        ]
+
+    @override_settings(PWNED_PASSWORDS={"ERROR_LOG_RATE": 1})
+    def test_keys(self):
+        """
+        Each error code is limited separately.
+
+        """
+        assert self.log_errors(2) == ["Error details."]
+        assert self.log_errors(2, code=exceptions.ErrorCode.HTTP_ERROR) == [
+            "Error details."
+        ]
+        self.throttle.reset()
+        assert self.log_errors(1) == ["Error details."]
+
+    def fire_timers(self):
+        """
+        Fire the pending timers, and return the messages logged.
+
+        """
+        with self.assertLogs(logger, "ERROR") as logs:
+            logger.error("Start.")
+            self.timers.fire()
+        return [record.getMessage() for record in logs.records[1:]]
+
+    @override_settings(PWNED_PASSWORDS={"ERROR_LOG_RATE": 2})
+    def test_summary(self):
+        """
+        When a burst of messages is followed by silence, the number suppressed is
+        logged in a summary once the bucket refills.
+
+        """
+        assert self.log_errors(5) == ["Error details.", "Error details."]
+        assert [timer.interval for timer in self.timers.pending] == [30]
+        # Fired early, the summary waits for the bucket to refill.
+        self.clock.now = 10
+        assert self.fire_timers() == []
+        assert [round(timer.interval) for timer in self.timers.pending] == [20]
+        self.clock.now = 30
+        assert self.fire_timers() == ["Error details. (3 similar messages suppressed)"]
+        assert not self.timers.pending
+
+        # Suppressed messages already reported by a later message are not summarized
+        # again.
+        assert self.log_errors(2) == []
+        self.clock.now = 90
+        assert self.log_errors(1) == ["Error details. (2 similar messages suppressed)"]
+        assert self.fire_timers() == []
+
+        # Nor are those discarded by resetting the throttle.
+        self.clock.now = 3600
+        assert self.log_errors(3) == ["Error details.", "Error details."]
+        timer = self.timers.pending[0]
+        self.throttle.reset()
+        timer.function()
+        assert self.timers.pending == [timer]
+
+    @override_settings(PWNED_PASSWORDS={"ERROR_LOG_RATE": 1})
+    def test_flush(self):
+        """
+        Flushing logs the summaries not yet reported, regardless of the rate limit,
+        and resetting discards them.
+
+        """
+        self.log_errors(3)
+        with self.assertLogs(logger, "ERROR") as logs:
+            self.throttle.flush()
+            self.throttle.flush()
+        assert [record.getMessage() for record in logs.records] == [
+            "Error details. (2 similar messages suppressed)"
+        ]
+        assert self.timers.pending[0].cancel.called
+
+        self.clock.now = 3600
+        self.log_errors(3)
+        self.throttle.reset()
+        assert self.timers.pending[-1].cancel.called
+
+    def test_start_timer(self):
+        """
+        By default, summaries are scheduled with daemon threads.
+
+        """
+        fired = threading.Event()
+        timer = throttle._start_timer(0, fired.set)  # pylint: disable=protected-access
+        assert timer.daemon
+        assert fired.wait(5)
+
+    @override_settings(PWNED_PASSWORDS={"ERROR_LOG_RATE": None})
+    def test_disabled(self):
+        """
+        When the rate is None, every message is logged.
+
+        """
+        assert len(self.log_errors(20)) == 20
+
+
+class OutageLoggingTests(PwnedPasswordsTests):
+    """
+    Test the logging of errors during an outage of Pwned Passwords.
+
+    """
+
+    def test_outage(self):
+        """
+        During an outage, the client logs at most the default rate of messages.
+
+        """
+        api_client = api.PwnedPasswords(
+            client=self.exception_client(
+                exception_class=httpx.ConnectTimeout, message="Timed out"
+            )
+        )
+        with self.assertLogs("pwned_passwords_django.api", "ERROR") as logs:
+            for _ in range(50):
+                with self.assertRaises(exceptions.PwnedPasswordsError):
+                    api_client.check_password(self.sample_password)
+        assert len(logs.records) == throttle.DEFAULT_ERROR_LOG_RATE
@@ -0,0 +1,59 @@
+"""
+Tests for pwned-passwords-django's measurement of time spent checking passwords.
+
+"""
+
+# SPDX-License-Identifier: BSD-3-Clause
+
+from django.test import SimpleTestCase
+
+from pwned_passwords_django import timing
+
+
+class TimingTests(SimpleTestCase):
+    """
+    Test the measurement of time spent checking passwords.
+
+    """
+
+    def test_not_collecting(self):
+        """
+        Outside of collect(), measuring records nothing.
+
+        """
+        with timing.collect() as timings:
+            pass
+        with timing.measure(timing.NET):
+            pass
+        assert not timings.as_dict()
+
+    def test_collect(self):
+        """
+        Within collect(), the time spent in each phase is added up.
+
+        """
+        with timing.collect() as timings:
+            with timing.measure(timing.NET):
+                pass
+            with timing.measure(timing.HASH):
+                pass
+            with timing.measure(timing.NET):
+                pass
+        durations = timings.as_dict()
+        # Phases are reported in a fixed order.
+        assert list(durations) == [timing.HASH, timing.NET]
+        assert all(duration >= 0 for duration in durations.values())
+
+    def test_server_timing(self):
+        """
+        Timings are formatted in milliseconds for the Server-Timing header.
+
+        """
+        timings = timing.Timings()
+        assert timings.server_timing() == ""
+        timings.add(timing.NET, 0.0421)
+        timings.add(timing.PARSE, 0.0002)
+        timings.add(timing.NET, 0.001)
+        assert timings.server_timing() == (
+            'pwned-parse;dur=0.2;desc="parse", pwned-net;dur=43.1;desc="net"'
+        )
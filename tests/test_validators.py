@@ -5,13 +5,26 @@ Test the Pwned Passwwords validator.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+import asyncio
+import concurrent.futures
+import threading
+from unittest import mock
+
 import httpx
-from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.contrib.auth.password_validation import (
+    CommonPasswordValidator,
+    MinimumLengthValidator,
+)
 from django.core.exceptions import ValidationError
 from django.test import override_settings
+from django.utils.crypto import get_random_string
 
-from pwned_passwords_django import api
-from pwned_passwords_django.validators import PwnedPasswordsValidator
+from pwned_passwords_django import api, memo
+from pwned_passwords_django.validators import (
+    PwnedPasswordsValidator,
+    avalidate_password,
+    validate_password_concurrently,
+)
 
 from .base import PwnedPasswordsTests
 
@@ -35,6 +48,221 @@ class PwnedPasswordsValidatorsTests(PwnedPasswordsTests):
         ):
             validator.validate(self.sample_password)
 
+    async def test_compromised_async(self):
+        """
+        Compromised passwords raise ValidationError in the async validator.
+
+        """
+        validator = PwnedPasswordsValidator(
+            api_client=api.PwnedPasswords(async_client=self.count_async_client(count=1))
+        )
+        with self.assertRaisesMessage(
+            ValidationError, str(validator.error_message["singular"])
+        ):
+            await validator.avalidate(self.sample_password)
+
+    async def test_not_compromised_async(self):
+        """
+        Non-compromised passwords don't raise ValidationError in the async validator.
+
+        """
+        suffix = self.sample_password_suffix.replace("A", "3")
+        validator = PwnedPasswordsValidator(
+            api_client=api.PwnedPasswords(
+                async_client=self.count_async_client(count=1, suffix=suffix)
+            )
+        )
+        await validator.avalidate(self.sample_password)
+
+    async def test_fallback_async(self):
+        """
+        In the event of a Pwned Passwords API failure, the async validator falls back
+        to CommonPasswordValidator.
+
+        """
+        validator = PwnedPasswordsValidator(
+            error_message="Pwned",
+            api_client=api.PwnedPasswords(
+                async_client=self.exception_client(
+                    exception_class=httpx.ConnectTimeout,
+                    message="Timed out",
+                    is_async=True,
+                )
+            ),
+        )
+        with self.assertRaisesMessage(ValidationError, "This password is too common."):
+            await validator.avalidate("password")
+        await validator.avalidate(get_random_string(length=20))
+
+    @override_settings(PWNED_PASSWORDS={"CHECK_COMMON_FIRST": True})
+    async def test_check_common_first_async(self):
+        """
+        When enabled, the async validator rejects common passwords without contacting
+        Pwned Passwords.
+
+        """
+        client = self.exception_client(
+            exception_class=httpx.ConnectTimeout, message="Timed out", is_async=True
+        )
+        validator = PwnedPasswordsValidator(
+            error_message="Pwned", api_client=api.PwnedPasswords(async_client=client)
+        )
+        with self.assertRaisesMessage(ValidationError, "Pwned"):
+            await validator.avalidate("password")
+        client.get.assert_not_called()
+
+    async def test_avalidate_password(self):
+        """
+        avalidate_password() runs all validators, awaiting those which support it,
+        and collects all their errors.
+
+        """
+        validators = [
+            MinimumLengthValidator(min_length=12),
+            PwnedPasswordsValidator(
+                api_client=api.PwnedPasswords(
+                    async_client=self.count_async_client(count=1)
+                )
+            ),
+        ]
+        with self.assertRaises(ValidationError) as error:
+            await avalidate_password(self.sample_password, None, validators)
+        assert [error.code for error in error.exception.error_list] == [
+            "password_too_short",
+            "password_compromised",
+        ]
+        await avalidate_password(get_random_string(length=20), None, validators[:1])
+
+    def test_validate_password_concurrently(self):
+        """
+        validate_password_concurrently() runs all validators, with the Pwned
+        Passwords check in the background, and collects all their errors.
+
+        """
+        api_client = api.PwnedPasswords(client=self.count_sync_client(count=1))
+        validators = [
+            MinimumLengthValidator(min_length=8),
+            PwnedPasswordsValidator(api_client=api_client),
+        ]
+        with self.assertRaises(ValidationError) as error:
+            validate_password_concurrently(self.sample_password, None, validators)
+        assert [error.code for error in error.exception.error_list] == [
+            "password_compromised"
+        ]
+
+        with mock.patch.object(
+            api_client, "check_password", return_value=0
+        ) as check_mock:
+            validate_password_concurrently(self.sample_password, None, validators)
+        check_mock.assert_called_once_with(self.sample_password)
+
+    def test_validate_password_concurrently_skip(self):
+        """
+        validate_password_concurrently() does not wait for the Pwned Passwords check
+        if another validator rejects the password.
+
+        """
+        release = threading.Event()
+        check_mock = mock.Mock(side_effect=lambda password: release.wait() and 1)
+        api_client = mock.Mock(spec_set=api.PwnedPasswords, check_password=check_mock)
+        validators = [
+            PwnedPasswordsValidator(api_client=api_client),
+            MinimumLengthValidator(min_length=12),
+        ]
+        try:
+            with self.assertRaises(ValidationError) as error:
+                validate_password_concurrently(self.sample_password, None, validators)
+            assert [error.code for error in error.exception.error_list] == [
+                "password_too_short"
+            ]
+        finally:
+            release.set()
+
+    def test_validate_password_concurrently_busy(self):
+        """
+        validate_password_concurrently() makes the Pwned Passwords check on the
+        calling thread if the thread pool is too busy to start it.
+
+        """
+        release = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        executor.submit(release.wait)
+        threads = []
+        api_client = api.PwnedPasswords(client=self.count_sync_client(count=1))
+        validators = [
+            MinimumLengthValidator(min_length=8),
+            PwnedPasswordsValidator(api_client=api_client),
+        ]
+        with mock.patch.object(
+            api, "get_executor", return_value=executor
+        ), mock.patch.object(
+            api_client,
+            "check_password",
+            side_effect=lambda password: threads.append(threading.get_ident()) or 1,
+        ):
+            with self.assertRaises(ValidationError):
+                validate_password_concurrently(self.sample_password, None, validators)
+        assert threads == [threading.get_ident()]
+
+    def test_validate_password_concurrently_in_flight(self):
+        """
+        validate_password_concurrently() waits for a Pwned Passwords check already
+        in flight on the thread pool.
+
+        """
+        started = threading.Event()
+        threads = []
+
+        def check_password(password):
+            """
+            Mock check which records the thread it runs on.
+
+            """
+            threads.append(threading.get_ident())
+            started.set()
+            return 1
+
+        api_client = mock.Mock(
+            spec_set=api.PwnedPasswords, check_password=check_password
+        )
+        # A validator which finishes only once the check has started.
+        other_validator = mock.Mock(
+            spec_set=["validate"],
+            validate=mock.Mock(side_effect=lambda password, user: started.wait()),
+        )
+        validators = [PwnedPasswordsValidator(api_client=api_client), other_validator]
+        with self.assertRaises(ValidationError):
+            validate_password_concurrently(self.sample_password, None, validators)
+        assert len(threads) == 1
+        assert threads != [threading.get_ident()]
+
+    def test_validate_password_concurrently_default(self):
+        """
+        validate_password_concurrently() uses the configured validators by default,
+        and shares results recorded while handling the current request.
+
+        """
+        sync_mock, _ = self.api_mocks(count=1)
+        with mock.patch.object(api.default_client, "check_password", sync_mock):
+            with memo.request_scope():
+                with self.assertRaises(ValidationError):
+                    validate_password_concurrently(self.sample_password)
+                assert memo.lookup(self.sample_password) == 1
+        sync_mock.assert_called_once_with(self.sample_password)
+
+    async def test_avalidate_password_default(self):
+        """
+        avalidate_password() uses the configured validators by default.
+
+        """
+        _, async_mock = self.api_mocks(count=1)
+        with mock.patch.object(api.default_client, "check_password_async", async_mock):
+            with self.assertRaises(ValidationError):
+                await avalidate_password(self.sample_password)
+        async_mock.assert_called_once_with(self.sample_password)
+
     def test_not_compromised(self):
         """
         Non-compromised passwords don't raise ValidationError.
@@ -124,6 +352,121 @@ class PwnedPasswordsValidatorsTests(PwnedPasswordsTests):
         else:
             # If no validation error was raised, that's a failure.
             assert False  # noqa: B011
+        # An uncommon password passes the fallback check.
+        validator.validate(get_random_string(length=20))
+
+    @override_settings(PWNED_PASSWORDS={"CHECK_COMMON_FIRST": True})
+    def test_check_common_first(self):
+        """
+        When enabled, common passwords are rejected as compromised without contacting
+        Pwned Passwords, and other passwords are still checked.
+
+        """
+        api_client = api.PwnedPasswords()
+        validator = PwnedPasswordsValidator(
+            error_message=("Pwned %(amount)d time", "Pwned %(amount)d times"),
+            api_client=api_client,
+        )
+        with mock.patch.object(api_client, "check_password", return_value=10) as check:
+            with self.assertRaises(ValidationError) as error:
+                validator.validate("password")
+            check.assert_not_called()
+            assert error.exception.error_list[0].code == "password_compromised"
+            assert error.exception.messages == ["Pwned 1 time"]
+
+            password = get_random_string(length=20)
+            with self.assertRaisesMessage(ValidationError, "Pwned 10 times"):
+                validator.validate(password)
+            check.assert_called_once_with(password)
+
+    def test_validate_many(self):
+        """
+        Many passwords can be validated at once, with the fallback validator used
+        only for passwords whose hash prefix could not be fetched.
+
+        """
+        uncommon = get_random_string(length=20)
+        validator = PwnedPasswordsValidator(
+            api_client=api.PwnedPasswords(
+                client=httpx.Client(
+                    transport=self.range_transport(
+                        {self.sample_password: 100, uncommon: 0},
+                        # The prefixes of "correct horse" and "password".
+                        failing_prefixes=["2F9E5", "5BAA6"],
+                    )
+                )
+            )
+        )
+        with self.assertLogs("pwned_passwords_django.validators", "ERROR") as logs:
+            errors = validator.validate_many(
+                [self.sample_password, uncommon, "correct horse", "password", uncommon]
+            )
+        assert len(logs.output) == 1
+        assert errors[0].code == "password_compromised"
+        assert errors[1] is None
+        # "correct horse" is not in Django's list of common passwords.
+        assert errors[2] is None
+        assert errors[3].code == "password_too_common"
+        assert errors[4] is None
+        assert not validator.validate_many([])
+
+    @override_settings(PWNED_PASSWORDS={"CHECK_COMMON_FIRST": True})
+    def test_validate_many_check_common_first(self):
+        """
+        Many passwords can be validated at once, without contacting Pwned Passwords
+        for common passwords.
+
+        """
+        api_client = mock.Mock(spec_set=api.PwnedPasswords)
+        validator = PwnedPasswordsValidator(api_client=api_client)
+        errors = validator.validate_many(["password", "123456"])
+        assert [error.code for error in errors] == ["password_compromised"] * 2
+        api_client.check_passwords.assert_not_called()
+
+    async def test_avalidate_many(self):
+        """
+        Many passwords can be validated at once in async code, with the fallback
+        validator used only for passwords whose hash prefix could not be fetched.
+
+        """
+        validator = PwnedPasswordsValidator(
+            api_client=api.PwnedPasswords(
+                async_client=httpx.AsyncClient(
+                    transport=self.range_transport(
+                        {self.sample_password: 100}, failing_prefixes=["5BAA6"]
+                    )
+                )
+            )
+        )
+        errors = await validator.avalidate_many(
+            [self.sample_password, "hunter2", "password"]
+        )
+        assert errors[0].code == "password_compromised"
+        assert errors[1] is None
+        assert errors[2].code == "password_too_common"
+
+    async def test_avalidate_many_shared_results(self):
+        """
+        Validating many passwords in async code uses results already recorded while
+        handling the current request, and records new ones.
+
+        """
+        api_client = mock.Mock(spec_set=api.PwnedPasswords)
+        api_client.check_passwords_async.return_value = {"hunter2": 0}
+        validator = PwnedPasswordsValidator(api_client=api_client)
+        with memo.request_scope():
+            memo.record(self.sample_password, 100)
+            # An in-progress check, such as the middleware's, is waited for.
+            claim = memo.claim("correct horse")
+            asyncio.get_running_loop().call_soon(claim.set_result, 0)
+            errors = await validator.avalidate_many(
+                [self.sample_password, "correct horse", "hunter2"]
+            )
+            assert errors[0].code == "password_compromised"
+            assert errors[1] is None
+            assert errors[2] is None
+            api_client.check_passwords_async.assert_awaited_once_with(["hunter2"])
+            assert memo.lookup("hunter2") == 0
 
     def test_get_help_text_matches_django(self):
         """
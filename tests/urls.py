@@ -5,22 +5,37 @@ URL mapping used during testing.
 
 # SPDX-License-Identifier: BSD-3-Clause
 
+from django.core.exceptions import ValidationError
 from django.http import HttpResponse
 from django.urls import path
 
+from pwned_passwords_django import views
+from pwned_passwords_django.validators import PwnedPasswordsValidator
+
 
 def view(request):
     """
-    A minimal view for use in testing.
+    A minimal view for use in testing, which reads ``request.pwned_passwords``.
 
     """
-    # pylint: disable=unused-argument
+    list(request.pwned_passwords)
     return HttpResponse("Content.")
 
 
 async def async_view(request):
     """
-    A minimal async view for use in testing.
+    A minimal async view for use in testing, which reads
+    ``request.pwned_passwords``.
+
+    """
+    await request.apwned_passwords()
+    return HttpResponse("Content.")
+
+
+def unread(request):
+    """
+    A minimal view for use in testing, which never reads
+    ``request.pwned_passwords``.
 
     """
     # pylint: disable=unused-argument
@@ -44,6 +59,20 @@ async def async_breach_count(request, field):
     An async view which asserts that it received a compromised password, in the
     given ``field``.
 
+    """
+    assert hasattr(request, "apwned_passwords")
+    pwned_passwords = await request.apwned_passwords()
+    assert pwned_passwords
+    assert field in pwned_passwords
+    return HttpResponse("Content.")
+
+
+async def async_breach_count_sync_access(request, field):
+    """
+    An async view which asserts, using synchronous access to
+    ``request.pwned_passwords``, that it received a compromised password in the given
+    ``field``.
+
     """
     assert hasattr(request, "pwned_passwords")
     assert request.pwned_passwords
@@ -51,6 +80,20 @@ async def async_breach_count(request, field):
     return HttpResponse("Content.")
 
 
+async def async_breach_count_awaited_sync_access(request, field):
+    """
+    An async view which asserts, using synchronous access to
+    ``request.pwned_passwords`` once the result has been awaited, that it received a
+    compromised password in the given ``field``.
+
+    """
+    assert hasattr(request, "pwned_passwords")
+    await request.apwned_passwords()
+    assert request.pwned_passwords
+    assert field in request.pwned_passwords
+    return HttpResponse("Content.")
+
+
 def clean(request):
     """
     A view which asserts that it did not receive a compromised
@@ -68,12 +111,60 @@ async def async_clean(request):
     password.
 
     """
-    assert hasattr(request, "pwned_passwords")
-    assert request.pwned_passwords == []
+    assert hasattr(request, "apwned_passwords")
+    assert await request.apwned_passwords() == []
+    return HttpResponse("Content.")
+
+
+def validate(request):
+    """
+    A view which validates the submitted password, then reads
+    ``request.pwned_passwords``.
+
+    """
+    try:
+        PwnedPasswordsValidator().validate(request.POST["password"])
+    except ValidationError:
+        pass
+    list(request.pwned_passwords)
+    return HttpResponse("Content.")
+
+
+async def async_validate(request):
+    """
+    An async view which validates the submitted password, then reads
+    ``request.pwned_passwords``.
+
+    """
+    try:
+        await PwnedPasswordsValidator().avalidate(request.POST["password"])
+    except ValidationError:
+        pass
+    await request.apwned_passwords()
     return HttpResponse("Content.")
 
 
 urlpatterns = [
+    path(
+        "pwned-passwords-django/tests/range/<str:prefix>",
+        views.range_api,
+        name="pwned-range",
+    ),
+    path(
+        "pwned-passwords-django/tests/metrics",
+        views.metrics,
+        name="pwned-metrics",
+    ),
+    path(
+        "pwned-passwords-django/tests/validate",
+        validate,
+        name="pwned-validate",
+    ),
+    path(
+        "pwned-passwords-django/tests/async/validate",
+        async_validate,
+        name="pwned-validate-async",
+    ),
     path(
         "pwned-passwords-django/tests/middleware",
         view,
@@ -84,6 +175,31 @@ urlpatterns = [
         async_view,
         name="pwned-middleware-async",
     ),
+    path(
+        "pwned-passwords-django/tests/unread",
+        unread,
+        name="pwned-unread",
+    ),
+    path(
+        "pwned-passwords-django/tests/clean",
+        clean,
+        name="pwned-clean",
+    ),
+    path(
+        "pwned-passwords-django/tests/async/clean",
+        async_clean,
+        name="pwned-clean-async",
+    ),
+    path(
+        "pwned-passwords-django/tests/async/sync-access/<str:field>/",
+        async_breach_count_sync_access,
+        name="pwned-breach-async-sync-access",
+    ),
+    path(
+        "pwned-passwords-django/tests/async/awaited-sync-access/<str:field>/",
+        async_breach_count_awaited_sync_access,
+        name="pwned-breach-async-awaited-sync-access",
+    ),
     path(
         "pwned-passwords-django/tests/<str:field>/",
         breach_count,
@@ -94,14 +210,4 @@ urlpatterns = [
         async_breach_count,
         name="pwned-breach-async",
     ),
-    path(
-        "pwned-passwords-django/tests/clean",
-        view,
-        name="pwned-clean",
-    ),
-    path(
-        "pwned-passwords-django/tests/async/clean",
-        async_view,
-        name="pwned-clean",
-    ),
 ]